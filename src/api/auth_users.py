@@ -6,11 +6,14 @@ from httpx_oauth.oauth2 import BaseOAuth2
 from api import schemas
 from api.oauth import get_oauth_router
 from api.v1.auth import get_auth_router
+from api.v1.jwks import get_jwks_router
 from api.v1.register import get_register_router
 from api.v1.reset import get_reset_password_router
 from api.v1.user import get_users_me_router, get_users_router
 from api.v1.verify import get_verify_router
 from authentication import AuthenticationBackend, Authenticator
+from core.dependency_types import DependencyCallable
+from core.jwt_keys import KeyRing
 from core.jwt_utils import SecretType
 from db import models_protocol
 from managers.user import UserManagerDependency
@@ -169,3 +172,14 @@ class APIUsers(Generic[models_protocol.UP, models_protocol.SIHE]):
 
     def return_verify_router(self, user_schema: type[schemas.UserRead]) -> APIRouter:
         return get_verify_router(self.get_user_manager, user_schema)
+
+    def return_jwks_router(
+        self, get_keyring: DependencyCallable[KeyRing | None]
+    ) -> APIRouter:
+        """
+        Return a router publishing the public keys of access tokens.
+
+        :param get_keyring: Dependency callable returning the key ring
+        signing the access tokens.
+        """
+        return get_jwks_router(get_keyring)
@@ -3,7 +3,7 @@ import enum
 from typing import Any, Generic, Sequence, TypeVar
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 AccessRightID = TypeVar('AccessRightID', bound=UUID)
 UserID = TypeVar("UserID", bound=UUID)
@@ -262,3 +262,20 @@ class RoleAccessRightUpdate(BaseRoleAccessRightUpdate[UUID, UUID]):
 
 RAR = TypeVar("RAR", bound=BaseRoleAccessRight[UUID, UUID])
 RARU = TypeVar("RARU", bound=BaseRoleAccessRightUpdate[UUID, UUID])
+
+
+class TokenIntrospectRequest(BaseModel):
+    tokens: list[str] = Field(..., max_items=100)
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: str | None = None
+    is_active: bool = False
+    is_superuser: bool = False
+    is_admin: bool = False
+    is_verified: bool = False
+
+
+class TokenIntrospectResponse(BaseModel):
+    tokens: list[TokenIntrospection]
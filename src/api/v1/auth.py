@@ -3,8 +3,10 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 
+from api import schemas
 from api.v1.common import ErrorCode, ErrorModel
 from authentication import AuthenticationBackend, Authenticator, Strategy
+from authentication.strategy import StrategyRotateNotSupportedError
 from core.logger import logger
 from db import models_protocol
 from managers.user import BaseUserManager, UserManagerDependency
@@ -37,6 +39,9 @@ def get_auth_router(  # noqa: C901
     )
     get_access_user_id = access_authenticator.current_user_uuid(active=True)
     get_refresh_user_id = refresh_authenticator.current_user_uuid(active=True)
+    get_current_superuser = access_authenticator.current_user(
+        active=True, superuser=True
+    )
 
     login_responses: OpenAPIResponseType = {
         status.HTTP_400_BAD_REQUEST: {
@@ -70,6 +75,9 @@ def get_auth_router(  # noqa: C901
         strategy: Strategy[models_protocol.UP, models_protocol.SIHE] = Depends(
             refresh_backend.get_strategy
         ),
+        access_strategy: Strategy[models_protocol.UP, models_protocol.SIHE] = Depends(
+            access_backend.get_strategy
+        ),
     ):
         user = await user_manager.authenticate(credentials)
         if user is None or not user.is_active:
@@ -78,7 +86,13 @@ def get_auth_router(  # noqa: C901
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=ErrorCode.LOGIN_BAD_CREDENTIALS,
             )
-        response = await refresh_backend.login(strategy, user)
+        if access_backend.transport.token_pair:
+            refresh_token = await strategy.write_token(user)
+            response = await access_backend.login(
+                access_strategy, user, refresh_token=refresh_token
+            )
+        else:
+            response = await refresh_backend.login(strategy, user)
         await user_manager.on_after_login(user, request, response)
         logging.info("success:%s" % user.id)
         return response
@@ -100,6 +114,9 @@ def get_auth_router(  # noqa: C901
         strategy: Strategy[models_protocol.UP, models_protocol.SIHE] = Depends(
             access_backend.get_strategy
         ),
+        refresh_strategy: Strategy[models_protocol.UP, models_protocol.SIHE] = Depends(
+            refresh_backend.get_strategy
+        ),
     ):
         if not user_token:
             logging.exception("BAD_TOKEN:%s" % user_token)
@@ -107,9 +124,24 @@ def get_auth_router(  # noqa: C901
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ErrorCode.REFRESH_BAD_TOKEN,
             )
-        user, _ = user_token
+        user, token = user_token
 
-        response = await access_backend.login(strategy, user)
+        try:
+            refresh_token = await refresh_strategy.rotate_token(token, user)
+        except StrategyRotateNotSupportedError:
+            response = await access_backend.login(strategy, user)
+            logging.info("success:%s" % user.id)
+            return response
+
+        if refresh_token is None:
+            logging.exception("REPLAYED_TOKEN:%s" % user.id)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=ErrorCode.REFRESH_BAD_TOKEN,
+            )
+        response = await access_backend.login(
+            strategy, user, refresh_token=refresh_token
+        )
         logging.info("success:%s" % user.id)
         return response
 
@@ -176,4 +208,47 @@ def get_auth_router(  # noqa: C901
         logging.info("success:%s" % user.id)
         return await refresh_backend.logout(strategy, user, token)
 
+    @router.post(
+        "/auth/introspect",
+        name=f"auth:{access_backend.name}.introspect",
+        response_model=schemas.TokenIntrospectResponse,
+        dependencies=[Depends(get_current_superuser)],
+        summary="Introspect access tokens",
+        description="Check a batch of access tokens in one request",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user."
+            },
+            status.HTTP_403_FORBIDDEN: {"description": "Not a superuser."},
+        },
+    )
+    async def introspect(  # pyright: ignore
+        body: schemas.TokenIntrospectRequest,
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ] = Depends(get_user_manager),
+        strategy: Strategy[models_protocol.UP, models_protocol.SIHE] = Depends(
+            access_backend.get_strategy
+        ),
+    ) -> schemas.TokenIntrospectResponse:
+        users = await strategy.read_tokens(body.tokens, user_manager)
+        return schemas.TokenIntrospectResponse(
+            tokens=[
+                schemas.TokenIntrospection(
+                    active=user.is_active,
+                    sub=str(user.id),
+                    is_active=user.is_active,
+                    is_superuser=user.is_superuser,
+                    is_admin=user.is_admin,
+                    is_verified=user.is_verified,
+                )
+                if user
+                else schemas.TokenIntrospection(active=False)
+                for user in users
+            ]
+        )
+
     return router
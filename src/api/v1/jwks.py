@@ -0,0 +1,33 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from core.dependency_types import DependencyCallable
+from core.jwt_keys import KeyRing
+
+JWKS_MAX_AGE_SECONDS = 300
+
+
+def get_jwks_router(get_keyring: DependencyCallable[KeyRing | None]) -> APIRouter:
+    """
+    Generate a router publishing the public keys of a key ring.
+
+    The key ring is a dependency, so its key files are read on first use.
+    """
+    router = APIRouter()
+
+    @router.get(
+        "/.well-known/jwks.json",
+        name="auth:jwks",
+        summary="Get JSON Web Key Set",
+        description="Public keys to verify access tokens locally",
+    )
+    async def jwks(
+        response: Response, keyring: KeyRing | None = Depends(get_keyring)
+    ) -> dict[str, list[dict[str, Any]]]:
+        if keyring is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE_SECONDS}"
+        return keyring.jwks()
+
+    return router
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+
+
+def get_metrics_router(registry: CollectorRegistry) -> APIRouter:
+    """
+    Generate a router exposing metrics of the worker to Prometheus.
+
+    The endpoint has no authentication: mount it only where the network
+    keeps it internal, see `settings.metrics_enabled`.
+    """
+    router = APIRouter()
+
+    @router.get(
+        "/metrics",
+        name="metrics",
+        summary="Get metrics",
+        description="Metrics of the worker in the Prometheus text format",
+        response_class=Response,
+    )
+    async def get_metrics() -> Response:
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+    return router
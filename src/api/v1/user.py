@@ -7,6 +7,7 @@ import core.exceptions as exceptions
 from api import schemas
 from api.v1.common import ErrorCode, ErrorModel
 from authentication import Authenticator
+from authentication.strategy import TokenPrincipal
 from core.logger import logger
 from core.pagination import PaginateQueryParams
 from db import models_protocol
@@ -16,6 +17,51 @@ from rate_limiter import RateLimiter, RateLimitTime
 logger()
 
 
+def current_user_profile(
+    get_current_active_user: typing.Callable[..., typing.Any],
+    get_user_manager: UserManagerDependency[
+        models_protocol.UP,
+        models_protocol.SIHE,
+        models_protocol.OAP,
+        models_protocol.UOAP,
+    ],
+    active: bool = True,
+    superuser: bool = False,
+    admin: bool = False,
+) -> typing.Callable[..., typing.Any]:
+    """
+    Dependency loading the full user when the token carries only a principal.
+
+    Principal claims may be outdated until the token expires, so the checks
+    of the authenticator are applied again to the loaded user.
+    """
+
+    async def get_current_user_profile(
+        user: models_protocol.UP = Depends(get_current_active_user),
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ] = Depends(get_user_manager),
+    ) -> models_protocol.UP:
+        if not isinstance(user, TokenPrincipal):
+            return user
+        try:
+            user = await user_manager.get(user.id)
+        except exceptions.UserNotExists:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if active and not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if (superuser and not user.is_superuser) or (
+            admin and not (user.is_admin or user.is_superuser)
+        ):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+        return user
+
+    return get_current_user_profile
+
+
 def get_users_me_router(
     get_user_manager: UserManagerDependency[
         models_protocol.UP,
@@ -33,6 +79,9 @@ def get_users_me_router(
 
     get_current_active_user = authenticator.current_user(active=True)
     get_current_id = authenticator.current_user_uuid(active=True)
+    get_current_user_profile = current_user_profile(
+        get_current_active_user, get_user_manager
+    )
 
     @router.get(
         "",
@@ -52,7 +101,7 @@ def get_users_me_router(
         },
     )
     async def get_current_user(  # pyright: ignore
-        user: models_protocol.UP = Depends(get_current_active_user),
+        user: models_protocol.UP = Depends(get_current_user_profile),
     ) -> schemas.UserRead:
         return user_schema.from_orm(user)
 
@@ -101,7 +150,7 @@ def get_users_me_router(
     async def update_current_user(  # pyright: ignore
         request: Request,
         user_update: user_update_schema,
-        user: models_protocol.UP = Depends(get_current_active_user),
+        user: models_protocol.UP = Depends(get_current_user_profile),
         user_manager: BaseUserManager[
             models_protocol.UP,
             models_protocol.SIHE,
@@ -416,4 +465,36 @@ def get_users_router(
         logging.info("success:%s" % user.id)
         return None
 
+    @router.post(
+        "/{id}/revoke-sessions",
+        status_code=status.HTTP_204_NO_CONTENT,
+        response_class=Response,
+        dependencies=[
+            Depends(get_current_superuser),
+            Depends(RateLimiter(2, RateLimitTime(seconds=10), get_uuid=get_current_id)),
+        ],
+        name="users:revoke_sessions",
+        summary="Revoke all sessions of a user",
+        description="Invalidate every token issued to the user so far",
+        responses={
+            status.HTTP_401_UNAUTHORIZED: {
+                "description": "Missing token or inactive user."
+            },
+            status.HTTP_403_FORBIDDEN: {"description": "Not a superuser."},
+            status.HTTP_404_NOT_FOUND: {"description": "The user does not exist."},
+        },
+    )
+    async def revoke_sessions(  # pyright: ignore
+        user: models_protocol.UP = Depends(get_user_or_404),
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ] = Depends(get_user_manager),
+    ):
+        await user_manager.revoke_sessions(user)
+        logging.info("success:%s" % user.id)
+        return None
+
     return router
@@ -3,9 +3,18 @@ from fastapi.responses import ORJSONResponse
 
 import rate_limiter
 from api import container, schemas
+from api.v1.metrics import get_metrics_router
+from cache.cache import get_cache
+from core import metrics
 from core.config import settings
 from core.logger import logger
 from core.tracers import configure_tracer, instrumentor
+from managers.jwt import (
+    build_access_strategy,
+    build_refresh_strategy,
+    get_access_keyring,
+    get_blacklist_managers,
+)
 from managers.user import google_oauth_client
 
 logger()
@@ -74,6 +83,14 @@ app.include_router(
     tags=["auth"],
 )
 
+if settings.access_token_keyring_path:
+    app.include_router(
+        container.api_users.return_jwks_router(get_access_keyring), tags=["auth"]
+    )
+
+if settings.metrics_enabled:
+    app.include_router(get_metrics_router(metrics.registry), tags=["metrics"])
+
 
 @app.middleware("http")
 async def require_request_id(request: Request, call_next):
@@ -98,5 +115,34 @@ async def on_startup():
     await rate_limiter.RateLimitManager.init(redis)
 
 
+@app.on_event("startup")
+async def build_strategies():
+    build_access_strategy()
+    build_refresh_strategy()
+
+
+@app.on_event("startup")
+async def start_token_blacklist_sync():
+    for manager in get_blacklist_managers():
+        manager.start_sync()
+
+
+@app.on_event("shutdown")
+async def stop_token_blacklist_sync():
+    for manager in get_blacklist_managers():
+        await manager.stop_sync()
+
+
+@app.on_event("startup")
+async def start_cache_sync():
+    # The cache backend is bound here, not when the repositories are imported
+    get_cache().start_sync()
+
+
+@app.on_event("shutdown")
+async def stop_cache_sync():
+    await get_cache().stop_sync()
+
+
 if settings.jaeger_enabled:
     instrumentor().instrument_app(app)  # type: ignore
@@ -3,6 +3,7 @@ from authentication.backend import AuthenticationBackend
 from authentication.strategy import (
     JWTBlacklistStrategy,
     JWTStrategy,
+    RedisStrategy,
     Strategy,
     get_manager,
 )
@@ -10,6 +11,7 @@ from authentication.transport import (
     BearerTransport,
     CookieTransport,
     RefreshBearerTransport,
+    TokenPairBearerTransport,
     Transport,
 )
 
@@ -19,8 +21,10 @@ __all__ = [
     "BearerTransport",
     "RefreshBearerTransport",
     "CookieTransport",
+    "TokenPairBearerTransport",
     "JWTStrategy",
     "JWTBlacklistStrategy",
+    "RedisStrategy",
     "Strategy",
     "Transport",
     "get_manager",
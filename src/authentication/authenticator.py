@@ -2,7 +2,7 @@ import re
 from inspect import Parameter, Signature
 from typing import Any, Callable, Generic, Optional, Sequence, cast
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from makefun import with_signature  # type: ignore
 
 from authentication.backend import AuthenticationBackend
@@ -11,6 +11,9 @@ from core.dependency_types import DependencyCallable
 from db import models_protocol as models
 from managers.user import BaseUserManager, UserManagerDependency
 
+# Атрибут request.state с результатами аутентификации в рамках запроса
+REQUEST_CACHE_ATTRIBUTE = "authenticated_principals"
+
 INVALID_CHARS_PATTERN = re.compile(r"[^0-9a-zA-Z_]")
 INVALID_LEADING_CHARS_PATTERN = re.compile(r"^[^a-zA-Z_]+")
 
@@ -196,27 +199,39 @@ class Authenticator(Generic[models.UP, models.SIHE]):
         self,
         *args: tuple[Any, ...],
         user_manager: BaseUserManager[models.UP, models.SIHE, models.OAP, models.UOAP],
+        request: Optional[Request] = None,
         optional: bool = False,
         active: bool = False,
         superuser: bool = False,
         admin: bool = False,
         **kwargs: Any,
     ) -> tuple[Optional[models.UP], Optional[str]]:
-        user: Optional[models.UP] = None
-        token: Optional[str] = None
         enabled_backends: Sequence[
             AuthenticationBackend[models.UP, models.SIHE]
         ] = kwargs.get("enabled_backends", self.backends)
-        for backend in self.backends:
-            if backend in enabled_backends:
-                token = kwargs[name_to_variable_name(backend.name)]
-                strategy: Strategy[models.UP, models.SIHE] = kwargs[
-                    name_to_strategy_variable_name(backend.name)
-                ]
-                if token is not None:
-                    user = await strategy.read_token(token, user_manager)
-                    if user:
-                        break
+        tokens = tuple(
+            kwargs[name_to_variable_name(backend.name)]
+            if backend in enabled_backends
+            else None
+            for backend in self.backends
+        )
+
+        cache: Optional[dict[Any, Any]] = None
+        if request is not None:
+            cache = getattr(request.state, REQUEST_CACHE_ATTRIBUTE, None)
+            if cache is None:
+                cache = {}
+                setattr(request.state, REQUEST_CACHE_ATTRIBUTE, cache)
+        cache_key = (id(self), tokens)
+
+        if cache is not None and cache_key in cache:
+            user, token = cache[cache_key]
+        else:
+            user, token = await self._read_tokens(
+                tokens, user_manager, enabled_backends, kwargs
+            )
+            if cache is not None:
+                cache[cache_key] = (user, token)
 
         status_code = status.HTTP_401_UNAUTHORIZED
         if user:
@@ -236,6 +251,28 @@ class Authenticator(Generic[models.UP, models.SIHE]):
             raise HTTPException(status_code=status_code)
         return user, token
 
+    async def _read_tokens(
+        self,
+        tokens: tuple[Optional[str], ...],
+        user_manager: BaseUserManager[models.UP, models.SIHE, models.OAP, models.UOAP],
+        enabled_backends: Sequence[AuthenticationBackend[models.UP, models.SIHE]],
+        strategies: dict[str, Any],
+    ) -> tuple[Optional[models.UP], Optional[str]]:
+        """Return the user of the first backend accepting its token."""
+        user: Optional[models.UP] = None
+        token: Optional[str] = None
+        for backend, backend_token in zip(self.backends, tokens):
+            if backend in enabled_backends:
+                token = backend_token
+                strategy: Strategy[models.UP, models.SIHE] = strategies[
+                    name_to_strategy_variable_name(backend.name)
+                ]
+                if token is not None:
+                    user = await strategy.read_token(token, user_manager)
+                    if user:
+                        break
+        return user, token
+
     def _get_dependency_signature(
         self,
         get_enabled_backends: Optional[
@@ -252,11 +289,16 @@ class Authenticator(Generic[models.UP, models.SIHE]):
         """
         try:
             parameters: list[Parameter] = [
+                Parameter(
+                    name="request",
+                    kind=Parameter.POSITIONAL_OR_KEYWORD,
+                    annotation=Request,
+                ),
                 Parameter(
                     name="user_manager",
                     kind=Parameter.POSITIONAL_OR_KEYWORD,
                     default=Depends(self.get_user_manager),
-                )
+                ),
             ]
 
             for backend in self.backends:
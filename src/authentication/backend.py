@@ -39,8 +39,16 @@ class AuthenticationBackend(Generic[models_protocol.UP, models_protocol.SIHE]):
         self,
         strategy: Strategy[models_protocol.UP, models_protocol.SIHE],
         user: models_protocol.UP,
+        refresh_token: str | None = None,
     ) -> Response:
+        """
+        Issue a token and return it through the transport.
+
+        :param refresh_token: Refresh token to return along with the issued one.
+        """
         token = await strategy.write_token(user)
+        if refresh_token is not None:
+            return await self.transport.get_token_pair_response(token, refresh_token)
         return await self.transport.get_login_response(token)
 
     async def logout(
@@ -1,11 +1,22 @@
-from authentication.strategy.base import Strategy, StrategyDestroyNotSupportedError
+from authentication.strategy.base import (
+    Strategy,
+    StrategyDestroyNotSupportedError,
+    StrategyRotateNotSupportedError,
+)
 from authentication.strategy.blacklist import get_manager
+from authentication.strategy.family import get_family_manager
 from authentication.strategy.jwt import JWTBlacklistStrategy, JWTStrategy
+from authentication.strategy.models import TokenPrincipal
+from authentication.strategy.redis import RedisStrategy
 
 __all__ = [
     "JWTStrategy",
     "JWTBlacklistStrategy",
+    "RedisStrategy",
     "Strategy",
     "StrategyDestroyNotSupportedError",
+    "StrategyRotateNotSupportedError",
+    "TokenPrincipal",
+    "get_family_manager",
     "get_manager",
 ]
@@ -1,21 +1,55 @@
-from datetime import datetime
-from typing import Protocol  # pragma: no cover
-from typing import Optional
+from typing import Any, Protocol, Sequence  # pragma: no cover
 
 
 class TokenBlacklistManager(Protocol):
-    """Protocol for retrieving, creating and updating access tokens from a database."""
+    """Protocol for checking and revoking token ids (`jti`)."""
 
-    async def check_token(
-        self, encoded_token: str | None, max_age: Optional[datetime] = None
-    ) -> bool:
-        """Check token in blacklist"""
+    async def check_token(self, token_id: str | None) -> bool:
+        """Check token id in blacklist"""
+        ...  # pragma: no cover
+
+    async def check_tokens(self, token_ids: Sequence[str]) -> list[bool]:
+        """Check a batch of token ids in blacklist"""
+        ...  # pragma: no cover
+
+    async def check_legacy_tokens(self, tokens: Sequence[str]) -> list[bool]:
+        """Check encoded tokens issued without `jti` in the previous blacklist"""
+        ...  # pragma: no cover
+
+    async def enlist(self, token_id: str, expires_at: int | None = None):
+        """Enlist a token id until the token expires."""
+        ...  # pragma: no cover
+
+    async def forget(self, token_id: str):
+        """Forget a token id."""
+        ...  # pragma: no cover
+
+
+class TokenWatermarkManager(Protocol):
+    """Protocol for per-user "tokens issued before T are invalid" watermarks."""
+
+    async def get_watermarks(self, user_ids: Sequence[Any]) -> list[float | None]:
+        """Return the watermark timestamp of every user, None if not set"""
+        ...  # pragma: no cover
+
+
+class TokenFamilyManager(Protocol):
+    """Protocol for refresh token families, only the latest token is valid."""
+
+    async def start(self, family_id: str, token_id: str, ttl_seconds: int | None):
+        """Start a family with its first token."""
         ...  # pragma: no cover
 
-    async def enlist(self, encoded_token: str):
-        """Enlist a token."""
+    async def check_tokens(self, tokens: Sequence[tuple[str, str]]) -> list[bool]:
+        """Check (family id, token id) pairs, True for valid tokens"""
+        ...  # pragma: no cover
+
+    async def rotate(
+        self, family_id: str, token_id: str, new_token_id: str, ttl_seconds: int | None
+    ) -> bool:
+        """Replace the valid token of a family, False if it was already replaced"""
         ...  # pragma: no cover
 
-    async def forget(self, encoded_token: str):
-        """Forget a token."""
+    async def revoke(self, family_id: str):
+        """Revoke every token of a family."""
         ...  # pragma: no cover
@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Protocol, Sequence
 
 from db import models_protocol
 from managers.user import BaseUserManager
@@ -8,6 +8,10 @@ class StrategyDestroyNotSupportedError(Exception):
     pass
 
 
+class StrategyRotateNotSupportedError(Exception):
+    pass
+
+
 class Strategy(Protocol[models_protocol.UP, models_protocol.SIHE]):
     async def read_token(
         self,
@@ -21,22 +25,44 @@ class Strategy(Protocol[models_protocol.UP, models_protocol.SIHE]):
     ) -> models_protocol.UP | None:
         ...
 
+    async def read_tokens(
+        self,
+        tokens: Sequence[str],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> list[models_protocol.UP | None]:
+        """Read a batch of tokens, one user or None per token."""
+        return [await self.read_token(token, user_manager) for token in tokens]
+
     async def write_token(self, user: models_protocol.UP) -> str:
         ...
 
     async def destroy_token(self, token: str, user: models_protocol.UP) -> None:
         ...
 
+    async def rotate_token(self, token: str, user: models_protocol.UP) -> str | None:
+        """
+        Replace a valid token by a new one, invalidating the old token.
+
+        :return: The new token, None if the token was already rotated.
+        :raises StrategyRotateNotSupportedError: The strategy can't rotate tokens.
+        """
+        raise StrategyRotateNotSupportedError()
+
 
 class TokenBlacklistStorage(Protocol):
-    async def add_to_set(self, set_name: str, value: str):
+    async def add(self, token_id: str, ttl_seconds: int | None = None):
         ...
 
-    async def is_in_set(self, set_name: str, value: str) -> bool:
+    async def exists(self, token_id: str) -> bool:
         ...
 
-    async def destroy_set(self, set_name: str):
+    async def exist_many(self, token_ids: Sequence[str]) -> list[bool]:
         ...
 
-    async def remove_from_set(self, set_name: str, value: str):
+    async def remove(self, token_id: str):
         ...
@@ -1,83 +1,359 @@
+import asyncio
 import datetime
+import hashlib
+import logging
+import math
+import time
 from functools import lru_cache
+from typing import AsyncIterator, Sequence
+
+from prometheus_client import Counter, Gauge
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
 
 from authentication.strategy.adapter import TokenBlacklistManager
 from authentication.strategy.base import TokenBlacklistStorage
 from cache import redis
+from core import metrics
+from core.config import settings
+
+LEGACY_DATE_FORMAT = '%Y-%m-%d'
+
+BLOOM_LOOKUPS = Counter(
+    "token_blacklist_bloom_lookups_total",
+    "Blacklist lookups answered by the Bloom filter (negative) or by Redis (maybe)",
+    ["blacklist", "result"],
+    registry=metrics.registry,
+)
+BLOOM_FALSE_POSITIVES = Counter(
+    "token_blacklist_bloom_false_positives_total",
+    "Bloom filter hits that Redis reported as not revoked",
+    ["blacklist"],
+    registry=metrics.registry,
+)
+BLOOM_FALSE_POSITIVE_RATE = Gauge(
+    "token_blacklist_bloom_false_positive_rate",
+    "Estimated false positive rate of the Bloom filter",
+    ["blacklist"],
+    registry=metrics.registry,
+)
+BLOOM_MEMORY = Gauge(
+    "token_blacklist_bloom_memory_bytes",
+    "Memory used by the Bloom filter bit array",
+    ["blacklist"],
+    registry=metrics.registry,
+)
+BLOOM_ITEMS = Gauge(
+    "token_blacklist_bloom_items",
+    "Token ids added to the Bloom filter",
+    ["blacklist"],
+    registry=metrics.registry,
+)
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives.
+
+    :param capacity: Expected number of items.
+    :param error_rate: False positive rate at `capacity` items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Estimated false positive rate for the items added so far."""
+        return (
+            1 - math.exp(-self.hash_count * self.count / self.size)
+        ) ** self.hash_count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
 
 
 class TokenBlacklistRedisStorage(TokenBlacklistStorage):
     def __init__(self, redis: redis.RedisClient, name: str):
         self._client = redis
         self._name = name
+        self.channel = f'{name}:revoked'
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def get_key(self, token_id: str) -> str:
+        return f'{self._name}:{token_id}'
 
-    def get_setname(self, name):
-        return f'{self._name}_{name}'
+    async def add(self, token_id: str, ttl_seconds: int | None = None):
+        if not isinstance(token_id, (str)):
+            raise TypeError(f"Expected str value for key, but have {type(token_id)}")
+        await self._client.set(self.get_key(token_id), 1, ex=ttl_seconds)
 
-    async def add_to_set(self, set_name: str, value: str):
-        if not isinstance(value, (str)):
-            raise TypeError(f"Expected str value for key, but have {type(value)}")
-        await self._client.sadd(self.get_setname(set_name), value)
+    async def exists(self, token_id: str) -> bool:
+        if not isinstance(token_id, (str)):
+            raise TypeError(f"Expected str value for key, but have {type(token_id)}")
+        return bool(await self._client.exists(self.get_key(token_id)))
 
-    async def is_in_set(self, set_name: str, value: str) -> bool:
-        if not isinstance(value, (str)):
-            raise TypeError(f"Expected str value for key, but have {type(value)}")
-        return bool(await self._client.sismember(self.get_setname(set_name), value))
+    async def exist_many(self, token_ids: Sequence[str]) -> list[bool]:
+        """Check which token ids exist with one round trip"""
+        async with self._client.pipeline(transaction=False) as pipe:
+            for token_id in token_ids:
+                pipe.exists(self.get_key(token_id))
+            results = await pipe.execute()
+        return [bool(result) for result in results]
 
-    async def destroy_set(self, set_name: str):
-        await self._client.unlink(self.get_setname(set_name))
+    async def remove(self, token_id: str):
+        if not isinstance(token_id, (str)):
+            raise TypeError(f"Expected str value for key, but have {type(token_id)}")
+        await self._client.unlink(self.get_key(token_id))
 
-    async def remove_from_set(self, set_name: str, value: str):
-        if not isinstance(value, (str)):
-            raise TypeError(f"Expected str value for key, but have {type(value)}")
-        await self._client.srem(self.get_setname(set_name), value)
+    async def exist_in_legacy_sets(
+        self, tokens: Sequence[str], days: Sequence[str]
+    ) -> list[bool]:
+        """Check encoded tokens in the `<name>_<day>` sets with one round trip"""
+        async with self._client.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                for day in days:
+                    pipe.sismember(f'{self._name}_{day}', token)
+            results = await pipe.execute()
+        return [
+            any(results[i * len(days) : (i + 1) * len(days)])
+            for i in range(len(tokens))
+        ]
+
+    def pubsub(self) -> PubSub:
+        return self._client.pubsub()
+
+    async def publish(self, token_id: str):
+        await self._client.publish(self.channel, token_id)
+
+    async def scan(self) -> AsyncIterator[str]:
+        """Iterate over all stored token ids"""
+        prefix_length = len(self._name) + 1
+        async for key in self._client.scan_iter(match=f'{self._name}:*', count=1000):
+            yield (key.decode() if isinstance(key, bytes) else key)[prefix_length:]
 
 
 class TokenBlackListRedisManager(TokenBlacklistManager):
-    def __init__(self, storage: TokenBlacklistRedisStorage):
-        self.storage = storage
-        self._date_format = '%Y-%m-%d'
+    """
+    Blacklist of revoked token ids (`jti`).
 
-    def _get_yesterday_str(self):
-        return (datetime.datetime.now() - datetime.timedelta(days=1)).strftime(
-            self._date_format
-        )
+    Each revoked id is a separate key living until the token expires,
+    so the blacklist never outgrows the set of still valid tokens.
 
-    def _get_today_str(self):
-        return datetime.datetime.now().strftime(self._date_format)
+    With a Bloom filter, ids the filter has never seen are answered
+    in process. The filter is kept in sync by `sync()`: it is rebuilt from
+    the stored ids every `rebuild_interval` seconds and receives ids revoked
+    by other workers through pub/sub meanwhile. Until the first rebuild,
+    and whenever the subscription is lost, every lookup goes to Redis.
+    """
 
-    async def check_token(self, encoded_token: str | None) -> bool:
-        """Check if token in today's and yesterday's blacklist"""
-        if not encoded_token:
+    def __init__(
+        self,
+        storage: TokenBlacklistRedisStorage,
+        bloom: BloomFilter | None = None,
+        rebuild_interval: float = 300,
+    ):
+        self.storage = storage
+        self.bloom = bloom
+        self.rebuild_interval = rebuild_interval
+        self.bloom_ready = False
+        self._pending_ids: list[str] | None = None
+        self._sync_task: asyncio.Task | None = None
+        if bloom is not None:
+            self._register_metrics()
+
+    async def check_token(self, token_id: str | None) -> bool:
+        """Check if token id is in blacklist"""
+        if not token_id:
             return False
-        in_yesterday_list = await self.storage.is_in_set(
-            self._get_yesterday_str(), encoded_token
-        )
-        in_today_list = await self.storage.is_in_set(
-            self._get_today_str(), encoded_token
-        )
-        return in_yesterday_list or in_today_list
+        if not self._may_contain(token_id):
+            return False
+        revoked = await self.storage.exists(token_id)
+        self._count_false_positives([revoked])
+        return revoked
+
+    async def check_tokens(self, token_ids: Sequence[str]) -> list[bool]:
+        """Check a batch of token ids in blacklist"""
+        maybe_revoked = [i for i, id_ in enumerate(token_ids) if self._may_contain(id_)]
+        result = [False] * len(token_ids)
+        if not maybe_revoked:
+            return result
+        revoked = await self.storage.exist_many([token_ids[i] for i in maybe_revoked])
+        self._count_false_positives(revoked)
+        for i, is_revoked in zip(maybe_revoked, revoked):
+            result[i] = is_revoked
+        return result
+
+    async def check_legacy_tokens(self, tokens: Sequence[str]) -> list[bool]:
+        """
+        Check encoded tokens in the day sets of the previous blacklist.
+
+        Tokens issued before `jti` were revoked into `<name>_<YYYY-MM-DD>`
+        sets, today's and yesterday's were checked. Only these tokens can be
+        there, so the lookup stops once they have expired.
+        """
+        if not tokens:
+            return []
+        now = datetime.datetime.now()
+        days = [
+            (now - datetime.timedelta(days=days)).strftime(LEGACY_DATE_FORMAT)
+            for days in (0, 1)
+        ]
+        return await self.storage.exist_in_legacy_sets(tokens, days)
+
+    async def enlist(self, token_id: str, expires_at: int | None = None):
+        """Add a token id to blacklist until the token expires."""
+        ttl_seconds = None
+        if expires_at is not None:
+            ttl_seconds = int(expires_at - time.time()) + 1
+            if ttl_seconds <= 0:
+                return
+        await self.storage.add(token_id, ttl_seconds)
+        if self.bloom is not None:
+            self._add_to_bloom(token_id)
+            await self.storage.publish(token_id)
+
+    async def forget(self, token_id: str):
+        """Delete a token id from blacklist"""
+        await self.storage.remove(token_id)
 
-    async def enlist(self, token: str):
-        """Add a token to today's blacklist."""
-        await self.storage.add_to_set(self._get_today_str(), token)
+    def start_sync(self) -> None:
+        """Run `sync()` in background."""
+        if self.bloom is not None and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self.sync())
 
-    async def destroy(self, name: str | None = None):
-        """Forget older blacklist"""
-        day_before_yesterday = (
-            datetime.datetime.now() - datetime.timedelta(days=2)
-        ).strftime(self._date_format)
-        setname = day_before_yesterday if not name else name
-        await self.storage.destroy_set(setname)
+    async def stop_sync(self) -> None:
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
 
-    async def forget(self, token: str):
-        """Delete a token from today's blacklist"""
-        await self.storage.remove_from_set(self._get_today_str(), token)
-        await self.storage.remove_from_set(self._get_yesterday_str(), token)
+    async def sync(self) -> None:
+        """Keep the Bloom filter in sync with Redis until cancelled."""
+        while True:
+            try:
+                await self._sync()
+            except (RedisError, OSError) as e:
+                logging.warning("Token blacklist sync failed: %s", e)
+            finally:
+                self.bloom_ready = False
+            await asyncio.sleep(1)
+
+    async def _sync(self) -> None:
+        async with self.storage.pubsub() as pubsub:
+            await pubsub.subscribe(self.storage.channel)
+            while True:
+                # Подписка оформлена до сканирования, поэтому id, отозванные
+                # во время пересборки, придут сообщением и не потеряются
+                await self._rebuild()
+                self.bloom_ready = True
+                rebuild_at = time.monotonic() + self.rebuild_interval
+                while time.monotonic() < rebuild_at:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        data = message["data"]
+                        self._add_to_bloom(
+                            data.decode() if isinstance(data, bytes) else data
+                        )
+
+    async def _rebuild(self) -> None:
+        assert self.bloom is not None
+        token_ids = []
+        self._pending_ids = []
+        try:
+            async for token_id in self.storage.scan():
+                token_ids.append(token_id)
+            bloom = BloomFilter(
+                max(self.bloom.capacity, 2 * len(token_ids)), self.bloom.error_rate
+            )
+            for token_id in token_ids:
+                bloom.add(token_id)
+            for token_id in self._pending_ids:
+                bloom.add(token_id)
+        finally:
+            self._pending_ids = None
+        self.bloom = bloom
+
+    def _add_to_bloom(self, token_id: str) -> None:
+        assert self.bloom is not None
+        self.bloom.add(token_id)
+        if self._pending_ids is not None:
+            self._pending_ids.append(token_id)
+
+    def _may_contain(self, token_id: str) -> bool:
+        if self.bloom is None or not self.bloom_ready:
+            return True
+        if token_id in self.bloom:
+            BLOOM_LOOKUPS.labels(blacklist=self.storage.name, result="maybe").inc()
+            return True
+        BLOOM_LOOKUPS.labels(blacklist=self.storage.name, result="negative").inc()
+        return False
+
+    def _count_false_positives(self, revoked: Sequence[bool]) -> None:
+        if self.bloom is not None and self.bloom_ready:
+            false_positives = revoked.count(False)
+            if false_positives:
+                BLOOM_FALSE_POSITIVES.labels(blacklist=self.storage.name).inc(
+                    false_positives
+                )
+
+    def _register_metrics(self) -> None:
+        name = self.storage.name
+        BLOOM_FALSE_POSITIVE_RATE.labels(blacklist=name).set_function(
+            lambda: self.bloom.false_positive_rate if self.bloom else 0
+        )
+        BLOOM_MEMORY.labels(blacklist=name).set_function(
+            lambda: self.bloom.memory_bytes if self.bloom else 0
+        )
+        BLOOM_ITEMS.labels(blacklist=name).set_function(
+            lambda: self.bloom.count if self.bloom else 0
+        )
 
 
 @lru_cache
-def get_manager(name: str) -> TokenBlacklistManager:
+def get_manager(name: str) -> TokenBlackListRedisManager:
     redis_manager = redis.get_manager()
     storage = TokenBlacklistRedisStorage(redis_manager.get_client(), name)
-    return TokenBlackListRedisManager(storage)
+    bloom = None
+    if settings.token_blacklist_bloom_capacity:
+        bloom = BloomFilter(
+            settings.token_blacklist_bloom_capacity,
+            settings.token_blacklist_bloom_error_rate,
+        )
+    return TokenBlackListRedisManager(
+        storage, bloom, settings.token_blacklist_bloom_rebuild_seconds
+    )
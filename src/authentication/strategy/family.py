@@ -0,0 +1,104 @@
+import logging
+from functools import lru_cache
+from typing import Sequence
+
+from redis.exceptions import WatchError
+
+from authentication.strategy.adapter import TokenFamilyManager
+from cache import redis
+
+REVOKED = "revoked"
+
+
+class TokenFamilyRedisStorage:
+    """One key per family holding the id of its only valid token."""
+
+    def __init__(self, redis: redis.RedisClient, name: str):
+        self._client = redis
+        self._name = name
+
+    def get_key(self, family_id: str) -> str:
+        return f'{self._name}:{family_id}'
+
+    async def set(self, family_id: str, token_id: str, ttl_seconds: int | None):
+        await self._client.set(self.get_key(family_id), token_id, ex=ttl_seconds)
+
+    async def get_many(self, family_ids: Sequence[str]) -> list[str | None]:
+        values = await self._client.mget([self.get_key(id_) for id_ in family_ids])
+        return [value.decode() if value is not None else None for value in values]
+
+    async def compare_and_set(
+        self, family_id: str, expected: str, token_id: str, ttl_seconds: int | None
+    ) -> bool:
+        """Replace the token id if it is still `expected`."""
+        key = self.get_key(family_id)
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = await pipe.get(key)
+                if current is None or current.decode() != expected:
+                    return False
+                pipe.multi()
+                pipe.set(key, token_id, ex=ttl_seconds)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def revoke(self, family_id: str):
+        await self._client.set(self.get_key(family_id), REVOKED, keepttl=True, xx=True)
+
+
+class TokenFamilyRedisManager(TokenFamilyManager):
+    """
+    Refresh token families.
+
+    Every refresh rotates the token, only the latest token of a family is
+    valid. Presenting any other token of the family means it was stolen
+    or replayed, so the whole family is revoked. The state is a key per
+    family living as long as its latest token, not a key per issued token.
+    """
+
+    def __init__(self, storage: TokenFamilyRedisStorage):
+        self.storage = storage
+
+    async def start(self, family_id: str, token_id: str, ttl_seconds: int | None):
+        """Start a family with its first token."""
+        await self.storage.set(family_id, token_id, ttl_seconds)
+
+    async def check_tokens(self, tokens: Sequence[tuple[str, str]]) -> list[bool]:
+        """
+        Check (family id, token id) pairs, revoking the families of replayed tokens.
+
+        :return: True for every token that is still valid.
+        """
+        if not tokens:
+            return []
+        current_ids = await self.storage.get_many([family for family, _ in tokens])
+        result = []
+        for (family_id, token_id), current_id in zip(tokens, current_ids):
+            if current_id not in (None, REVOKED, token_id):
+                logging.warning("Refresh token replay, family %s revoked" % family_id)
+                await self.storage.revoke(family_id)
+            result.append(current_id == token_id)
+        return result
+
+    async def rotate(
+        self, family_id: str, token_id: str, new_token_id: str, ttl_seconds: int | None
+    ) -> bool:
+        """Make `new_token_id` the only valid token of the family."""
+        if await self.storage.compare_and_set(
+            family_id, token_id, new_token_id, ttl_seconds
+        ):
+            return True
+        await self.storage.revoke(family_id)
+        return False
+
+    async def revoke(self, family_id: str):
+        await self.storage.revoke(family_id)
+
+
+@lru_cache
+def get_family_manager(name: str) -> TokenFamilyRedisManager:
+    storage = TokenFamilyRedisStorage(redis.get_manager().get_client(), name)
+    return TokenFamilyRedisManager(storage)
@@ -1,15 +1,34 @@
+import hashlib
 import logging
-from typing import Generic
+import time
+import uuid
+from typing import Any, Generic, Sequence, cast
 
 import jwt
 
 import core.exceptions as exceptions
+from authentication.strategy.adapter import TokenFamilyManager, TokenWatermarkManager
 from authentication.strategy.base import Strategy, StrategyDestroyNotSupportedError
 from authentication.strategy.blacklist import TokenBlacklistManager
-from core.jwt_utils import SecretType, decode_jwt, generate_jwt
+from authentication.strategy.models import PRINCIPAL_CLAIMS, TokenPrincipal
+from cache.lru import LRUCache
+from core.jwt_keys import KeyRing
+from core.jwt_utils import SecretType, decode_jwt, generate_jwt, key_registry
 from db import models_protocol
 from managers.user import BaseUserManager
 
+ParsedToken = tuple[Any, dict[str, Any]]
+
+
+def get_token_id(token: str, data: dict[str, Any]) -> str:
+    """Return the `jti` of a token, or a digest of tokens issued without one."""
+    return data.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+def _issued_before(data: dict[str, Any], watermark: float | None) -> bool:
+    """Tokens issued without `iat` are treated as issued before any watermark."""
+    return watermark is not None and data.get("iat", 0) < watermark
+
 
 class JWTStrategy(
     Strategy[models_protocol.UP, models_protocol.SIHE],
@@ -22,12 +41,20 @@ class JWTStrategy(
         token_audience: list[str] = ["movix:auth"],
         algorithm: str = "HS256",
         public_key: SecretType | None = None,
+        stateless: bool = False,
+        keyring: KeyRing | None = None,
+        decode_cache: LRUCache[dict[str, Any]] | None = None,
     ):
         self.secret = secret
         self.lifetime_seconds = lifetime_seconds
         self.token_audience = token_audience
         self.algorithm = algorithm
         self.public_key = public_key
+        self.stateless = stateless
+        self.keyring = keyring
+        self.decode_cache = decode_cache
+        self._encode_key = key_registry.get(self.encode_key, algorithm)
+        self._decode_key = key_registry.get(self.decode_key, algorithm)
 
     @property
     def encode_key(self) -> SecretType:
@@ -50,27 +77,83 @@ class JWTStrategy(
         if token is None:
             return None
 
-        try:
-            data = decode_jwt(
-                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
-            )
-            user_id = data.get("sub")
-            if user_id is None:
-                return None
-        except jwt.PyJWTError as e:
-            logging.warning(e)
+        parsed = self._parse_token(token, user_manager)
+        if parsed is None:
+            return None
+        user_id, data = parsed
+        if (await self._get_revoked([token], [parsed]))[0]:
             return None
+        if self._has_principal(data):
+            return self._get_principal(user_id, data)
 
         try:
-            parsed_id = user_manager.parse_id(user_id)
-            return await user_manager.get(parsed_id)
-        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return await user_manager.get(user_id)
+        except exceptions.UserNotExists:
             return None
 
+    async def read_tokens(
+        self,
+        tokens: Sequence[str],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> list[models_protocol.UP | None]:
+        """Read a batch of tokens, loading their users with a single query."""
+        parsed_tokens = await self._parse_valid_tokens(tokens, user_manager)
+        users = await self._get_users(parsed_tokens, user_manager)
+
+        result: list[models_protocol.UP | None] = []
+        for parsed in parsed_tokens:
+            if parsed is None:
+                result.append(None)
+                continue
+            user_id, data = parsed
+            if self._has_principal(data):
+                result.append(self._get_principal(user_id, data))
+            else:
+                result.append(users.get(user_id))
+        return result
+
     async def write_token(self, user: models_protocol.UP) -> str:
-        data = {"sub": str(user.id), "aud": self.token_audience}
-        return generate_jwt(
-            data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm
+        return self._sign(self._get_claims(user))
+
+    def decode_token(self, token: str) -> dict[str, Any]:
+        """
+        Verify a token and return its claims.
+
+        With a key ring, the verification key is picked by the `kid` header.
+        With a decode cache, verified claims are reused until the token expires.
+
+        :raises jwt.PyJWTError: The token is invalid or expired.
+        """
+        if self.decode_cache is None:
+            return self._decode_token(token)
+
+        digest = hashlib.sha256(token.encode()).digest()
+        data = self.decode_cache.get(digest)
+        if data is None:
+            data = self._decode_token(token)
+            if "exp" in data:
+                self.decode_cache.set(digest, data, expires_at=data["exp"])
+        return data
+
+    def _decode_token(self, token: str) -> dict[str, Any]:
+        if not self.keyring:
+            return decode_jwt(
+                token,
+                self._decode_key,
+                self.token_audience,
+                algorithms=[self.algorithm],
+            )
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keyring.verification_key(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key: {kid}")
+        return decode_jwt(
+            token, key.verifying_key, self.token_audience, algorithms=[key.algorithm]
         )
 
     async def destroy_token(self, token: str, user: models_protocol.UP) -> None:
@@ -78,11 +161,133 @@ class JWTStrategy(
             "A JWT can't be invalidated: it's valid until it expires."
         )
 
+    def _parse_token(
+        self,
+        token: str,
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> ParsedToken | None:
+        """Return the parsed user id and the claims of a valid token."""
+        try:
+            data = self.decode_token(token)
+        except jwt.PyJWTError as e:
+            logging.warning(e)
+            return None
+
+        user_id = data.get("sub")
+        if user_id is None:
+            return None
+        try:
+            return user_manager.parse_id(user_id), data
+        except exceptions.InvalidID:
+            return None
+
+    async def _parse_valid_tokens(
+        self,
+        tokens: Sequence[str],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> list[ParsedToken | None]:
+        """Parse a batch of tokens, None for the invalid and revoked ones."""
+        parsed_tokens = [self._parse_token(token, user_manager) for token in tokens]
+        valid = [i for i, parsed in enumerate(parsed_tokens) if parsed is not None]
+        revoked = await self._get_revoked(
+            [tokens[i] for i in valid],
+            [cast(ParsedToken, parsed_tokens[i]) for i in valid],
+        )
+        for i, is_revoked in zip(valid, revoked):
+            if is_revoked:
+                parsed_tokens[i] = None
+        return parsed_tokens
+
+    async def _get_users(
+        self,
+        parsed_tokens: Sequence[ParsedToken | None],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> dict[Any, models_protocol.UP]:
+        """Load the users of the tokens without a principal by id."""
+        lookup_ids = {
+            parsed[0]
+            for parsed in parsed_tokens
+            if parsed and not self._has_principal(parsed[1])
+        }
+        if not lookup_ids:
+            return {}
+        try:
+            return {
+                user.id: user for user in await user_manager.get_multiple(lookup_ids)
+            }
+        except exceptions.UserNotExists:
+            return {}
+
+    def _get_claims(self, user: models_protocol.UP) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "sub": str(user.id),
+            "aud": self.token_audience,
+            "jti": uuid.uuid4().hex,
+            "iat": time.time(),
+        }
+        if self.stateless:
+            data.update(
+                {claim: bool(getattr(user, claim, False)) for claim in PRINCIPAL_CLAIMS}
+            )
+        return data
+
+    def _sign(self, data: dict[str, Any]) -> str:
+        if self.keyring:
+            key = self.keyring.signing_key()
+            return generate_jwt(
+                data,
+                key.signing_key,
+                self.lifetime_seconds,
+                algorithm=key.algorithm,
+                headers={"kid": key.kid},
+            )
+        return generate_jwt(
+            data, self._encode_key, self.lifetime_seconds, algorithm=self.algorithm
+        )
+
+    async def _get_revoked(
+        self, tokens: Sequence[str], parsed_tokens: Sequence[ParsedToken]
+    ) -> list[bool]:
+        """Tell which of the valid tokens are revoked."""
+        return [False] * len(tokens)
+
+    def _has_principal(self, data: dict[str, Any]) -> bool:
+        return self.stateless and all(claim in data for claim in PRINCIPAL_CLAIMS)
+
+    def _get_principal(self, user_id: Any, data: dict[str, Any]) -> models_protocol.UP:
+        """Build the user snapshot signed into a stateless token."""
+        flags = {claim: bool(data[claim]) for claim in PRINCIPAL_CLAIMS}
+        return cast(models_protocol.UP, TokenPrincipal(id=user_id, **flags))
+
 
 class JWTBlacklistStrategy(
     JWTStrategy[models_protocol.UP, models_protocol.SIHE],
     Generic[models_protocol.UP, models_protocol.SIHE],
 ):
+    """
+    JWT strategy with server-side revocation.
+
+    :param blacklist_manager: Revoked token ids.
+    :param session_manager: Per-user watermarks revoking every older token.
+    :param family_manager: Token families: tokens are rotated instead of
+    reused and logging out revokes the whole family.
+    """
+
     def __init__(
         self,
         secret: SecretType,
@@ -91,27 +296,142 @@ class JWTBlacklistStrategy(
         algorithm: str = "HS256",
         public_key: SecretType | None = None,
         blacklist_manager: TokenBlacklistManager | None = None,
+        stateless: bool = False,
+        keyring: KeyRing | None = None,
+        decode_cache: LRUCache[dict[str, Any]] | None = None,
+        session_manager: TokenWatermarkManager | None = None,
+        family_manager: TokenFamilyManager | None = None,
     ):
         self.blacklist_manager = blacklist_manager
+        self.session_manager = session_manager
+        self.family_manager = family_manager
         super().__init__(
-            secret, lifetime_seconds, token_audience, algorithm, public_key
+            secret,
+            lifetime_seconds,
+            token_audience,
+            algorithm,
+            public_key,
+            stateless=stateless,
+            keyring=keyring,
+            decode_cache=decode_cache,
         )
 
-    async def read_token(
-        self,
-        token: str | None,
-        user_manager: BaseUserManager[
-            models_protocol.UP,
-            models_protocol.SIHE,
-            models_protocol.OAP,
-            models_protocol.UOAP,
-        ],
-    ) -> models_protocol.UP | None:
-        if self.blacklist_manager and await self.blacklist_manager.check_token(token):
+    async def write_token(self, user: models_protocol.UP) -> str:
+        data = self._get_claims(user)
+        if self.family_manager:
+            data["fam"] = uuid.uuid4().hex
+            await self.family_manager.start(
+                data["fam"], data["jti"], self.lifetime_seconds
+            )
+        return self._sign(data)
+
+    async def rotate_token(self, token: str, user: models_protocol.UP) -> str | None:
+        if not self.family_manager:
+            return await super().rotate_token(token, user)
+
+        try:
+            old_data = self.decode_token(token)
+        except jwt.PyJWTError as e:
+            logging.warning(e)
             return None
-        return await super().read_token(token, user_manager)
+        family_id = old_data.get("fam")
+        if family_id is None:
+            # Токен выпущен до включения ротации: начинаем для него новое семейство
+            if self.blacklist_manager:
+                await self.blacklist_manager.enlist(
+                    get_token_id(token, old_data), old_data.get("exp")
+                )
+            return await self.write_token(user)
+
+        data = self._get_claims(user)
+        data["fam"] = family_id
+        if not await self.family_manager.rotate(
+            family_id, old_data.get("jti", ""), data["jti"], self.lifetime_seconds
+        ):
+            return None
+        return self._sign(data)
+
+    async def _get_revoked(
+        self, tokens: Sequence[str], parsed_tokens: Sequence[ParsedToken]
+    ) -> list[bool]:
+        revoked = await super()._get_revoked(tokens, parsed_tokens)
+        if self.session_manager:
+            watermarks = await self.session_manager.get_watermarks(
+                [user_id for user_id, _ in parsed_tokens]
+            )
+            revoked = [
+                is_revoked or _issued_before(data, watermark)
+                for is_revoked, (_, data), watermark in zip(
+                    revoked, parsed_tokens, watermarks
+                )
+            ]
+
+        family_tokens: list[int] = []
+        if self.family_manager:
+            family_tokens = [
+                i
+                for i, (_, data) in enumerate(parsed_tokens)
+                if not revoked[i] and "fam" in data
+            ]
+            valid = await self.family_manager.check_tokens(
+                [
+                    (parsed_tokens[i][1]["fam"], parsed_tokens[i][1].get("jti", ""))
+                    for i in family_tokens
+                ]
+            )
+            for i, is_valid in zip(family_tokens, valid):
+                revoked[i] = not is_valid
 
-    async def destroy_token(self, token: str, user: models_protocol.UP) -> None:
         if self.blacklist_manager:
-            await self.blacklist_manager.enlist(token)
+            skipped = set(family_tokens)
+            unknown = [
+                i
+                for i, is_revoked in enumerate(revoked)
+                if not is_revoked and i not in skipped
+            ]
+            blacklisted = await self._get_blacklisted(
+                [tokens[i] for i in unknown], [parsed_tokens[i] for i in unknown]
+            )
+            for i, is_blacklisted in zip(unknown, blacklisted):
+                revoked[i] = is_blacklisted
+        return revoked
+
+    async def _get_blacklisted(
+        self, tokens: Sequence[str], parsed_tokens: Sequence[ParsedToken]
+    ) -> list[bool]:
+        assert self.blacklist_manager is not None
+        blacklisted = await self.blacklist_manager.check_tokens(
+            [
+                get_token_id(token, data)
+                for token, (_, data) in zip(tokens, parsed_tokens)
+            ]
+        )
+        # Токены без jti выпущены до блэклиста по jti: их могли отозвать
+        # в дневные множества прежнего формата
+        legacy = [
+            i
+            for i, (_, data) in enumerate(parsed_tokens)
+            if not blacklisted[i] and "jti" not in data
+        ]
+        if legacy:
+            revoked = await self.blacklist_manager.check_legacy_tokens(
+                [tokens[i] for i in legacy]
+            )
+            for i, is_revoked in zip(legacy, revoked):
+                blacklisted[i] = is_revoked
+        return blacklisted
+
+    async def destroy_token(self, token: str, user: models_protocol.UP) -> None:
+        if self.blacklist_manager or self.family_manager:
+            try:
+                data = self.decode_token(token)
+            except jwt.PyJWTError as e:
+                logging.warning(e)
+            else:
+                if self.family_manager and "fam" in data:
+                    await self.family_manager.revoke(data["fam"])
+                elif self.blacklist_manager:
+                    await self.blacklist_manager.enlist(
+                        get_token_id(token, data), data.get("exp")
+                    )
         return await super().destroy_token(token, user)
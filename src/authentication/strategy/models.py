@@ -1,8 +1,11 @@
+import dataclasses
 import datetime
-from typing import Protocol
+from typing import Generic, Protocol
 
 from db import models_protocol
 
+PRINCIPAL_CLAIMS = ("is_active", "is_superuser", "is_admin", "is_verified")
+
 
 class AccessTokenProtocol(Protocol[models_protocol.ID]):
     """Access token protocol that ORM model should follow."""
@@ -10,3 +13,19 @@ class AccessTokenProtocol(Protocol[models_protocol.ID]):
     token: str
     user_id: models_protocol.ID
     created_at: datetime.datetime
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenPrincipal(Generic[models_protocol.ID]):
+    """
+    Snapshot of a user restored from the claims of a self-contained token.
+
+    Carries only the fields the authenticator checks, so routes that need
+    the full user profile have to load it through the user manager.
+    """
+
+    id: models_protocol.ID
+    is_active: bool = True
+    is_superuser: bool = False
+    is_admin: bool = False
+    is_verified: bool = False
@@ -0,0 +1,132 @@
+import secrets
+import time
+from typing import Any, Generic, Sequence, cast
+
+import core.exceptions as exceptions
+from authentication.strategy.adapter import TokenWatermarkManager
+from authentication.strategy.base import Strategy
+from authentication.strategy.models import PRINCIPAL_CLAIMS, TokenPrincipal
+from cache import redis
+from db import models_protocol
+from managers.user import BaseUserManager
+
+
+class RedisStrategy(
+    Strategy[models_protocol.UP, models_protocol.SIHE],
+    Generic[models_protocol.UP, models_protocol.SIHE],
+):
+    """
+    Opaque reference tokens.
+
+    A token is a random string naming a Redis hash with the principal of
+    the session, so reading it is a single HGETALL without signature checks
+    or user lookups, and revoking it is a single DEL. Like stateless JWTs,
+    the principal is a snapshot taken at login.
+
+    :param session_manager: Per-user watermarks revoking every older session.
+    """
+
+    def __init__(
+        self,
+        redis: redis.RedisClient,
+        lifetime_seconds: int | None = None,
+        key_prefix: str = "session:",
+        token_bytes: int = 24,
+        session_manager: TokenWatermarkManager | None = None,
+    ):
+        self.redis = redis
+        self.lifetime_seconds = lifetime_seconds
+        self.key_prefix = key_prefix
+        self.token_bytes = token_bytes
+        self.session_manager = session_manager
+
+    def get_key(self, token: str) -> str:
+        return f"{self.key_prefix}{token}"
+
+    async def read_token(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> models_protocol.UP | None:
+        if token is None:
+            return None
+        session = await self.redis.hgetall(self.get_key(token))
+        return (await self._get_principals([session], user_manager))[0]
+
+    async def read_tokens(
+        self,
+        tokens: Sequence[str],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> list[models_protocol.UP | None]:
+        """Read a batch of tokens with one round trip."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                pipe.hgetall(self.get_key(token))
+            sessions = await pipe.execute()
+        return await self._get_principals(sessions, user_manager)
+
+    async def write_token(self, user: models_protocol.UP) -> str:
+        token = secrets.token_urlsafe(self.token_bytes)
+        session = {
+            "sub": str(user.id),
+            "iat": repr(time.time()),
+            **{
+                claim: int(bool(getattr(user, claim, False)))
+                for claim in PRINCIPAL_CLAIMS
+            },
+        }
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.get_key(token), mapping=session)  # type: ignore
+            if self.lifetime_seconds:
+                pipe.expire(self.get_key(token), self.lifetime_seconds)
+            await pipe.execute()
+        return token
+
+    async def destroy_token(self, token: str, user: models_protocol.UP) -> None:
+        await self.redis.delete(self.get_key(token))
+
+    async def _get_principals(
+        self,
+        sessions: Sequence[dict[bytes, bytes]],
+        user_manager: BaseUserManager[
+            models_protocol.UP,
+            models_protocol.SIHE,
+            models_protocol.OAP,
+            models_protocol.UOAP,
+        ],
+    ) -> list[models_protocol.UP | None]:
+        principals: list[Any] = []
+        for session in sessions:
+            data = {key.decode(): value.decode() for key, value in session.items()}
+            try:
+                user_id = user_manager.parse_id(data["sub"])
+            except (KeyError, exceptions.InvalidID):
+                principals.append(None)
+                continue
+            flags = {claim: data.get(claim) == "1" for claim in PRINCIPAL_CLAIMS}
+            principals.append((TokenPrincipal(id=user_id, **flags), data))
+
+        valid = [i for i, principal in enumerate(principals) if principal]
+        if self.session_manager is not None and valid:
+            watermarks = await self.session_manager.get_watermarks(
+                [principals[i][0].id for i in valid]
+            )
+            for i, watermark in zip(valid, watermarks):
+                issued_at = float(principals[i][1].get("iat", 0))
+                if watermark is not None and issued_at < watermark:
+                    principals[i] = None
+
+        return [
+            cast(models_protocol.UP, principal[0]) if principal else None
+            for principal in principals
+        ]
@@ -1,11 +1,21 @@
-from authentication.transport.base import Transport, TransportLogoutNotSupportedError
-from authentication.transport.bearer import BearerTransport, RefreshBearerTransport
+from authentication.transport.base import (
+    Transport,
+    TransportLogoutNotSupportedError,
+    TransportTokenPairNotSupportedError,
+)
+from authentication.transport.bearer import (
+    BearerTransport,
+    RefreshBearerTransport,
+    TokenPairBearerTransport,
+)
 from authentication.transport.cookie import CookieTransport
 
 __all__ = [
     "BearerTransport",
     "RefreshBearerTransport",
+    "TokenPairBearerTransport",
     "CookieTransport",
     "Transport",
     "TransportLogoutNotSupportedError",
+    "TransportTokenPairNotSupportedError",
 ]
@@ -10,8 +10,14 @@ class TransportLogoutNotSupportedError(Exception):
     pass
 
 
+class TransportTokenPairNotSupportedError(Exception):
+    pass
+
+
 class Transport(Protocol):
     scheme: SecurityBase
+    # Логин выдаёт access- и refresh-токены одним ответом
+    token_pair: bool = False
 
     async def get_login_response(self, token: str) -> Response:
         ...  # pragma: no cover
@@ -19,6 +25,12 @@ class Transport(Protocol):
     async def get_logout_response(self) -> Response:
         ...  # pragma: no cover
 
+    async def get_token_pair_response(
+        self, access_token: str, refresh_token: str
+    ) -> Response:
+        """Return an access token along with a new refresh token."""
+        raise TransportTokenPairNotSupportedError()
+
     @staticmethod
     def get_openapi_login_responses_success() -> OpenAPIResponseType:
         """Return a dictionary to use for the openapi responses route parameter."""
@@ -17,6 +17,12 @@ class RefreshBearerResponse(BaseModel):
     token_type: str
 
 
+class TokenPairBearerResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+
 class BearerTransport(Transport):
     scheme: OAuth2PasswordBearer
 
@@ -30,6 +36,14 @@ class BearerTransport(Transport):
     async def get_logout_response(self) -> Response:
         raise TransportLogoutNotSupportedError()
 
+    async def get_token_pair_response(
+        self, access_token: str, refresh_token: str
+    ) -> Response:
+        bearer_response = TokenPairBearerResponse(
+            access_token=access_token, refresh_token=refresh_token, token_type="bearer"
+        )
+        return JSONResponse(bearer_response.dict())
+
     @staticmethod
     def get_openapi_login_responses_success() -> OpenAPIResponseType:
         return {
@@ -85,3 +99,34 @@ class RefreshBearerTransport(BearerTransport):
     @staticmethod
     def get_openapi_logout_responses_success() -> OpenAPIResponseType:
         return {}
+
+
+class TokenPairBearerTransport(BearerTransport):
+    """Bearer transport returning access and refresh tokens from login at once."""
+
+    token_pair = True
+
+    @staticmethod
+    def get_openapi_login_responses_success() -> OpenAPIResponseType:
+        return {
+            status.HTTP_200_OK: {
+                "model": TokenPairBearerResponse,
+                "content": {
+                    "application/json": {
+                        "example": {
+                            "access_token": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9.eyJ1"
+                            "c2VyX2lkIjoiOTIyMWZmYzktNjQwZi00MzcyLTg2Z"
+                            "DMtY2U2NDJjYmE1NjAzIiwiYXVkIjoiZmFzdGFwaS"
+                            "11c2VyczphdXRoIiwiZXhwIjoxNTcxNTA0MTkzfQ."
+                            "M10bjOe45I5Ncu_uXvOmVV8QxnL-nZfcH96U90JaocI",
+                            "refresh_token": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9.eyJ1"
+                            "c2VyX2lkIjoiOTIyMWZmYzktNjQwZi00MzcyLTg2Z"
+                            "DMtY2U2NDJjYmE1NjAzIiwiYXVkIjoiZmFzdGFwaS"
+                            "11c2VyczphdXRoIiwiZXhwIjoxNTcxNTA0MTkzfQ."
+                            "M10bjOe45I5Ncu_uXvOmVV8QxnL-nZfcH96U90JaocI",
+                            "token_type": "bearer",
+                        }
+                    }
+                },
+            }
+        }
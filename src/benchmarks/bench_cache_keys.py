@@ -0,0 +1,80 @@
+"""
+Microbenchmark of cache key building: the former json + pickle + base64
+prepare_key against the `namespace:version:hash` keys of cache.keys.
+
+Run from the src directory::
+
+    python -m benchmarks.bench_cache_keys
+"""
+import codecs
+import json
+import pickle
+import timeit
+import uuid
+from typing import Any, Callable
+
+from cache.keys import key_builder
+from core.pagination import PaginateQueryParams
+
+NUMBER = 20_000
+
+
+class Repository:
+    async def get(self, user_id: uuid.UUID) -> None:
+        pass
+
+    async def get_multiple(self, user_ids: list[uuid.UUID]) -> None:
+        pass
+
+    async def get_sign_in_history(
+        self, user_id: uuid.UUID, pagination_params: PaginateQueryParams
+    ) -> None:
+        pass
+
+    def __getstate__(self):
+        # The hack repositories needed to be part of the former keys
+        return self.__class__.__name__
+
+
+def legacy_prepare_key(func: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    key = {'callable': func.__name__, 'args': args, 'kwargs': sorted(kwargs.items())}
+    try:
+        return json.dumps(key)
+    except TypeError:
+        key['args'] = codecs.encode(pickle.dumps(key['args']), 'base64').decode()
+        key['kwargs'] = codecs.encode(pickle.dumps(key['kwargs']), 'base64').decode()
+    return json.dumps(key)
+
+
+def bench(function: Callable[[], Any]) -> float:
+    """Return the mean call time in microseconds."""
+    function()
+    return timeit.timeit(function, number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    repository = Repository()
+    user_id = uuid.uuid4()
+    calls = {
+        "get(user_id)": (Repository.get, (repository, user_id)),
+        "get_multiple(50 ids)": (
+            Repository.get_multiple,
+            (repository, [uuid.uuid4() for _ in range(50)]),
+        ),
+        "get_sign_in_history": (
+            Repository.get_sign_in_history,
+            (repository, user_id, PaginateQueryParams(page_number=1, page_size=50)),
+        ),
+    }
+    for name, (func, args) in calls.items():
+        build_key = key_builder(func)
+        legacy = bench(lambda: legacy_prepare_key(func, *args))
+        current = bench(lambda: build_key(*args))
+        print(
+            f"{name:22}: {legacy:7.2f} -> {current:6.2f} us, "
+            f"{len(legacy_prepare_key(func, *args)):5} -> {len(build_key(*args)):3} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
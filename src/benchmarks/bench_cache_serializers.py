@@ -0,0 +1,75 @@
+"""
+Microbenchmark of the cache serializers on the cached models: pickle
+against orjson field dicts rebuilt without validation.
+
+Sizes are given as written and after zlib at the level RedisCacheStorage
+compresses values with, since large values are stored compressed.
+
+Run from the src directory::
+
+    python -m benchmarks.bench_cache_serializers
+"""
+import datetime
+import timeit
+import uuid
+import zlib
+from typing import Any, Callable
+
+from cache.serializers import CacheSerializer, ModelSerializer, PickleSerializer
+from core.config import settings
+from db.schemas import models
+
+NUMBER = 5_000
+
+
+def bench(function: Callable[[], Any]) -> float:
+    """Return the mean call time in microseconds."""
+    function()
+    return timeit.timeit(function, number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    user_id = uuid.uuid4()
+    values = {
+        "UserRead": models.UserRead(
+            id=user_id,
+            username="user",
+            email="user@example.com",
+            hashed_password="$2b$12$" + "x" * 53,
+            first_name="First",
+            last_name="Last",
+        ),
+        "50 x EventRead": [
+            models.EventRead(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                timestamp=datetime.datetime.now(),
+                fingerprint="Mozilla/5.0 (X11; Linux x86_64)",
+            )
+            for _ in range(50)
+        ],
+        "10 x UserRole": [
+            models.UserRole(id=uuid.uuid4(), user_id=user_id, role_id=uuid.uuid4())
+            for _ in range(10)
+        ],
+    }
+    serializers: dict[str, CacheSerializer] = {
+        "pickle": PickleSerializer(),
+        "model": ModelSerializer(),
+        "rows": ModelSerializer(encode_lists=True),
+    }
+    for name, value in values.items():
+        for serializer_name, serializer in serializers.items():
+            data = serializer.dumps(value)
+            dumps = bench(lambda: serializer.dumps(value))
+            loads = bench(lambda: serializer.loads(data))
+            compressed = zlib.compress(data, settings.cache_compress_level)
+            print(
+                f"{name:15} {serializer_name:6}: dumps {dumps:7.2f} us, "
+                f"loads {loads:7.2f} us, {len(data):5} bytes, "
+                f"{len(compressed):5} zlib"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Microbenchmark of JWTStrategy.decode_token with and without the decode cache.
+
+Run from the src directory::
+
+    python -m benchmarks.bench_jwt_decode_cache
+"""
+import asyncio
+import timeit
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from authentication.strategy import JWTStrategy
+from benchmarks.keys import RSA_PRIVATE_KEY, RSA_PUBLIC_KEY
+from cache.lru import LRUCache
+
+NUMBER = 20000
+
+StrategyFactory = Callable[[LRUCache | None], JWTStrategy[Any, Any]]
+
+STRATEGIES: dict[str, StrategyFactory] = {
+    "HS256": lambda cache: JWTStrategy("SECRET", 3599, decode_cache=cache),
+    "RS256": lambda cache: JWTStrategy(
+        RSA_PRIVATE_KEY,
+        3599,
+        algorithm="RS256",
+        public_key=RSA_PUBLIC_KEY,
+        decode_cache=cache,
+    ),
+}
+
+
+def bench(strategy: JWTStrategy[Any, Any], token: str) -> float:
+    """Return the mean decode time in microseconds."""
+    strategy.decode_token(token)
+    seconds = timeit.timeit(lambda: strategy.decode_token(token), number=NUMBER)
+    return seconds / NUMBER * 1e6
+
+
+def main():
+    user = SimpleNamespace(id=uuid.uuid4())
+    for algorithm, make_strategy in STRATEGIES.items():
+        strategy = make_strategy(None)
+        token = asyncio.run(strategy.write_token(user))  # type: ignore
+
+        uncached = bench(strategy, token)
+        cached = bench(make_strategy(LRUCache(maxsize=4096)), token)
+        print(
+            f"{algorithm}: uncached {uncached:8.2f} us, cached {cached:6.2f} us, "
+            f"saved {uncached - cached:8.2f} us/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
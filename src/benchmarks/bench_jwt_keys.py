@@ -0,0 +1,56 @@
+"""
+Microbenchmark of generate_jwt and decode_jwt with PEM keys parsed by PyJWT
+on every call and with keys parsed once by the key registry.
+
+Run from the src directory::
+
+    python -m benchmarks.bench_jwt_keys
+"""
+import timeit
+from typing import Any, Callable
+
+import jwt
+
+from benchmarks.keys import (
+    ECC_PRIVATE_KEY,
+    ECC_PUBLIC_KEY,
+    RSA_PRIVATE_KEY,
+    RSA_PUBLIC_KEY,
+)
+from core.jwt_utils import decode_jwt, generate_jwt
+
+NUMBER = 200
+AUDIENCE = ["movix:auth"]
+PAYLOAD = {"sub": "user", "aud": AUDIENCE}
+
+KEYS = {
+    "RS256": (RSA_PRIVATE_KEY, RSA_PUBLIC_KEY),
+    "ES256": (ECC_PRIVATE_KEY, ECC_PUBLIC_KEY),
+}
+
+
+def bench(function: Callable[[], Any]) -> float:
+    """Return the mean call time in microseconds."""
+    function()
+    return timeit.timeit(function, number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    for algorithm, (private_key, public_key) in KEYS.items():
+        token = generate_jwt(PAYLOAD, private_key, algorithm=algorithm)
+        raw_encode = bench(lambda: jwt.encode(PAYLOAD, private_key, algorithm))
+        encode = bench(lambda: generate_jwt(PAYLOAD, private_key, algorithm=algorithm))
+        raw_decode = bench(
+            lambda: jwt.decode(
+                token, public_key, audience=AUDIENCE, algorithms=[algorithm]
+            )
+        )
+        decode = bench(lambda: decode_jwt(token, public_key, AUDIENCE, [algorithm]))
+        print(
+            f"{algorithm}: encode {raw_encode:9.2f} -> {encode:7.2f} us, "
+            f"decode {raw_decode:7.2f} -> {decode:7.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
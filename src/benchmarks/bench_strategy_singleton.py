@@ -0,0 +1,56 @@
+"""
+Microbenchmark of the per-request strategy overhead: a strategy built for
+every request against the startup singleton.
+
+Parsed keys are shared by core.jwt_utils.key_registry, so a strategy built
+per request does not parse its keys again, and signing and verifying
+a token costs the same with both (the difference is within run-to-run
+noise). What the singleton still saves is building the strategy, a few
+microseconds per request.
+
+Run from the src directory::
+
+    python -m benchmarks.bench_strategy_singleton
+"""
+import timeit
+from typing import Any, Callable
+
+from authentication.strategy import JWTStrategy
+from benchmarks.keys import RSA_PRIVATE_KEY, RSA_PUBLIC_KEY
+from managers.jwt import build_access_strategy
+
+NUMBER = 200
+
+StrategyFactory = Callable[[], JWTStrategy[Any, Any]]
+
+STRATEGIES: dict[str, StrategyFactory] = {
+    "HS256": lambda: JWTStrategy("SECRET", 3599),
+    "RS256": lambda: JWTStrategy(
+        RSA_PRIVATE_KEY, 3599, algorithm="RS256", public_key=RSA_PUBLIC_KEY
+    ),
+}
+
+
+def bench(function: Callable[[], Any]) -> float:
+    """Return the mean call time in microseconds."""
+    function()
+    return timeit.timeit(function, number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    for algorithm, make_strategy in STRATEGIES.items():
+        singleton = make_strategy()
+        per_request = bench(make_strategy)
+        shared = bench(lambda: singleton)
+        print(
+            f"{algorithm}: built per request {per_request:6.2f} us, "
+            f"singleton {shared:6.2f} us"
+        )
+
+    build = bench(build_access_strategy.__wrapped__)  # type: ignore
+    cached = bench(build_access_strategy)
+    print(f"access strategy dependency: built {build:6.2f} us, cached {cached:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
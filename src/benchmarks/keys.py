@@ -0,0 +1,28 @@
+"""
+Key material of the benchmarks, generated on import.
+
+The keys only have to be valid for their algorithm, so the benchmarks
+do not share fixtures with the test suite.
+"""
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+
+def _to_pem(
+    private_key: rsa.RSAPrivateKey | ec.EllipticCurvePrivateKey,
+) -> tuple[str, str]:
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem.decode(), public_pem.decode()
+
+
+RSA_PRIVATE_KEY, RSA_PUBLIC_KEY = _to_pem(
+    rsa.generate_private_key(public_exponent=65537, key_size=2048)
+)
+ECC_PRIVATE_KEY, ECC_PUBLIC_KEY = _to_pem(ec.generate_private_key(ec.SECP256R1()))
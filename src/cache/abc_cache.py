@@ -1,14 +1,77 @@
 from abc import ABC, abstractmethod
-from typing import Any, Coroutine
+from typing import Any, Coroutine, Iterable, Sequence
 
 
 class CacheStorageABC(ABC):
+    # Канал pub/sub для сброса L1 других процессов, None если процесс один
+    channel: str | None
+    # Поколение тега хранится дольше любого вычисления значения
+    generation_seconds: float = 600
+
     @abstractmethod
     async def get(self, key: str) -> bytes | bytearray | memoryview | None:
         ...
 
+    @abstractmethod
+    async def get_many(
+        self, keys: Sequence[str]
+    ) -> list[bytes | bytearray | memoryview | None]:
+        ...
+
+    @abstractmethod
+    async def get_with_ttl(
+        self, key: str
+    ) -> tuple[bytes | bytearray | memoryview | None, float | None]:
+        ...
+
+    @abstractmethod
+    async def get_many_with_ttl(
+        self, keys: Sequence[str]
+    ) -> list[tuple[bytes | bytearray | memoryview | None, float | None]]:
+        ...
+
     @abstractmethod
     async def set(
-        self, key: str, value: bytes | bytearray | memoryview | None
+        self,
+        key: str,
+        value: bytes | bytearray | memoryview | None,
+        ttl_seconds: float | None = None,
+        tags: Iterable[str] = (),
+        tag_ttl_seconds: float | None = None,
     ) -> Coroutine[Any, Any, bool | None]:
         ...
+
+    @abstractmethod
+    async def set_many(
+        self,
+        items: Iterable[tuple[str, bytes, float | None, Iterable[str]]],
+        tag_ttl_seconds: float | None = None,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> list[str]:
+        ...
+
+    @abstractmethod
+    async def delete(self, keys: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def get_generation(self) -> int:
+        ...
+
+    @abstractmethod
+    async def get_tag_generations(self, tags: Sequence[str]) -> list[int]:
+        ...
+
+    async def publish(self, message: str):
+        ...
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, token: str, ttl_seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str):
+        ...
@@ -1,18 +1,182 @@
 from __future__ import annotations
 
-import codecs
-import json
+import asyncio
+import inspect
 import logging
-import pickle
-from datetime import datetime, timedelta
-from functools import wraps
-from typing import Any, Callable, cast
+import math
+import random
+import time
+import uuid
+import zlib
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from functools import partial, wraps
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Mapping, Sequence, cast
+
+from opentelemetry import trace
+from prometheus_client import Counter, Gauge, Histogram
+from redis.asyncio.client import Pipeline, PubSub
+from redis.exceptions import RedisError, WatchError
 
 import cache.utils as utils
+from core import metrics
 from core.config import settings
 
 from .abc_cache import CacheStorageABC
+from .keys import key_builder
+from .lru import LRUCache
+from .memory import MemoryCacheStorage
 from .redis import RedisClient, get_manager
+from .serializers import CacheSerializer, ModelSerializer, SerializationError
+
+_MISSING = object()
+
+
+class _NotFound:
+    """Отрицательный результат в cache, при распаковке остаётся синглтоном"""
+
+    def __reduce__(self) -> str:
+        return 'NOT_FOUND'
+
+    def __repr__(self) -> str:
+        return 'NOT_FOUND'
+
+
+NOT_FOUND = _NotFound()
+LOCK_POLL_SECONDS = 0.05
+COMPUTE_SECONDS_SIZE = 4096
+
+
+# Часы процессов расходятся: истёкший ключ убирается из тега с запасом
+TAG_SKEW_SECONDS = 60
+
+
+FORMAT_RAW = b'\x00'
+FORMAT_ZLIB = b'\x01'
+
+CACHE_VALUES_WRITTEN = Counter(
+    "cache_values_written_total",
+    "Cache values written to Redis, by storage format",
+    ["format"],
+    registry=metrics.registry,
+)
+CACHE_BYTES_WRITTEN = Counter(
+    "cache_bytes_written_total",
+    "Bytes of cache values written to Redis, serialized (raw) and stored",
+    ["size"],
+    registry=metrics.registry,
+)
+CACHE_COMPRESSION_RATIO = Gauge(
+    "cache_compression_ratio",
+    "Stored to serialized size of the cache values written to Redis",
+    registry=metrics.registry,
+)
+# Счётчики не читаются вне registry, поэтому для отношения свои суммы
+_bytes_written = {'raw': 0, 'stored': 0}
+CACHE_COMPRESSION_RATIO.set_function(
+    lambda: _bytes_written['stored'] / (_bytes_written['raw'] or 1)
+)
+
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Lookups of cached functions by result: hit, stale, miss or error",
+    ["function", "result"],
+    registry=metrics.registry,
+)
+CACHE_COMPUTE_ERRORS = Counter(
+    "cache_compute_errors_total",
+    "Failed computations of cached functions, background refreshes included",
+    ["function"],
+    registry=metrics.registry,
+)
+CACHE_LOOKUP_SECONDS = Histogram(
+    "cache_lookup_seconds",
+    "Cache lookup latency of cached functions",
+    ["function"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+    registry=metrics.registry,
+)
+CACHE_COMPUTE_SECONDS = Histogram(
+    "cache_compute_seconds",
+    "Computation latency of cached functions on a miss or refresh",
+    ["function"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    registry=metrics.registry,
+)
+CACHE_VALUE_BYTES = Histogram(
+    "cache_value_bytes",
+    "Serialized size of the values cached for a function",
+    ["function"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    registry=metrics.registry,
+)
+
+_tracer = trace.get_tracer(__name__)
+
+
+def _start_span(name: str, function: str | None) -> AbstractContextManager[Any]:
+    # Пустой спан стоит микросекунды: кэш пишет спаны только внутри трейса
+    if not trace.get_current_span().is_recording():
+        return nullcontext(trace.INVALID_SPAN)
+    return _tracer.start_as_current_span(
+        name, attributes={'cache.function': function or ''}
+    )
+
+
+def _count_lookup(
+    function: str | None, result: str, lookup_seconds: float, count: int = 1
+) -> None:
+    if function is not None and count:
+        CACHE_LOOKUPS.labels(function=function, result=result).inc(count)
+        CACHE_LOOKUP_SECONDS.labels(function=function).observe(lookup_seconds)
+
+
+def _count_computed(
+    function: str | None, sizes: Iterable[int], compute_seconds: float | None = None
+) -> None:
+    if function is None:
+        return
+    if compute_seconds is not None:
+        CACHE_COMPUTE_SECONDS.labels(function=function).observe(compute_seconds)
+    value_bytes = CACHE_VALUE_BYTES.labels(function=function)
+    for size in sizes:
+        value_bytes.observe(size)
+
+
+def _count_written(storage_format: str, raw_size: int, stored_size: int) -> None:
+    CACHE_VALUES_WRITTEN.labels(format=storage_format).inc()
+    CACHE_BYTES_WRITTEN.labels(size="raw").inc(raw_size)
+    CACHE_BYTES_WRITTEN.labels(size="stored").inc(stored_size)
+    _bytes_written['raw'] += raw_size
+    _bytes_written['stored'] += stored_size
+
+
+def _to_px(seconds: float | None) -> int | None:
+    # Истечением занимается Redis: без TTL ключ жил бы вечно
+    return int(seconds * 1000) if seconds else None
+
+
+def _max_ttl(items: Sequence[tuple[str, Any, float | None, Any]]) -> float | None:
+    return max((ttl or 0 for _, _, ttl, _ in items), default=0) or None
+
+
+def _not_found_tag(tag: str) -> str:
+    # Отрицательные записи живут недолго, и их теги тоже: в общем с найденными
+    # значениями множестве короткий TTL сбросил бы и теги найденных
+    return f'{tag}:not_found'
+
+
+@dataclass(frozen=True)
+class CachedFunction:
+    """
+    Как `cache_decorator` кэширует функцию: пакетные чтения пишут её ключи
+    """
+
+    build_key: Callable[..., str]
+    get_tags: Callable[[Any, Any, Any], Iterable[str]] | None
+    ttl_seconds: float | None
+    not_found_seconds: float | None
 
 
 class CacheError(Exception):
@@ -24,125 +188,993 @@ class CacheError(Exception):
 
 
 class RedisCacheStorage(CacheStorageABC):
-    def __init__(self, redis: RedisClient):
+    """
+    Хранилище кэша в Redis.
+
+    Тег - сортированное множество `cache:tags:{tag}` с ключами, записанными
+    под этим тегом, по времени их истечения: запись убирает из тега истёкшие
+    ключи. Сброс тега увеличивает счётчик `cache:gen` и запоминает его
+    значение в `cache:gen:{tag}`, поколении тега.
+
+    Значение хранится с байтом формата: как есть или сжатое zlib. Сжимаются
+    значения от compress_min_bytes байт, если сжатие их уменьшает. Значения
+    без байта формата, записанные до его появления, читаются как есть.
+    """
+
+    def __init__(
+        self,
+        redis: RedisClient,
+        channel: str = 'cache:invalidate',
+        compress_min_bytes: int | None = None,
+        compress_level: int = 1,
+    ):
         self._client = redis
+        self.channel: str | None = channel
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+
+    def _encode(self, value: bytes | bytearray | memoryview) -> bytes:
+        raw_size = len(value)
+        if self.compress_min_bytes and raw_size >= self.compress_min_bytes:
+            compressed = zlib.compress(value, self.compress_level)
+            if len(compressed) < raw_size:
+                _count_written('zlib', raw_size, len(compressed) + 1)
+                return FORMAT_ZLIB + compressed
+        _count_written('raw', raw_size, raw_size + 1)
+        return FORMAT_RAW + value
+
+    def _decode(self, value: bytes | None) -> bytes | None:
+        if value is None:
+            return value
+        flag = value[:1]
+        if flag == FORMAT_RAW:
+            return value[1:]
+        if flag == FORMAT_ZLIB:
+            return zlib.decompress(value[1:])
+        return value
+
+    def get_tag_key(self, tag: str) -> str:
+        return f'cache:tags:{tag}'
+
+    def get_generation_key(self, tag: str | None = None) -> str:
+        return 'cache:gen' if tag is None else f'cache:gen:{tag}'
 
     async def get(self, key: str) -> bytes | bytearray | memoryview | None:
         value: Any = await self._client.get(key)
         if not isinstance(value, (bytes, bytearray, memoryview)) and value is not None:
             raise TypeError(f"Failed to get serialized value for key {key}")
-        return value
+        return self._decode(value)
 
-    async def set(self, key: str, value: bytes | bytearray | memoryview | None):
+    async def get_many(
+        self, keys: Sequence[str]
+    ) -> list[bytes | bytearray | memoryview | None]:
+        """Значения ключей одним MGET"""
+        if not keys:
+            return []
+        return [self._decode(value) for value in await self._client.mget(keys)]
+
+    async def get_with_ttl(
+        self, key: str
+    ) -> tuple[bytes | bytearray | memoryview | None, float | None]:
+        """Значение и оставшееся время его жизни за один запрос"""
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            value, pttl = await pipe.execute()
+        return self._decode(value), pttl / 1000 if pttl >= 0 else None
+
+    async def get_many_with_ttl(
+        self, keys: Sequence[str]
+    ) -> list[tuple[bytes | bytearray | memoryview | None, float | None]]:
+        """Значения ключей и оставшееся время их жизни одним pipeline"""
+        if not keys:
+            return []
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *pttls = await pipe.execute()
+        return [
+            (self._decode(value), pttl / 1000 if pttl >= 0 else None)
+            for value, pttl in zip(values, pttls)
+        ]
+
+    async def set(
+        self,
+        key: str,
+        value: bytes | bytearray | memoryview | None,
+        ttl_seconds: float | None = None,
+        tags: Iterable[str] = (),
+        tag_ttl_seconds: float | None = None,
+    ):
+        """
+        Положить значение на ttl_seconds секунд и зарегистрировать ключ под тегами
+        """
         if not isinstance(value, (bytes, bytearray, memoryview)):
             raise TypeError(
                 f"Expected bytes or None value for key {key}, but have {type(value)}"
             )
-        return await self._client.set(key, value)
+        if not tags:
+            return await self._client.set(
+                key, self._encode(value), px=_to_px(ttl_seconds)
+            )
+        async with self._client.pipeline(transaction=False) as pipe:
+            self._set(pipe, key, value, ttl_seconds, tags, tag_ttl_seconds)
+            return (await pipe.execute())[0]
+
+    async def set_many(
+        self,
+        items: Iterable[tuple[str, bytes, float | None, Iterable[str]]],
+        tag_ttl_seconds: float | None = None,
+    ) -> None:
+        """
+        Положить значения (ключ, значение, TTL, теги) одним pipeline
+
+        Вместо MSET: у него нет TTL, а без TTL ключ жил бы вечно.
+        """
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value, ttl_seconds, tags in items:
+                self._set(pipe, key, value, ttl_seconds, tags, tag_ttl_seconds)
+            if len(pipe):
+                await pipe.execute()
+
+    def _set(
+        self,
+        pipe: Pipeline,
+        key: str,
+        value: bytes | bytearray | memoryview,
+        ttl_seconds: float | None,
+        tags: Iterable[str],
+        tag_ttl_seconds: float | None,
+    ) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else math.inf
+        pipe.set(key, self._encode(value), px=_to_px(ttl_seconds))
+        for tag in tags:
+            tag_key = self.get_tag_key(tag)
+            pipe.zadd(tag_key, {key: expires_at})
+            pipe.zremrangebyscore(tag_key, '-inf', now - TAG_SKEW_SECONDS)
+            if tag_ttl_seconds:
+                pipe.pexpire(tag_key, _to_px(tag_ttl_seconds))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> list[str]:
+        """
+        Удалить ключи, записанные под тегами, вместе с самими тегами
+
+        Поколение тегов меняется раньше, чем читаются их ключи: вычисление,
+        записавшее значение после чтения, увидит новое поколение.
+
+        :return: Удалённые ключи.
+        """
+        tags = list(tags)
+        if not tags:
+            return []
+        generation = await self._client.incr(self.get_generation_key())
+        async with self._client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.set(
+                    self.get_generation_key(tag),
+                    generation,
+                    px=_to_px(self.generation_seconds),
+                )
+            for tag in tags:
+                pipe.zrange(self.get_tag_key(tag), 0, -1)
+            members = (await pipe.execute())[len(tags) :]
+        keys = list({key.decode() for tag_members in members for key in tag_members})
+        await self._client.unlink(*keys, *(self.get_tag_key(tag) for tag in tags))
+        return keys
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        if keys:
+            await self._client.unlink(*keys)
+
+    async def get_generation(self) -> int:
+        """Число сбросов тегов, поколение нового сброса больше него"""
+        return int(await self._client.get(self.get_generation_key()) or 0)
+
+    async def get_tag_generations(self, tags: Sequence[str]) -> list[int]:
+        if not tags:
+            return []
+        generations = await self._client.mget(
+            [self.get_generation_key(tag) for tag in tags]
+        )
+        return [int(generation or 0) for generation in generations]
+
+    def pubsub(self) -> PubSub:
+        return self._client.pubsub()
+
+    async def publish(self, message: str):
+        await self._client.publish(cast(str, self.channel), message)
+
+    def get_lock_key(self, key: str) -> str:
+        return f'cache:lock:{key}'
+
+    async def acquire_lock(self, key: str, token: str, ttl_seconds: float) -> bool:
+        return bool(
+            await self._client.set(
+                self.get_lock_key(key), token, px=int(ttl_seconds * 1000), nx=True
+            )
+        )
+
+    async def release_lock(self, key: str, token: str):
+        """Снять блокировку, если она всё ещё принадлежит token"""
+        lock_key = self.get_lock_key(key)
+        async with self._client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(lock_key)
+                current = await pipe.get(lock_key)
+                if current is None or current.decode() != token:
+                    return
+                pipe.multi()
+                pipe.unlink(lock_key)
+                await pipe.execute()
+            except WatchError:
+                pass
 
 
 class Cache(metaclass=utils.Singleton):
     """
     Класс-обёртка над redis для работы с cache методов.
+
+    С `local` значения дополнительно хранятся в памяти процесса (L1), и тёплые
+    чтения обходятся без Redis. Записанные ключи рассылаются через pub/sub,
+    другие процессы удаляют их из L1. L1 используется только пока `sync()`
+    держит подписку. Запись L1 живёт не дольше своего TTL и оставшегося
+    времени жизни ключа в Redis, которое она помнит для stale и XFetch.
+    L1 хранит сериализованные значения: каждое чтение получает свою копию,
+    и изменения вызывающего не видны другим запросам.
+
+    Значения сериализует `serializer`, по умолчанию модели pydantic
+    хранятся как orjson их полей, остальное - pickle.
+
+    Промах `get_or_set` вычисляет значение один раз на процесс: параллельные
+    запросы того же ключа ждут это вычисление. С блокировкой в Redis
+    вычисление одно на все процессы, остальные ждут появления значения.
     """
 
-    def __init__(self, storage: RedisCacheStorage):
-        self.storage: RedisCacheStorage = storage
+    def __init__(
+        self,
+        storage: CacheStorageABC,
+        local: LRUCache[tuple[bytes, float | None]] | None = None,
+        tag_ttl_seconds: float | None = None,
+        serializer: CacheSerializer | None = None,
+    ):
+        self.storage = storage
+        self.serializer = serializer or ModelSerializer()
+        self.local = local
+        self.tag_ttl_seconds = tag_ttl_seconds
+        self.local_ready = False
+        self._origin = uuid.uuid4().hex
+        self._sync_task: asyncio.Task | None = None
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+        self._compute_seconds = LRUCache[float](COMPUTE_SECONDS_SIZE)
 
     async def get(self, key: str) -> Any:
         """
-        Получить значение из cache по ключу key с отметкой о том, когда было положено
+        Получить значение из cache по ключу key, None если его нет
+        """
+        if self.local is not None and self.local_ready:
+            return (await self.get_with_ttl(key))[0]
+
+        return self._loads(key, await self.storage.get(key))
+
+    async def get_many(self, keys: Sequence[str]) -> list[Any]:
+        """
+        Получить значения ключей keys, None для отсутствующих
+        """
+        if self.local is None or not self.local_ready:
+            serialized = await self.storage.get_many(keys)
+            return [self._loads(key, data) for key, data in zip(keys, serialized)]
+
+        values = [self._local_get(key)[0] for key in keys]
+        remote = [i for i, value in enumerate(values) if value is _MISSING]
+        if remote:
+            loaded = await self.storage.get_many_with_ttl([keys[i] for i in remote])
+            for i, (data, ttl_seconds) in zip(remote, loaded):
+                values[i] = self._loads(keys[i], data, ttl_seconds, local=True)
+        return values
+
+    async def get_with_ttl(self, key: str) -> tuple[Any, float | None]:
+        """
+        Получить значение и оставшееся время его жизни в секундах
+        """
+        if self.local is not None and self.local_ready:
+            value, ttl_seconds = self._local_get(key)
+            if value is not _MISSING:
+                return value, ttl_seconds
+
+        serialized, ttl_seconds = await self.storage.get_with_ttl(key)
+        return self._loads(key, serialized, ttl_seconds, local=True), ttl_seconds
+
+    def _loads(
+        self,
+        key: str,
+        serialized: bytes | bytearray | memoryview | None,
+        ttl_seconds: float | None = None,
+        local: bool = False,
+    ) -> Any:
+        """
+        Распаковать значение, с local положить его и в L1 на ttl_seconds
         """
-        serialized = await self.storage.get(key)
         if serialized is None:
             return serialized
 
         value = None
         try:
-            value = pickle.loads(serialized)
-        except (TypeError, pickle.PicklingError) as e:
-            logging.error(e)
+            value = self.serializer.loads(serialized)
+        except SerializationError as e:
+            # Например, запись сделана для старой версии модели: это промах
+            logging.warning("Failed to load %s from cache: %s", key, e)
 
+        if value is not None and local:
+            self._local_set(key, serialized, ttl_seconds)
         return value
 
-    async def set(self, key: str, value: Any):
+    def _local_get(self, key: str) -> tuple[Any, float | None]:
+        """Значение из L1 и оставшееся время жизни ключа в Redis"""
+        assert self.local is not None
+        entry = self.local.get(key)
+        if entry is None:
+            return _MISSING, None
+        serialized, expires_at = entry
+        ttl_seconds = None if expires_at is None else expires_at - time.monotonic()
+        # Распаковка на каждое чтение: вызывающий может менять свою копию
+        return self.serializer.loads(serialized), ttl_seconds
+
+    def _local_set(
+        self,
+        key: str,
+        serialized: bytes | bytearray | memoryview,
+        ttl_seconds: float | None,
+    ) -> None:
+        if self.local is None or not self.local_ready:
+            return
+        expires_at = None if ttl_seconds is None else time.monotonic() + ttl_seconds
+        self.local.set(
+            key, (bytes(serialized), expires_at), ttl=self._local_ttl(ttl_seconds)
+        )
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: float | None = None,
+        tags: Iterable[str] = (),
+    ) -> int:
         """
-        Положить значение в cache
+        Положить значение в cache на ttl_seconds секунд под тегами tags
+
+        Возвращает размер сериализованного значения в байтах.
         """
         try:
-            state = pickle.dumps(value)
-        except pickle.UnpicklingError as e:
+            state = self.serializer.dumps(value)
+        except SerializationError as e:
             logging.error(e)
             raise CacheError("Failed to set an object")
-        await self.storage.set(key, state)
+        if value is NOT_FOUND:
+            tags = [_not_found_tag(tag) for tag in tags]
+            tag_ttl_seconds = ttl_seconds
+        else:
+            # Тег не должен истечь раньше своих ключей
+            tag_ttl_seconds = max(ttl_seconds or 0, self.tag_ttl_seconds or 0) or None
+        await self.storage.set(key, state, ttl_seconds, tags, tag_ttl_seconds)
+        if self.local is not None:
+            self._local_set(key, state, ttl_seconds)
+            await self.storage.publish(f'{self._origin}:{key}')
+        return len(state)
 
-    @classmethod
-    def get_instance(cls) -> Cache | None:
-        return cast(Cache, cls._instances.get(cls))
+    async def set_many(
+        self, items: Iterable[tuple[str, Any, float | None, Iterable[str]]]
+    ) -> list[int]:
+        """
+        Положить значения (ключ, значение, TTL, теги) за один запрос к Redis
+
+        Отрицательные записи пишутся вторым запросом, если есть и найденные.
+        Возвращает размеры сериализованных значений в байтах.
+        """
+        items = list(items)
+        try:
+            serialized = [
+                (key, self.serializer.dumps(value), ttl_seconds, tags)
+                for key, value, ttl_seconds, tags in items
+            ]
+        except SerializationError as e:
+            logging.error(e)
+            raise CacheError("Failed to set an object")
+        await self._store_many(items, serialized)
+        if self.local is not None and items:
+            for key, state, ttl, _ in serialized:
+                self._local_set(key, state, ttl)
+            keys = '\n'.join(key for key, *_ in items)
+            await self.storage.publish(f'{self._origin}:{keys}')
+        return [len(state) for _, state, _, _ in serialized]
+
+    async def _store_many(
+        self,
+        items: Sequence[tuple[str, Any, float | None, Iterable[str]]],
+        serialized: Sequence[tuple[str, bytes, float | None, Iterable[str]]],
+    ) -> None:
+        """Положить найденные и отрицательные записи, теги вторых живут как они"""
+        found = []
+        not_found = []
+        for (_, value, _, _), (key, state, ttl_seconds, tags) in zip(items, serialized):
+            if value is NOT_FOUND:
+                tags = [_not_found_tag(tag) for tag in tags]
+                not_found.append((key, state, ttl_seconds, tags))
+            else:
+                found.append((key, state, ttl_seconds, tags))
+        if found:
+            # Тег не должен истечь раньше своих ключей
+            tag_ttl_seconds = max(_max_ttl(found) or 0, self.tag_ttl_seconds or 0)
+            await self.storage.set_many(found, tag_ttl_seconds or None)
+        if not_found:
+            await self.storage.set_many(not_found, _max_ttl(not_found))
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """
+        Удалить из cache все значения, записанные под тегами tags
+
+        Вместе с отрицательными записями, у них свои множества тегов.
+        """
+        # Начатое до изменения вычисление не должно отдаваться новым запросам
+        self._inflight.clear()
+        keys = await self.storage.invalidate_tags(
+            [*tags, *(_not_found_tag(tag) for tag in tags)]
+        )
+        await self._drop_local(keys)
+
+    async def _drop_local(self, keys: Sequence[str]) -> None:
+        if keys and self.local is not None:
+            for key in keys:
+                self.local.pop(key)
+            await self.storage.publish(f'{self._origin}:' + '\n'.join(keys))
+
+    async def _set_computed(
+        self,
+        items: Sequence[tuple[str, Any, float | None, list[str]]],
+        generation: int | None,
+    ) -> list[int]:
+        """
+        Записать вычисленные значения, если их теги не сбрасывались после
+        поколения generation, прочитанного до вычисления
+
+        Вычисление могло прочитать данные до коммита изменения и закончиться
+        после его invalidate_tags: записанное, оно отдавалось бы весь TTL.
+        Теги проверяются и после записи, сброс мог пройти между ними.
+        """
+        if generation is not None:
+            invalidated = await self._invalidated(items, generation)
+            items = [item for item, skip in zip(items, invalidated) if not skip]
+        if not items:
+            return []
+        sizes = await self.set_many(items)
+        if generation is not None:
+            invalidated = await self._invalidated(items, generation)
+            keys = [key for (key, *_), drop in zip(items, invalidated) if drop]
+            if keys:
+                await self.storage.delete(keys)
+                await self._drop_local(keys)
+        return sizes
+
+    async def _invalidated(
+        self, items: Sequence[tuple[str, Any, float | None, list[str]]], generation: int
+    ) -> list[bool]:
+        tags = list({tag for *_, item_tags in items for tag in item_tags})
+        generations = dict(zip(tags, await self.storage.get_tag_generations(tags)))
+        return [
+            any(generations[tag] > generation for tag in item_tags)
+            for *_, item_tags in items
+        ]
+
+    async def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: float | None = None,
+        tags: Callable[[Any], Iterable[str]] | None = None,
+        lock_seconds: float | None = None,
+        stale_seconds: float | None = None,
+        xfetch_beta: float | None = None,
+        refresh: Callable[[], Awaitable[Any]] | None = None,
+        not_found_seconds: float | None = None,
+        name: str | None = None,
+    ) -> Any:
+        """
+        Получить значение из cache, при промахе вычислить и положить его
+
+        :param compute: Вычисляет значение, None кэшируется только
+        при заданном not_found_seconds.
+        :param tags: Теги вычисленного значения, для None вызываются с None.
+        :param lock_seconds: Время жизни блокировки вычисления в Redis,
+        без блокировки если None.
+        :param stale_seconds: Сколько после ttl_seconds значение ещё отдаётся,
+        пока фоновая задача его обновляет.
+        :param xfetch_beta: Вероятностное раннее обновление (XFetch): чем
+        дольше вычисление и ближе истечение, тем вероятнее обновление.
+        :param refresh: Вычисление для фонового обновления, по умолчанию compute.
+        :param not_found_seconds: Время жизни отрицательного результата (None),
+        обычно короче ttl_seconds, чтобы созданная сущность не терялась надолго.
+        :param name: Имя кэшированной функции, метка метрик кэша. Без него
+        метрики не собираются.
+        """
+        with _start_span('cache.get_or_set', name) as span:
+            started_at = time.perf_counter()
+            try:
+                if stale_seconds:
+                    value, remaining = await self.get_with_ttl(key)
+                else:
+                    value, remaining = await self.get(key), None
+            except Exception:
+                _count_lookup(name, 'error', time.perf_counter() - started_at)
+                raise
+            lookup_seconds = time.perf_counter() - started_at
+
+            hard_ttl_seconds = ttl_seconds
+            if stale_seconds:
+                hard_ttl_seconds = (ttl_seconds or 0) + stale_seconds
+            result = 'hit' if value is not None else 'miss'
+            if (
+                stale_seconds
+                and value is not None
+                and value is not NOT_FOUND
+                and remaining is not None
+                and self._should_refresh(key, remaining - stale_seconds, xfetch_beta)
+            ):
+                # Раннее обновление XFetch отдаёт ещё свежее значение
+                if remaining <= stale_seconds:
+                    result = 'stale'
+                self._start_compute(
+                    key,
+                    refresh or compute,
+                    hard_ttl_seconds,
+                    tags,
+                    lock_seconds,
+                    not_found_seconds,
+                    name,
+                )
+            _count_lookup(name, result, lookup_seconds)
+            span.set_attribute('cache.result', result)
+
+            if value is None:
+                value = await asyncio.shield(
+                    self._start_compute(
+                        key,
+                        compute,
+                        hard_ttl_seconds,
+                        tags,
+                        lock_seconds,
+                        not_found_seconds,
+                        name,
+                    )
+                )
+        return None if value is NOT_FOUND else value
+
+    async def get_or_set_many(
+        self,
+        keys: Mapping[Hashable, str],
+        compute: Callable[[list[Hashable]], Awaitable[Mapping[Hashable, Any]]],
+        ttl_seconds: float | None = None,
+        tags: Callable[[Hashable, Any], Iterable[str]] | None = None,
+        not_found_seconds: float | None = None,
+        name: str | None = None,
+    ) -> dict[Hashable, Any]:
+        """
+        Пакетный get_or_set: значения по id читаются одним MGET, compute
+        вызывается один раз для всех промахов, вычисленное пишется одним pipeline
+
+        Параллельные промахи пакетов не объединяются, в отличие от get_or_set.
+
+        :param keys: Ключ значения для каждого id.
+        :param compute: Значения по id для списка промахов, отсутствие id - None.
+        :param tags: Теги значения, вызывается с id и значением.
+        :param name: Имя кэшированной функции, метка метрик кэша.
+        """
+        with _start_span('cache.get_or_set_many', name) as span:
+            started_at = time.perf_counter()
+            try:
+                values = dict(zip(keys, await self.get_many(list(keys.values()))))
+            except Exception:
+                _count_lookup(name, 'error', time.perf_counter() - started_at)
+                raise
+            lookup_seconds = time.perf_counter() - started_at
+            missing = [id_ for id_, value in values.items() if value is None]
+            _count_lookup(name, 'hit', lookup_seconds, len(values) - len(missing))
+            _count_lookup(name, 'miss', lookup_seconds, len(missing))
+            span.set_attribute('cache.hits', len(values) - len(missing))
+            span.set_attribute('cache.misses', len(missing))
+            if missing:
+                generation = await self.storage.get_generation() if tags else None
+                computed = await self._compute_many(missing, compute, name)
+                items = []
+                for id_ in missing:
+                    value = values[id_] = computed.get(id_)
+                    if value is not None:
+                        items.append(
+                            (
+                                keys[id_],
+                                value,
+                                ttl_seconds,
+                                list(tags(id_, value)) if tags else [],
+                            )
+                        )
+                    elif not_found_seconds:
+                        items.append(
+                            (
+                                keys[id_],
+                                NOT_FOUND,
+                                not_found_seconds,
+                                list(tags(id_, None)) if tags else [],
+                            )
+                        )
+                _count_computed(name, await self._set_computed(items, generation))
+        return {
+            id_: None if value is NOT_FOUND else value for id_, value in values.items()
+        }
 
+    async def _compute_many(
+        self,
+        missing: list[Hashable],
+        compute: Callable[[list[Hashable]], Awaitable[Mapping[Hashable, Any]]],
+        name: str | None,
+    ) -> Mapping[Hashable, Any]:
+        with _start_span('cache.compute', name):
+            started_at = time.perf_counter()
+            try:
+                computed = await compute(missing)
+            except Exception:
+                if name is not None:
+                    CACHE_COMPUTE_ERRORS.labels(function=name).inc()
+                raise
+            _count_computed(name, (), time.perf_counter() - started_at)
+            return computed
 
-def expired(timestamp: datetime) -> bool:
-    delta = timedelta(seconds=settings.cache_expiration_in_seconds)
-    if datetime.now() - timestamp >= delta:
-        return True
+    def _should_refresh(
+        self, key: str, fresh_seconds: float, xfetch_beta: float | None
+    ) -> bool:
+        if fresh_seconds <= 0:
+            return True
+        if not xfetch_beta:
+            return False
+        compute_seconds = self._compute_seconds.get(key, 0)
+        return compute_seconds * xfetch_beta * -math.log(random.random()) >= (
+            fresh_seconds
+        )
 
-    return False
+    def _start_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: float | None,
+        tags: Callable[[Any], Iterable[str]] | None,
+        lock_seconds: float | None,
+        not_found_seconds: float | None = None,
+        name: str | None = None,
+    ) -> asyncio.Future[Any]:
+        future = self._inflight.get(key)
+        if future is None:
+            # Вычисление живёт отдельной задачей: отмена запроса, который
+            # его начал, не отменяет его для остальных ожидающих
+            future = asyncio.ensure_future(
+                self._compute(
+                    key,
+                    compute,
+                    ttl_seconds,
+                    tags,
+                    lock_seconds,
+                    not_found_seconds,
+                    name,
+                )
+            )
+            self._inflight[key] = future
+            future.add_done_callback(partial(self._computed, key, name))
+        return future
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: float | None,
+        tags: Callable[[Any], Iterable[str]] | None,
+        lock_seconds: float | None,
+        not_found_seconds: float | None = None,
+        name: str | None = None,
+    ) -> Any:
+        token = None
+        if lock_seconds:
+            token = uuid.uuid4().hex
+            if not await self.storage.acquire_lock(key, token, lock_seconds):
+                value, locked = await self._wait_for_value(key, token, lock_seconds)
+                if value is not None:
+                    return value
+                if not locked:
+                    # Вычисляющий процесс не успел: считаем сами без блокировки
+                    token = None
+        try:
+            generation = await self.storage.get_generation() if tags else None
+            with _start_span('cache.compute', name):
+                started_at = time.monotonic()
+                value = await compute()
+                compute_seconds = time.monotonic() - started_at
+            self._compute_seconds.set(key, compute_seconds)
+            items = []
+            if value is not None:
+                items.append(
+                    (key, value, ttl_seconds, list(tags(value)) if tags else [])
+                )
+            elif not_found_seconds:
+                items.append(
+                    (
+                        key,
+                        NOT_FOUND,
+                        not_found_seconds,
+                        list(tags(None)) if tags else [],
+                    )
+                )
+            sizes = await self._set_computed(items, generation)
+            _count_computed(name, sizes, compute_seconds)
+            return value
+        finally:
+            if token is not None:
+                await self.storage.release_lock(key, token)
+
+    async def _wait_for_value(
+        self, key: str, token: str, timeout: float
+    ) -> tuple[Any, bool]:
+        """
+        Ждать значение, которое вычисляет держатель блокировки
+
+        Возвращает значение и признак того, что блокировку получил token:
+        держатель снял её, не записав значения (вычисление вернуло None
+        или упало), и считать теперь этому процессу.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            value = await self.get(key)
+            if value is None and await self.storage.acquire_lock(key, token, timeout):
+                # Значение могли записать между чтением и снятием блокировки
+                value = await self.get(key)
+                if value is None:
+                    return None, True
+                await self.storage.release_lock(key, token)
+            if value is not None:
+                return value, False
+        return None, False
+
+    def _computed(
+        self, key: str, name: str | None, future: asyncio.Future[Any]
+    ) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            if name is not None:
+                CACHE_COMPUTE_ERRORS.labels(function=name).inc()
+            # Фоновое обновление никто не ждёт, его ошибку видно только в логе
+            logging.warning("Cache compute of %s failed: %r", key, future.exception())
+
+    def _local_ttl(self, ttl_seconds: float | None) -> float | None:
+        assert self.local is not None
+        ttls = [ttl for ttl in (ttl_seconds, self.local.ttl) if ttl is not None]
+        return min(ttls) if ttls else None
+
+    def start_sync(self) -> None:
+        """Run `sync()` in background."""
+        if self.local is None:
+            return
+        if self.storage.channel is None:
+            # Хранилище не разделяется процессами: синхронизировать нечего
+            self.local_ready = True
+        elif self._sync_task is None:
+            self._sync_task = asyncio.create_task(self.sync())
 
+    async def stop_sync(self) -> None:
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
 
-def is_serializable(thing: Any) -> bool:
-    try:
-        json.dumps(thing)
-    except TypeError:
-        return False
-    return True
+    async def sync(self) -> None:
+        """Удалять из L1 ключи, записанные другими процессами, до отмены."""
+        while True:
+            try:
+                await self._sync()
+            except (RedisError, OSError) as e:
+                logging.warning("Cache invalidation sync failed: %s", e)
+            finally:
+                self.local_ready = False
+            await asyncio.sleep(1)
 
+    async def _sync(self) -> None:
+        assert self.local is not None
+        storage = cast(RedisCacheStorage, self.storage)
+        async with storage.pubsub() as pubsub:
+            await pubsub.subscribe(storage.channel)
+            # Пока подписки не было, сообщения терялись: L1 начинается с нуля
+            self.local.clear()
+            self.local_ready = True
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is not None:
+                    data = message["data"]
+                    origin, _, keys = (
+                        data.decode() if isinstance(data, bytes) else data
+                    ).partition(':')
+                    if origin != self._origin:
+                        for key in keys.split('\n'):
+                            self.local.pop(key)
 
-def prepare_key(func: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
-    key = {'callable': func.__name__, 'args': args, 'kwargs': sorted(kwargs.items())}
-    serialized = ""
-    try:
-        serialized = json.dumps(key)
-    except TypeError:
-        # if can't encode straight to json, we need to encode to base64 first
-        if not is_serializable(key['args']):
-            key['args'] = codecs.encode(pickle.dumps(key['args']), 'base64').decode()
-        if not is_serializable(key['kwargs']):
-            key['kwargs'] = codecs.encode(
-                pickle.dumps(key['kwargs']), 'base64'
-            ).decode()
-    serialized = json.dumps(key)
-    return serialized
+    @classmethod
+    def get_instance(cls) -> Cache | None:
+        return cast(Cache, cls._instances.get(cls))
 
 
 def get_cache() -> Cache:
     """
-    Получить инстанс Cache
+    Получить инстанс Cache, при первом вызове создать его по настройкам
+
+    Приложение вызывает его при старте, декораторы - при первом обращении
+    к кэшу, а не при импорте.
     """
     cache = Cache.get_instance()
     if cache:
         return cache
 
+    if settings.cache_backend == 'memory':
+        return Cache(MemoryCacheStorage(), tag_ttl_seconds=settings.cache_tag_seconds)
+
     redis_manager = get_manager()
-    storage = RedisCacheStorage(redis_manager.get_client())
-    return Cache(storage)
+    storage = RedisCacheStorage(
+        redis_manager.get_client(),
+        compress_min_bytes=settings.cache_compress_min_bytes,
+        compress_level=settings.cache_compress_level,
+    )
+    local = None
+    if settings.cache_local_size:
+        local = LRUCache[tuple[bytes, float | None]](
+            settings.cache_local_size, ttl=settings.cache_local_seconds
+        )
+    return Cache(storage, local, settings.cache_tag_seconds)
 
 
-def cache_decorator(cache_storage: Cache = get_cache()) -> Callable[..., Any]:
+def cache_decorator(
+    ttl_seconds: float | None = None,
+    tags: Callable[..., Iterable[str]] | None = None,
+    lock_seconds: float | None = None,
+    stale_seconds: float | None = None,
+    xfetch_beta: float | None = None,
+    not_found_seconds: float | None = None,
+    version: int | str = 1,
+    cache_storage: Cache | None = None,
+) -> Callable[..., Any]:
     """
     Декоратор для кэширования результатов вызываемого объекта
+
+    :param ttl_seconds: Время жизни результата,
+    по умолчанию settings.cache_expiration_in_seconds.
+    :param tags: Теги результата, вызывается с результатом и аргументами
+    вызова по именам. Записи сбрасываются через `Cache.invalidate_tags`.
+    :param lock_seconds: Блокировка пересчёта в Redis, чтобы при промахе
+    результат вычислял один процесс, а не все сразу.
+    :param stale_seconds: Сколько после ttl_seconds отдавать устаревший
+    результат, обновляя его в фоне.
+
+    Вычисление общее для всех ждущих его запросов и может их пережить,
+    поэтому метод репозитория с `detached()` выполняется на собственной
+    сессии, а не на сессии запроса, который его начал.
+    :param xfetch_beta: Вероятностное обновление до истечения ttl_seconds.
+    :param not_found_seconds: Кэшировать None на это время, tags для него
+    вызывается с None. Без него None не кэшируется.
+    :param version: Версия ключей, увеличить при изменении формата результата,
+    чтобы не читать записи, сохранённые старым кодом.
+    :param cache_storage: По умолчанию `get_cache()` на момент вызова.
     """
+    if ttl_seconds is None:
+        ttl_seconds = settings.cache_expiration_in_seconds
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+        build_key = key_builder(func, version)
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def get_tags(args: Any, kwargs: Any, response: Any) -> Iterable[str]:
+            assert tags is not None
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            return tags(response, **arguments.arguments)
+
+        async def compute(args: Any, kwargs: Any) -> Any:
+            owner = args[0] if args else None
+            if not hasattr(owner, 'detached'):
+                return await func(*args, **kwargs)
+            async with owner.detached() as detached:
+                return await func(detached, *args[1:], **kwargs)
+
         @wraps(func)
         async def inner(*args: Any, **kwargs: Any):
-            key = prepare_key(func, *args, **kwargs)
-            cached_response = await cache_storage.get(key)
-            response = cached_response.get('response') if cached_response else None
-            if not response or expired(cached_response.get('timestamp')):
-                response = await func(*args, **kwargs)
-                state = {'timestamp': datetime.now(), 'response': response}
-                await cache_storage.set(key, state)
-            return response
+            key = build_key(*args, **kwargs)
+            return await (cache_storage or get_cache()).get_or_set(
+                key,
+                partial(compute, args, kwargs),
+                ttl_seconds,
+                partial(get_tags, args, kwargs) if tags is not None else None,
+                lock_seconds,
+                stale_seconds,
+                xfetch_beta,
+                not_found_seconds=not_found_seconds,
+                name=name,
+            )
+
+        inner.cached = CachedFunction(  # type: ignore[attr-defined]
+            build_key,
+            get_tags if tags is not None else None,
+            (ttl_seconds or 0) + (stale_seconds or 0) or None,
+            not_found_seconds,
+        )
+        return inner
+
+    return decorator
+
+
+def cache_many_decorator(
+    single: Callable[..., Any],
+    item_id: Callable[[Any], Hashable],
+    group: bool = False,
+    cache_storage: Cache | None = None,
+) -> Callable[..., Any]:
+    """
+    Декоратор пакетного метода `func(self, ids)`, который кэширует значения
+    по отдельным id под ключами метода `single(self, id)`
+
+    Кэш читается одним MGET, func вызывается только для промахов, найденное
+    дописывается одним pipeline. Возвращает найденные значения в порядке ids.
+
+    :param single: Метод для одного id, кэшированный `cache_decorator`:
+    его ключи, TTL и теги.
+    :param item_id: id элемента, который вернула func.
+    :param group: single возвращает список элементов с этим id.
+    :param cache_storage: По умолчанию `get_cache()` на момент вызова.
+    """
+    cached: CachedFunction = single.cached  # type: ignore[attr-defined]
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        async def inner(owner: Any, ids: Iterable[Hashable]) -> list[Any]:
+            ids = list(dict.fromkeys(ids))
+
+            async def compute(missing: list[Hashable]) -> dict[Hashable, Any]:
+                found: dict[Hashable, Any] = (
+                    {id_: [] for id_ in missing} if group else {}
+                )
+                for item in await func(owner, missing) or ():
+                    if group:
+                        found[item_id(item)].append(item)
+                    else:
+                        found[item_id(item)] = item
+                return found
+
+            def get_tags(id_: Hashable, value: Any) -> Iterable[str]:
+                assert cached.get_tags is not None
+                return cached.get_tags((owner, id_), {}, value)
+
+            values = await (cache_storage or get_cache()).get_or_set_many(
+                {id_: cached.build_key(owner, id_) for id_ in ids},
+                compute,
+                cached.ttl_seconds,
+                get_tags if cached.get_tags is not None else None,
+                cached.not_found_seconds,
+                name,
+            )
+            if group:
+                return [item for id_ in ids for item in values[id_] or ()]
+            return [values[id_] for id_ in ids if values[id_] is not None]
 
         return inner
 
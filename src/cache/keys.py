@@ -0,0 +1,175 @@
+import dataclasses
+import datetime
+import enum
+import hashlib
+import inspect
+import uuid
+from typing import Any, Callable, Mapping, Sequence
+
+from pydantic import BaseModel
+
+KEY_DIGEST_SIZE = 16
+
+
+def _encode_str(value: str, parts: list[str]) -> None:
+    # Length-prefixed, so that ('a:', 'b') and ('a', ':b') differ
+    parts.append(f's{len(value)}:{value}')
+
+
+def _encode_bytes(value: bytes, parts: list[str]) -> None:
+    parts.append(f'b{value.hex()};')
+
+
+def _encode_int(value: int, parts: list[str]) -> None:
+    parts.append(f'i{value};')
+
+
+def _encode_float(value: float, parts: list[str]) -> None:
+    parts.append(f'f{value!r};')
+
+
+def _encode_bool(value: bool, parts: list[str]) -> None:
+    parts.append('T' if value else 'F')
+
+
+def _encode_none(value: None, parts: list[str]) -> None:
+    parts.append('N')
+
+
+def _encode_uuid(value: uuid.UUID, parts: list[str]) -> None:
+    parts.append(f'u{value.hex}')
+
+
+def _encode_datetime(value: datetime.date, parts: list[str]) -> None:
+    parts.append(f'd{value.isoformat()};')
+
+
+def _encode_sequence(value: Sequence[Any], parts: list[str]) -> None:
+    parts.append('[')
+    for item in value:
+        encode_key_part(item, parts)
+    parts.append(']')
+
+
+def _encode_set(value: set[Any] | frozenset[Any], parts: list[str]) -> None:
+    parts.append('<')
+    parts.extend(sorted(key_part(item) for item in value))
+    parts.append('>')
+
+
+def _encode_mapping(value: Mapping[Any, Any], parts: list[str]) -> None:
+    parts.append('{')
+    for key, item in sorted((key_part(key), item) for key, item in value.items()):
+        parts.append(key)
+        encode_key_part(item, parts)
+    parts.append('}')
+
+
+def _encode_object(name: str, state: Mapping[str, Any], parts: list[str]) -> None:
+    parts.append(f'o{name}')
+    _encode_mapping(state, parts)
+
+
+_ENCODERS: dict[type, Callable[[Any, list[str]], None]] = {
+    str: _encode_str,
+    bytes: _encode_bytes,
+    int: _encode_int,
+    float: _encode_float,
+    bool: _encode_bool,
+    type(None): _encode_none,
+    uuid.UUID: _encode_uuid,
+    datetime.datetime: _encode_datetime,
+    datetime.date: _encode_datetime,
+    tuple: _encode_sequence,
+    list: _encode_sequence,
+    set: _encode_set,
+    frozenset: _encode_set,
+    dict: _encode_mapping,
+}
+
+
+def encode_key_part(value: Any, parts: list[str]) -> None:
+    """
+    Append an unambiguous text encoding of value to parts.
+
+    Scalars, UUIDs, dates and containers are encoded by type, enums by
+    value, dataclasses, pydantic models and plain objects by class name
+    and fields.
+
+    :raises TypeError: The value has no fields to build a key from.
+    """
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        encoder(value, parts)
+    elif isinstance(value, enum.Enum):
+        encode_key_part(value.value, parts)
+    elif isinstance(value, BaseModel):
+        _encode_object(type(value).__qualname__, value.__dict__, parts)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        state = {
+            field.name: getattr(value, field.name)
+            for field in dataclasses.fields(value)
+        }
+        _encode_object(type(value).__qualname__, state, parts)
+    elif isinstance(value, Mapping):
+        _encode_mapping(value, parts)
+    else:
+        _encode_other(value, parts)
+
+
+def _encode_other(value: Any, parts: list[str]) -> None:
+    for base, encoder in _ENCODERS.items():
+        if isinstance(value, base):
+            encoder(value, parts)
+            return
+    if not hasattr(value, '__dict__') or callable(value):
+        raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+    _encode_object(type(value).__qualname__, vars(value), parts)
+
+
+def key_part(value: Any) -> str:
+    parts: list[str] = []
+    encode_key_part(value, parts)
+    return ''.join(parts)
+
+
+def make_key(
+    namespace: str, version: int | str, args: Sequence[Any], kwargs: Mapping[str, Any]
+) -> str:
+    """
+    Build a compact `namespace:version:hash` cache key.
+
+    Positional and keyword arguments hash differently, like they did with
+    the JSON keys, so `get(1)` and `get(user_id=1)` are cached separately.
+    """
+    parts: list[str] = []
+    _encode_sequence(args, parts)
+    if kwargs:
+        _encode_mapping(kwargs, parts)
+    digest = hashlib.blake2b(
+        ''.join(parts).encode(), digest_size=KEY_DIGEST_SIZE
+    ).hexdigest()
+    return f'{namespace}:{version}:{digest}'
+
+
+def key_builder(
+    func: Callable[..., Any], version: int | str = 1, namespace: str | None = None
+) -> Callable[..., str]:
+    """
+    Key function for the calls of func.
+
+    The bound `self` or `cls` is not part of the key: the result of
+    a repository method does not depend on the repository instance.
+
+    :param version: Bump to drop the entries cached by older code.
+    :param namespace: Defaults to the qualified name of func.
+    """
+    if namespace is None:
+        namespace = f'{func.__module__}.{func.__qualname__}'
+    parameters = list(inspect.signature(func).parameters)
+    skip_first = bool(parameters) and parameters[0] in ('self', 'cls')
+
+    def build(*args: Any, **kwargs: Any) -> str:
+        return make_key(namespace, version, args[1:] if skip_first else args, kwargs)
+
+    return build
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+VT = TypeVar("VT")
+
+_MISSING = object()
+
+
+class LRUCache(Generic[VT]):
+    """
+    Bounded in-process LRU cache with per-entry expiry.
+
+    Not thread-safe: meant to be shared by coroutines of a single event loop.
+
+    :param maxsize: Maximum number of entries, the least recently used
+    entry is evicted first.
+    :param ttl: Default entry lifetime in seconds, entries never expire if None.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> VT | Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: VT,
+        ttl: float | None = None,
+        expires_at: float | None = None,
+    ) -> None:
+        """
+        Put a value in the cache.
+
+        :param ttl: Entry lifetime in seconds, overrides the default one.
+        :param expires_at: Unix timestamp of the entry expiry, overrides `ttl`.
+        """
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            ttl = ttl if ttl is not None else self.ttl
+            expires_at = time.time() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> VT | Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,132 @@
+import time
+from typing import Iterable, Sequence
+
+from .abc_cache import CacheStorageABC
+
+
+class MemoryCacheStorage(CacheStorageABC):
+    """
+    Хранилище кэша в памяти процесса с API RedisCacheStorage.
+
+    Для тестов и локальных бенчмарков: процессы его не разделяют, а
+    истёкшие записи удаляются только при обращении к ним.
+    """
+
+    channel = None
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        # Ключи тега со временем их истечения
+        self._tags: dict[str, tuple[dict[str, float | None], float | None]] = {}
+        self._generation = 0
+        self._tag_generations: dict[str, tuple[int, float | None]] = {}
+        self._locks: dict[str, tuple[str, float]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return (await self.get_with_ttl(key))[0]
+
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        return [(await self.get_with_ttl(key))[0] for key in keys]
+
+    async def get_with_ttl(self, key: str) -> tuple[bytes | None, float | None]:
+        value, expires_at = self._data.get(key, (None, None))
+        if expires_at is None:
+            return value, None
+        ttl_seconds = expires_at - time.monotonic()
+        if ttl_seconds <= 0:
+            del self._data[key]
+            return None, None
+        return value, ttl_seconds
+
+    async def get_many_with_ttl(
+        self, keys: Sequence[str]
+    ) -> list[tuple[bytes | None, float | None]]:
+        return [await self.get_with_ttl(key) for key in keys]
+
+    async def set(
+        self,
+        key: str,
+        value: bytes | bytearray | memoryview | None,
+        ttl_seconds: float | None = None,
+        tags: Iterable[str] = (),
+        tag_ttl_seconds: float | None = None,
+    ) -> bool:
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError(
+                f"Expected bytes or None value for key {key}, but have {type(value)}"
+            )
+        now = time.monotonic()
+        key_expires_at = _expires_at(ttl_seconds)
+        self._data[key] = (bytes(value), key_expires_at)
+        for tag in tags:
+            keys, expires_at = self._tags.get(tag, ({}, None))
+            if expires_at is not None and expires_at <= now:
+                keys = {}
+            # Истёкшие ключи уходят из тега, иначе он растёт без предела
+            keys = {
+                tag_key: tag_key_expires_at
+                for tag_key, tag_key_expires_at in keys.items()
+                if tag_key_expires_at is None or tag_key_expires_at > now
+            }
+            keys[key] = key_expires_at
+            self._tags[tag] = (keys, _expires_at(tag_ttl_seconds) or expires_at)
+        return True
+
+    async def set_many(
+        self,
+        items: Iterable[tuple[str, bytes, float | None, Iterable[str]]],
+        tag_ttl_seconds: float | None = None,
+    ) -> None:
+        for key, value, ttl_seconds, tags in items:
+            await self.set(key, value, ttl_seconds, tags, tag_ttl_seconds)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> list[str]:
+        now = time.monotonic()
+        self._generation += 1
+        keys: set[str] = set()
+        for tag in tags:
+            self._tag_generations[tag] = (
+                self._generation,
+                _expires_at(self.generation_seconds),
+            )
+            tag_keys, expires_at = self._tags.pop(tag, ({}, None))
+            if expires_at is None or expires_at > now:
+                keys |= tag_keys.keys()
+        await self.delete(list(keys))
+        return list(keys)
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def get_generation(self) -> int:
+        return self._generation
+
+    async def get_tag_generations(self, tags: Sequence[str]) -> list[int]:
+        now = time.monotonic()
+        generations = []
+        for tag in tags:
+            generation, expires_at = self._tag_generations.get(tag, (0, None))
+            if expires_at is not None and expires_at <= now:
+                del self._tag_generations[tag]
+                generation = 0
+            generations.append(generation)
+        return generations
+
+    async def publish(self, message: str):
+        pass
+
+    async def acquire_lock(self, key: str, token: str, ttl_seconds: float) -> bool:
+        _, expires_at = self._locks.get(key, (None, 0.0))
+        if expires_at > time.monotonic():
+            return False
+        self._locks[key] = (token, time.monotonic() + ttl_seconds)
+        return True
+
+    async def release_lock(self, key: str, token: str):
+        if self._locks.get(key, (None,))[0] == token:
+            del self._locks[key]
+
+
+def _expires_at(ttl_seconds: float | None) -> float | None:
+    return time.monotonic() + ttl_seconds if ttl_seconds else None
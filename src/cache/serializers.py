@@ -0,0 +1,286 @@
+import datetime
+import enum
+import hashlib
+import pickle
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import orjson
+from pydantic import BaseModel
+from pydantic.fields import (
+    SHAPE_ITERABLE,
+    SHAPE_LIST,
+    SHAPE_SEQUENCE,
+    SHAPE_SINGLETON,
+    ModelField,
+)
+
+Converter = Callable[[Any], Any]
+
+SCHEMA_DIGEST_SIZE = 4
+UUID_CACHE_SIZE = 4096
+# Iterable shapes are validated into lists, so they round-trip as lists
+_LIST_SHAPES = (SHAPE_LIST, SHAPE_SEQUENCE, SHAPE_ITERABLE)
+_JSON_FORMAT = b'j'
+# Models the payloads may name, by `module:qualname`
+_registered_models: dict[str, type[BaseModel]] = {}
+
+
+# Rows repeat the same user and role ids, and parsing a UUID is the bulk
+# of decoding
+_parse_uuid = lru_cache(maxsize=UUID_CACHE_SIZE)(uuid.UUID)
+
+
+class SerializationError(ValueError):
+    pass
+
+
+def register_models(*model_types: type[BaseModel]) -> None:
+    """
+    Allow ModelSerializer to decode payloads of these models.
+
+    A payload names the class it was written for, so only registered
+    models, and the models they nest, are restored from it.
+    """
+    for model_type in model_types:
+        _registered_models[_model_name(model_type)] = model_type
+
+
+def _model_name(model_type: type[BaseModel]) -> str:
+    return f'{model_type.__module__}:{model_type.__qualname__}'
+
+
+class CacheSerializer(ABC):
+    """Turns cached values into bytes and back."""
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def loads(self, data: bytes | bytearray | memoryview) -> Any:
+        """:raises SerializationError: The payload cannot be decoded."""
+
+
+class PickleSerializer(CacheSerializer):
+    def dumps(self, value: Any) -> bytes:
+        try:
+            return pickle.dumps(value)
+        except (TypeError, AttributeError, pickle.PicklingError) as e:
+            raise SerializationError(e) from e
+
+    def loads(self, data: bytes | bytearray | memoryview) -> Any:
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            raise SerializationError(e) from e
+
+
+class _UnsupportedModel(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class _Schema:
+    model_type: type[BaseModel]
+    tag: str
+    names: tuple[str, ...]
+    converters: tuple[tuple[int, Converter], ...]
+
+    def row(self, model: BaseModel) -> list[Any]:
+        values = model.__dict__
+        if len(values) != len(self.names):
+            # Extra fields are not part of the schema
+            raise _UnsupportedModel()
+        return list(values.values())
+
+    def build(self, row: list[Any], fields_set: list[str] | None = None) -> Any:
+        """Rebuild a model like construct() does, without validation."""
+        for index, convert in self.converters:
+            if row[index] is not None:
+                row[index] = convert(row[index])
+        model = object.__new__(self.model_type)
+        object.__setattr__(model, '__dict__', dict(zip(self.names, row)))
+        object.__setattr__(
+            model,
+            '__fields_set__',
+            set(self.names if fields_set is None else fields_set),
+        )
+        return model
+
+
+class ModelSerializer(CacheSerializer):
+    """
+    orjson encoding of pydantic models and lists of models.
+
+    A model is stored as the row of its field values, tagged with the class
+    and a digest of its fields. Decoding converts the values whose JSON
+    form differs from their type (UUIDs, datetimes, enums, nested models)
+    and rebuilds the model without validation. A payload written for other
+    fields of the class, e.g. before a deploy that changed it, is rejected
+    and thus treated as a miss.
+
+    Other values, and models with fields the decoder cannot restore, fall
+    back to `fallback`. So do lists unless `encode_lists` is set: rows keep
+    UUIDs and datetimes as strings, and for 50 `EventRead` they are 45%
+    larger than pickle, 8% after zlib (benchmarks.bench_cache_serializers),
+    while encoding 6 times faster.
+
+    Only models passed to `register_models` are decoded, along with the
+    models this serializer has encoded itself.
+    """
+
+    def __init__(
+        self, fallback: CacheSerializer | None = None, encode_lists: bool = False
+    ):
+        self.fallback = fallback or PickleSerializer()
+        self.encode_lists = encode_lists
+        self._schemas: dict[type[BaseModel], _Schema | None] = {}
+        self._tags: dict[str, _Schema] = {}
+
+    def dumps(self, value: Any) -> bytes:
+        try:
+            payload = self._encode(value)
+            if payload is not None:
+                return _JSON_FORMAT + orjson.dumps(payload, default=self._encode_nested)
+        except (TypeError, _UnsupportedModel):
+            pass
+        return self.fallback.dumps(value)
+
+    def loads(self, data: bytes | bytearray | memoryview) -> Any:
+        data = bytes(data)
+        if not data.startswith(_JSON_FORMAT):
+            return self.fallback.loads(data)
+        try:
+            payload = orjson.loads(data[len(_JSON_FORMAT) :])
+            schema = self._get_schema_by_tag(payload['m'])
+            if 'r' not in payload:
+                return schema.build(payload['v'], payload.get('s'))
+            fields_sets = payload.get('s', {})
+            return [
+                schema.build(row, fields_sets.get(str(index)))
+                for index, row in enumerate(payload['r'])
+            ]
+        except (
+            _UnsupportedModel,
+            AttributeError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ) as e:
+            raise SerializationError(e) from e
+
+    def _encode(self, value: Any) -> dict[str, Any] | None:
+        # Only models keep their types, a bare UUID would come back as str
+        if isinstance(value, BaseModel):
+            return self._encode_nested(value)
+        if not self.encode_lists or not isinstance(value, list) or not value:
+            return None
+        model_type = type(value[0])
+        if not all(type(item) is model_type for item in value):
+            return None
+        schema = self._get_schema(model_type)
+        fields_sets = {
+            str(index): list(item.__fields_set__)
+            for index, item in enumerate(value)
+            if len(item.__fields_set__) != len(schema.names)
+        }
+        payload = {'m': schema.tag, 'r': [schema.row(item) for item in value]}
+        if fields_sets:
+            payload['s'] = fields_sets
+        return payload
+
+    def _encode_nested(self, model: Any) -> dict[str, Any]:
+        if not isinstance(model, BaseModel):
+            raise TypeError(type(model).__name__)
+        schema = self._get_schema(type(model))
+        payload = {'m': schema.tag, 'v': schema.row(model)}
+        if len(model.__fields_set__) != len(schema.names):
+            # Keeps exclude_unset dumps of loaded models as they were
+            payload['s'] = list(model.__fields_set__)
+        return payload
+
+    def _decode_nested(self, payload: dict[str, Any]) -> Any:
+        return self._get_schema_by_tag(payload['m']).build(
+            payload['v'], payload.get('s')
+        )
+
+    def _get_schema(self, model_type: type[BaseModel]) -> _Schema:
+        if not issubclass(model_type, BaseModel):
+            raise _UnsupportedModel()
+        if model_type not in self._schemas:
+            # Self-referencing models fall back, not recurse
+            self._schemas[model_type] = None
+            self._schemas[model_type] = self._build_schema(model_type)
+        schema = self._schemas[model_type]
+        if schema is None:
+            raise _UnsupportedModel()
+        return schema
+
+    def _build_schema(self, model_type: type[BaseModel]) -> _Schema | None:
+        try:
+            converters = tuple(
+                (index, converter)
+                for index, field in enumerate(model_type.__fields__.values())
+                if (converter := self._get_field_converter(field)) is not None
+            )
+        except _UnsupportedModel:
+            return None
+        schema = _Schema(
+            model_type,
+            f'{_model_name(model_type)}:{schema_digest(model_type)}',
+            tuple(model_type.__fields__),
+            converters,
+        )
+        self._tags[schema.tag] = schema
+        return schema
+
+    def _get_schema_by_tag(self, tag: str) -> _Schema:
+        if tag not in self._tags:
+            name, _ = tag.rsplit(':', 1)
+            if name not in _registered_models:
+                raise ValueError(f"{name} is not a registered model")
+            # Nested models are registered along with their schemas
+            self._get_schema(_registered_models[name])
+        if tag not in self._tags:
+            raise ValueError(f"{tag} was written for other model fields")
+        return self._tags[tag]
+
+    def _get_field_converter(self, field: ModelField) -> Converter | None:
+        convert = self._get_type_converter(field.type_)
+        if convert is None or field.shape == SHAPE_SINGLETON:
+            return convert
+        if field.shape in _LIST_SHAPES:
+            return lambda items: [convert(item) for item in items]
+        raise _UnsupportedModel()
+
+    def _get_type_converter(self, type_: Any) -> Converter | None:
+        if not isinstance(type_, type):
+            # Unions and the like: no telling which type to restore
+            raise _UnsupportedModel()
+        if issubclass(type_, BaseModel):
+            self._get_schema(type_)
+            return self._decode_nested
+        if issubclass(type_, uuid.UUID):
+            return _parse_uuid
+        if issubclass(type_, datetime.datetime):
+            return datetime.datetime.fromisoformat
+        if issubclass(type_, datetime.date):
+            return datetime.date.fromisoformat
+        if issubclass(type_, enum.Enum):
+            return type_
+        return None
+
+
+def schema_digest(model_type: type[BaseModel]) -> str:
+    """Digest of the field names and types of a model."""
+    schema = repr(
+        [
+            (name, repr(field.outer_type_), field.required)
+            for name, field in model_type.__fields__.items()
+        ]
+    )
+    return hashlib.blake2b(schema.encode(), digest_size=SCHEMA_DIGEST_SIZE).hexdigest()
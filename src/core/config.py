@@ -1,5 +1,6 @@
 import os
 from logging import config as logging_config
+from typing import Literal
 
 from pydantic import SecretStr
 from pydantic.env_settings import BaseSettings
@@ -18,7 +19,30 @@ class Settings(BaseSettings):
     # Настройки Redis
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    # Хранилище кэша: redis или memory (в памяти процесса, для тестов)
+    cache_backend: Literal['redis', 'memory'] = 'redis'
     cache_expiration_in_seconds: int = 300
+    # Время жизни кэша по сущностям
+    cache_user_seconds: int = 300
+    cache_role_seconds: int = 300
+    cache_access_right_seconds: int = 300
+    cache_sign_in_history_seconds: int = 60
+    # Время жизни отрицательных результатов (пользователь не найден)
+    cache_not_found_seconds: int = 30
+    # Время жизни тегов инвалидации (не меньше самого долгого TTL кэша)
+    cache_tag_seconds: int = 3600
+    # Блокировка пересчёта горячих ключей между процессами (0 - отключить)
+    cache_lock_seconds: float = 2
+    # Сколько отдавать устаревшие пользователей и роли, обновляя их в фоне,
+    # и коэффициент вероятностного обновления до истечения (0 - отключить)
+    cache_stale_seconds: float = 60
+    cache_xfetch_beta: float = 1.0
+    # Сжатие zlib значений кэша от этого размера в байтах (0 - отключить)
+    cache_compress_min_bytes: int = 1024
+    cache_compress_level: int = 1
+    # In-process кэш (L1) перед Redis: число записей (0 - отключить) и их TTL
+    cache_local_size: int = 1024
+    cache_local_seconds: float = 5
 
     # Настройки PSQL
     pghost: str = "localhost"
@@ -36,6 +60,32 @@ class Settings(BaseSettings):
     verification_password_token_secret: SecretStr = SecretStr('verify_password')
     access_token_secret: SecretStr = SecretStr('access_token')
     refresh_token_secret: SecretStr = SecretStr('refresh_token')
+    # Access-токены несут флаги пользователя и читаются без запроса в БД
+    access_token_stateless: bool = False
+    # JSON-манифест ключей для асимметричной подписи access-токенов (RS256/ES256/EdDSA)
+    access_token_keyring_path: str | None = None
+    # Размер in-process кэша проверенных access-токенов (0 - отключить)
+    access_token_decode_cache_size: int = 4096
+    # Непрозрачные access-токены: сессия хранится в Redis вместо JWT
+    access_token_opaque: bool = False
+    # Bloom-фильтр отозванных токенов: ожидаемое число id (0 - отключить),
+    # доля ложных срабатываний и период пересборки из Redis
+    token_blacklist_bloom_capacity: int = 100_000
+    token_blacklist_bloom_error_rate: float = 0.001
+    token_blacklist_bloom_rebuild_seconds: int = 300
+    # /login возвращает access-токен вместе с refresh-токеном. Меняет ответ
+    # /login и схему ответа /refresh в OpenAPI: включать вместе с клиентами
+    login_token_pair: bool = False
+    # Ротация refresh-токенов: каждый /refresh выдаёт новый refresh-токен
+    # (в ответе появляется поле refresh_token), повторное предъявление
+    # старого отзывает всё семейство. Включать, когда клиенты сохраняют
+    # новый refresh-токен: иначе второй /refresh вернёт 401
+    refresh_token_rotation: bool = False
+    # Метки "токены, выпущенные раньше, недействительны": срок хранения метки
+    # (не меньше жизни самого долгого токена) и in-process кэш её чтений
+    session_watermark_ttl_seconds: int = 86400
+    session_watermark_cache_size: int = 10_000
+    session_watermark_cache_seconds: float = 5
 
     # Корень проекта
     base_dir = os.path.dirname(os.path.dirname(__file__))
@@ -47,6 +97,8 @@ class Settings(BaseSettings):
     jaeger_enabled = False
     tracer_enabled = False
     rate_limits = False
+    # /metrics без аутентификации: включать, только если он недоступен извне
+    metrics_enabled = False
 
     # notifications
     url_notification_event_registration_on: str = (
@@ -82,6 +82,10 @@ class TokenInBlacklist(AppException):
     pass
 
 
+class SigningKeyNotFound(AppException):
+    pass
+
+
 class UserHasNoRight(AppException):
     pass
 
@@ -0,0 +1,175 @@
+import dataclasses
+import json
+from datetime import datetime, timedelta
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Sequence
+
+from jwt.algorithms import get_default_algorithms
+
+from core.exceptions import SigningKeyNotFound
+from core.jwt_utils import SecretType, key_registry
+
+SYMMETRIC_ALGORITHMS = ("HS256", "HS384", "HS512")
+
+
+@dataclasses.dataclass(frozen=True)
+class SigningKey:
+    """
+    A key of the key ring.
+
+    :param kid: Key id, written to the `kid` header of issued tokens.
+    :param algorithm: JWT algorithm of the key (RS256, ES256, EdDSA...).
+    :param public_key: Key used to verify tokens.
+    :param private_key: Key used to sign tokens. Retired keys may omit it
+    and stay in the ring only to verify the tokens they have already signed.
+    :param not_before: Start of the signing window, unbounded if None.
+    :param not_after: End of the signing window, unbounded if None.
+    """
+
+    kid: str
+    algorithm: str
+    public_key: SecretType
+    private_key: SecretType | None = None
+    not_before: datetime | None = None
+    not_after: datetime | None = None
+
+    @cached_property
+    def verifying_key(self) -> Any:
+        """Parsed public key."""
+        return key_registry.get(self.public_key, self.algorithm)
+
+    @cached_property
+    def signing_key(self) -> Any:
+        """Parsed private key."""
+        if self.private_key is None:
+            return None
+        return key_registry.get(self.private_key, self.algorithm)
+
+    def can_sign(self, now: datetime) -> bool:
+        if self.private_key is None:
+            return False
+        if self.not_before and now < self.not_before:
+            return False
+        return not self.not_after or now < self.not_after
+
+    def can_verify(self, now: datetime, grace: timedelta) -> bool:
+        if self.not_before and now < self.not_before:
+            return False
+        return not self.not_after or now < self.not_after + grace
+
+    def to_jwk(self) -> dict[str, Any]:
+        algorithm = get_default_algorithms()[self.algorithm]
+        jwk = algorithm.to_jwk(self.verifying_key, as_dict=True)  # type: ignore
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeyRing:
+    """
+    Set of signing keys with overlapping validity windows.
+
+    Tokens are signed with the newest key whose signing window is open.
+    A key keeps verifying tokens for `verify_grace_seconds` after its signing
+    window closes, so tokens issued right before a rotation stay valid
+    until they expire.
+
+    :param keys: Keys of the ring.
+    :param verify_grace_seconds: How long a retired key still verifies tokens,
+    usually the lifetime of the tokens it signs.
+    :param legacy_key: Key verifying tokens without a `kid` header, issued
+    before the key ring was introduced. Its `not_after` closes the window
+    like for any retired key.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[SigningKey],
+        verify_grace_seconds: int = 0,
+        legacy_key: SigningKey | None = None,
+    ):
+        self.keys = {key.kid: key for key in keys}
+        self.verify_grace = timedelta(seconds=verify_grace_seconds)
+        self.legacy_key = legacy_key
+
+    def prepare(self) -> None:
+        """Parse every key up front instead of on first use."""
+        for key in self.keys.values():
+            _ = key.verifying_key, key.signing_key
+        if self.legacy_key:
+            _ = self.legacy_key.verifying_key
+
+    def signing_key(self, now: datetime | None = None) -> SigningKey:
+        now = now or datetime.utcnow()
+        candidates = [key for key in self.keys.values() if key.can_sign(now)]
+        if not candidates:
+            raise SigningKeyNotFound()
+        return max(candidates, key=lambda key: key.not_before or datetime.min)
+
+    def verification_key(
+        self, kid: str | None, now: datetime | None = None
+    ) -> SigningKey | None:
+        key = self.keys.get(kid) if kid else self.legacy_key
+        if key is None or not key.can_verify(
+            now or datetime.utcnow(), self.verify_grace
+        ):
+            return None
+        return key
+
+    def jwks(self, now: datetime | None = None) -> dict[str, list[dict[str, Any]]]:
+        """Return public keys that still verify tokens as a JWK Set."""
+        now = now or datetime.utcnow()
+        return {
+            "keys": [
+                key.to_jwk()
+                for key in self.keys.values()
+                if key.algorithm not in SYMMETRIC_ALGORITHMS
+                and key.can_verify(now, self.verify_grace)
+            ]
+        }
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        verify_grace_seconds: int = 0,
+        legacy_key: SigningKey | None = None,
+    ) -> "KeyRing":
+        """
+        Load a key ring from a JSON manifest.
+
+        Manifest format::
+
+            {"keys": [{"kid": "2023-07", "algorithm": "RS256",
+                       "private_key_file": "2023-07.pem",
+                       "public_key_file": "2023-07.pub.pem",
+                       "not_before": "2023-07-01T00:00:00",
+                       "not_after": "2023-08-01T00:00:00"}]}
+
+        Key file paths are resolved relative to the manifest.
+        """
+        manifest_path = Path(path)
+        manifest = json.loads(manifest_path.read_text())
+        keys = []
+        for item in manifest["keys"]:
+            private_key_file = item.get("private_key_file")
+            keys.append(
+                SigningKey(
+                    kid=item["kid"],
+                    algorithm=item["algorithm"],
+                    public_key=(
+                        manifest_path.parent / item["public_key_file"]
+                    ).read_text(),
+                    private_key=(
+                        (manifest_path.parent / private_key_file).read_text()
+                        if private_key_file
+                        else None
+                    ),
+                    not_before=_parse_datetime(item.get("not_before")),
+                    not_after=_parse_datetime(item.get("not_after")),
+                )
+            )
+        return cls(keys, verify_grace_seconds, legacy_key)
+
+
+def _parse_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from typing import Any
 
 import jwt
+from jwt.algorithms import get_default_algorithms
 from pydantic import SecretStr
 
 SecretType = str and SecretStr
@@ -9,9 +10,55 @@ JWT_ALGORITHM = "HS256"
 
 
 def _get_secret_value(secret: SecretType) -> str:
-    if isinstance(secret, str):
-        return secret
-    return secret.get_secret_value()
+    if isinstance(secret, SecretStr):
+        return secret.get_secret_value()
+    return secret
+
+
+def prepare_key(secret: SecretType, algorithm: str) -> Any:
+    """
+    Parse a key for `algorithm`.
+
+    :raises jwt.InvalidKeyError: The key can't be used with `algorithm`.
+    """
+    try:
+        return get_default_algorithms()[algorithm].prepare_key(
+            _get_secret_value(secret)
+        )
+    except (KeyError, ValueError, TypeError) as e:
+        raise jwt.InvalidKeyError(f"Invalid {algorithm} key: {e}") from e
+
+
+class KeyRegistry:
+    """
+    Parsed keys by key material and algorithm.
+
+    PyJWT parses PEM keys on every encode and decode. Keys are parsed and
+    validated once here, and `generate_jwt` and `decode_jwt` reuse them.
+    """
+
+    def __init__(self):
+        self._keys: dict[tuple[Any, str], Any] = {}
+
+    def get(self, secret: SecretType, algorithm: str) -> Any:
+        """
+        Return the parsed key, pass parsed key objects through.
+
+        :raises jwt.InvalidKeyError: The key can't be used with `algorithm`.
+        """
+        value = _get_secret_value(secret)
+        if not isinstance(value, (str, bytes)):
+            return value
+        key = self._keys.get((value, algorithm))
+        if key is None:
+            key = self._keys[value, algorithm] = prepare_key(value, algorithm)
+        return key
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+
+key_registry = KeyRegistry()
 
 
 def generate_jwt(
@@ -19,12 +66,18 @@ def generate_jwt(
     secret: SecretType,
     lifetime_seconds: int | None = None,
     algorithm: str = JWT_ALGORITHM,
+    headers: dict[str, Any] | None = None,
 ) -> str:
     payload = data.copy()
     if lifetime_seconds:
         expire = datetime.utcnow() + timedelta(seconds=lifetime_seconds)
         payload["exp"] = expire
-    return jwt.encode(payload, _get_secret_value(secret), algorithm=algorithm)
+    return jwt.encode(
+        payload,
+        key_registry.get(secret, algorithm),
+        algorithm=algorithm,
+        headers=headers,
+    )
 
 
 def decode_jwt(
@@ -33,6 +86,10 @@ def decode_jwt(
     audience: list[str],
     algorithms: list[str] = [JWT_ALGORITHM],
 ) -> dict[str, Any]:
-    return jwt.decode(
-        encoded_jwt, _get_secret_value(secret), audience=audience, algorithms=algorithms
+    # Ключ разбирается под единственный алгоритм; при нескольких его разберёт PyJWT
+    key = (
+        key_registry.get(secret, algorithms[0])
+        if len(algorithms) == 1
+        else _get_secret_value(secret)
     )
+    return jwt.decode(encoded_jwt, key, audience=audience, algorithms=algorithms)
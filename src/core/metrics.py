@@ -0,0 +1,14 @@
+"""
+Prometheus metrics of the worker.
+
+Metrics are per worker: a scraper aggregates them across processes.
+"""
+from prometheus_client import CollectorRegistry
+
+# Metrics of the application, without the default process collectors
+registry = CollectorRegistry()
+
+
+def get_value(name: str, **labels: str) -> float:
+    """Return the current value of a sample, 0 until it is first recorded."""
+    return registry.get_sample_value(name, labels) or 0
@@ -6,12 +6,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import Select
 
-from cache.cache import cache_decorator
+from cache.cache import cache_decorator, cache_many_decorator, get_cache
+from cache.serializers import register_models
+from core.config import settings
 from core.pagination import PaginateQueryParams
 
 from . import base, generics
 from .schemas import models
 
+# Модели, которые кэшируют репозитории модуля
+register_models(models.AccessRight, models.RoleAccessRight)
+
 
 class SAAccessRight(base.SQLAlchemyBase):
     """Base SQLAlchemy access_right table definition."""
@@ -24,7 +29,10 @@ class SAAccessRight(base.SQLAlchemyBase):
     name: Mapped[str] = mapped_column(String(length=100), nullable=False, index=True)
 
 
-class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID]):
+class SAAccessRightDB(
+    base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID],
+    base.DetachableSessionMixin,
+):
     session: AsyncSession
     access_right_table: type[SAAccessRight]
 
@@ -57,7 +65,10 @@ class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID
             models.AccessRight.from_orm(result[0]) for result in results.fetchall()
         )
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_access_right_seconds,
+        tags=lambda result, access_right_id, **_: [f'right:{access_right_id}'],
+    )
     async def get(self, access_right_id: uuid.UUID) -> models.AccessRight | None:
         model = await self._get_access_right_by_id(access_right_id)
 
@@ -65,13 +76,13 @@ class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID
             return models.AccessRight.from_orm(model)
         return None
 
-    @cache_decorator()
+    @cache_many_decorator(get, lambda right: right.id)
     async def get_multiple(
         self, access_right_ids: Iterable[uuid.UUID]
-    ) -> Iterable[models.AccessRight]:
+    ) -> list[models.AccessRight]:
         rights = await self._get_access_rights_by_ids(access_right_ids)
 
-        return [models.AccessRight.from_orm(right) for right in rights]
+        return [models.AccessRight.from_orm(right[0]) for right in rights]
 
     async def create(self, create_dict: Mapping[str, Any]) -> models.AccessRight:
         access_right = self.access_right_table(**create_dict)
@@ -89,6 +100,7 @@ class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID
         self.session.add(model)
         await self.session.commit()
         await self.session.refresh(model)
+        await get_cache().invalidate_tags(f'right:{access_right.id}')
 
         return models.AccessRight.from_orm(model)
 
@@ -97,6 +109,7 @@ class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID
 
         await self.session.delete(model)
         await self.session.commit()
+        await get_cache().invalidate_tags(f'right:{access_right_id}')
 
     async def _get_access_right(
         self, statement: Select[tuple[SAAccessRight]]
@@ -130,13 +143,6 @@ class SAAccessRightDB(base.BaseAccessRightDatabase[models.AccessRight, uuid.UUID
         )
         return await self._get_access_rights(statement)
 
-    def __getstate__(self):
-        """pickle.dumps()"""
-        # Определяем, какие атрибуты должны быть сериализованы
-        state = self.__class__.__name__
-
-        return state
-
 
 class SARoleAccessRight(base.SQLAlchemyBase):
     __tablename__ = "role_access_right"
@@ -158,8 +164,19 @@ class SARoleAccessRight(base.SQLAlchemyBase):
     )
 
 
+def role_access_rights_tags(
+    role_rights: Iterable[models.RoleAccessRight], role_id: uuid.UUID, **_: Any
+) -> list[str]:
+    """Права роли сбрасываются изменением роли или самого права"""
+    return [
+        f'rights:role:{role_id}',
+        *(f'right:{role_right.access_right_id}' for role_right in role_rights),
+    ]
+
+
 class SARoleAccessRightDB(
-    base.BaseRoleAccessRightDatabase[models.RoleAccessRight, uuid.UUID]
+    base.BaseRoleAccessRightDatabase[models.RoleAccessRight, uuid.UUID],
+    base.DetachableSessionMixin,
 ):
     session: AsyncSession
     role_access_right_table: type[SARoleAccessRight]
@@ -170,7 +187,13 @@ class SARoleAccessRightDB(
         self.session = session
         self.role_access_right_table = role_access_right_table
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_access_right_seconds,
+        tags=lambda result, role_id, access_right_id, **_: [
+            f'rights:role:{role_id}',
+            f'right:{access_right_id}',
+        ],
+    )
     async def get(
         self, role_id: uuid.UUID, access_right_id: uuid.UUID
     ) -> models.RoleAccessRight | None:
@@ -184,7 +207,7 @@ class SARoleAccessRightDB(
             return None
         return models.RoleAccessRight.from_orm(model)
 
-    @cache_decorator()
+    @cache_decorator(settings.cache_access_right_seconds, tags=role_access_rights_tags)
     async def get_role_access_rights(
         self, role_id: uuid.UUID
     ) -> Iterable[models.RoleAccessRight]:
@@ -193,16 +216,16 @@ class SARoleAccessRightDB(
         )
         role_rights = await self._get_role_access_rights(statement)
 
-        return (
-            [models.RoleAccessRight.from_orm(role_right) for role_right in role_rights]
-            if role_rights
-            else []
-        )
+        return [
+            models.RoleAccessRight.from_orm(role_right[0]) for role_right in role_rights
+        ]
 
-    @cache_decorator()
+    @cache_many_decorator(
+        get_role_access_rights, lambda role_right: role_right.role_id, group=True
+    )
     async def get_roles_access_rights(
         self, role_ids: Iterable[uuid.UUID]
-    ) -> Iterable[models.RoleAccessRight]:
+    ) -> list[models.RoleAccessRight]:
         if not role_ids:
             return []
         statement = select(self.role_access_right_table).where(
@@ -210,28 +233,35 @@ class SARoleAccessRightDB(
         )
         role_rights = await self._get_role_access_rights(statement)
 
-        return (
-            [models.RoleAccessRight.from_orm(role_right) for role_right in role_rights]
-            if role_rights
-            else []
-        )
+        return [
+            models.RoleAccessRight.from_orm(role_right[0]) for role_right in role_rights
+        ]
 
     async def create(self, create_dict: Mapping[str, Any]) -> models.RoleAccessRight:
         role_access_right = self.role_access_right_table(**create_dict)
         self.session.add(role_access_right)
         await self.session.commit()
+        await get_cache().invalidate_tags(f'rights:role:{role_access_right.role_id}')
         return models.RoleAccessRight.from_orm(role_access_right)
 
     async def update(
         self, role_access_right: models.RoleAccessRight, update_dict: Mapping[str, Any]
     ) -> models.RoleAccessRight:
-        model = self.get(role_access_right.role_id, role_access_right.access_right_id)
-        for key, value in update_dict.items():
-            setattr(role_access_right, key, value)
-            setattr(model, key, value)
-        self.session.add(role_access_right)
+        statement = select(self.role_access_right_table).where(
+            self.role_access_right_table.id == role_access_right.id
+        )
+        model = await self._get_role_access_right(statement)
+        # Аргумент может быть значением из кэша: меняется только новая модель
+        updated = role_access_right.copy(update=dict(update_dict))
+        if model is not None:
+            for key, value in update_dict.items():
+                setattr(model, key, value)
         await self.session.commit()
-        return role_access_right
+        # Право, перенесённое в другую роль, пропадает из прав прежней роли
+        await get_cache().invalidate_tags(
+            f'rights:role:{role_access_right.role_id}', f'rights:role:{updated.role_id}'
+        )
+        return updated
 
     async def delete(self, role_access_right_id: uuid.UUID) -> None:
         statement = select(self.role_access_right_table).where(
@@ -240,8 +270,12 @@ class SARoleAccessRightDB(
         role_access_right = await self._get_role_access_right(statement)
         await self.session.delete(role_access_right)
         await self.session.commit()
+        if role_access_right is not None:
+            await get_cache().invalidate_tags(
+                f'rights:role:{role_access_right.role_id}'
+            )
 
-    @cache_decorator()
+    @cache_decorator(settings.cache_access_right_seconds, tags=role_access_rights_tags)
     async def get_all_access_rights_of_user(
         self, role_id: uuid.UUID
     ) -> None | Iterable[models.RoleAccessRight]:
@@ -266,10 +300,3 @@ class SARoleAccessRightDB(
         if not results:
             return results
         return results.unique().fetchall()
-
-    def __getstate__(self):
-        """pickle.dumps()"""
-        # Определяем, какие атрибуты должны быть сериализованы
-        state = self.__class__.__name__
-
-        return state
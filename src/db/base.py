@@ -1,7 +1,9 @@
 import datetime
 import typing as t
+from contextlib import asynccontextmanager
 
 from sqlalchemy import MetaData
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 from core.dependency_types import DependencyCallable
@@ -15,6 +17,31 @@ class SQLAlchemyBase(DeclarativeBase):
     metadata = metadata_obj
 
 
+SA_DB = t.TypeVar("SA_DB", bound="DetachableSessionMixin")
+
+
+class DetachableSessionMixin:
+    """Repository that can be run outside of the request it was built for."""
+
+    session: AsyncSession
+
+    @asynccontextmanager
+    async def detached(self: SA_DB) -> t.AsyncIterator[SA_DB]:
+        """
+        Copy of the repository with its own session on the same engine.
+
+        Background work, like a cache refresh, outlives the request and
+        must not share its session.
+        """
+        session = AsyncSession(self.session.bind, expire_on_commit=False)
+        repository = object.__new__(type(self))
+        repository.__dict__.update(self.__dict__, session=session)
+        try:
+            yield repository
+        finally:
+            await session.close()
+
+
 class BaseUserDatabase(t.Generic[UP, ID, SIHE, OAP, UOAP]):
     """Base adapter for retrieving, creating and updating users from a database."""
 
@@ -6,16 +6,26 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import Select
 
-from cache.cache import cache_decorator
+from cache.cache import cache_decorator, cache_many_decorator, get_cache
+from cache.serializers import register_models
+from core.config import settings
 from core.pagination import PaginateQueryParams
 
-from .base import BaseRoleDatabase, BaseUserRoleDatabase, SQLAlchemyBase
+from .base import (
+    BaseRoleDatabase,
+    BaseUserRoleDatabase,
+    DetachableSessionMixin,
+    SQLAlchemyBase,
+)
 from .generics import GUID
 from .schemas import models
 
 UUID_ID = uuid.UUID
 TRow = TypeVar("TRow")
 
+# Модели, которые кэшируют репозитории модуля
+register_models(models.RoleRead, models.UserRole)
+
 
 class SARole(SQLAlchemyBase):
     """Role table definition."""
@@ -26,7 +36,7 @@ class SARole(SQLAlchemyBase):
     name: Mapped[str] = mapped_column(String(length=100), nullable=False, index=True)
 
 
-class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
+class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID], DetachableSessionMixin):
     session: AsyncSession
     user_table: type[SARole]
 
@@ -36,7 +46,7 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
 
     """Access token protocol that ORM model should follow."""
 
-    @cache_decorator()
+    @cache_decorator(settings.cache_role_seconds, tags=lambda result, **_: ['roles'])
     async def search(
         self, pagination_params: PaginateQueryParams, filter_param: str | None = None
     ) -> Iterable[models.RoleRead]:
@@ -55,28 +65,32 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
             models.RoleRead.from_orm(result[0]) for result in results.fetchall()
         )
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_role_seconds,
+        tags=lambda result, role_id, **_: [f'role:{role_id}'],
+        stale_seconds=settings.cache_stale_seconds,
+        xfetch_beta=settings.cache_xfetch_beta,
+    )
     async def get_by_id(self, role_id: UUID_ID) -> models.RoleRead | None:
         model = await self._get_role_by_id(role_id)
         if not model:
             return None
         return models.RoleRead.from_orm(model)
 
-    @cache_decorator()
+    @cache_many_decorator(get_by_id, lambda role: role.id)
     async def get_multiple(
         self, role_ids: Iterable[uuid.UUID]
-    ) -> Iterable[models.AccessRight]:
+    ) -> list[models.RoleRead]:
         if not role_ids:
             return []
         statement = select(self.role_table).where(self.role_table.id.in_(role_ids))
-        role_rights = await self._get_roles(statement)
-
-        if not role_rights:
-            return []
+        roles = await self._get_roles(statement)
 
-        return [models.AccessRight.from_orm(right) for right in role_rights]
+        return [models.RoleRead.from_orm(role[0]) for role in roles]
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_role_seconds, tags=lambda role, **_: [f'role:{role.id}', 'roles']
+    )
     async def get_by_name(self, name: str) -> models.RoleRead | None:
         statement = select(self.role_table).where(
             func.lower(self.role_table.name) == func.lower(name)
@@ -91,6 +105,7 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
         role = self.role_table(**create_dict)
         self.session.add(role)
         await self.session.commit()
+        await get_cache().invalidate_tags('roles')
         return models.RoleRead.from_orm(role)
 
     async def update(
@@ -103,6 +118,7 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
         self.session.add(model)
         await self.session.commit()
         await self.session.refresh(model)
+        await get_cache().invalidate_tags(f'role:{role.id}', 'roles')
 
         return models.RoleRead.from_orm(model)
 
@@ -111,6 +127,10 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
         role_to_delete = await self._get_role(statement)
         await self.session.delete(role_to_delete)
         await self.session.commit()
+        # Удаление каскадно затрагивает назначения ролей и права роли
+        await get_cache().invalidate_tags(
+            f'role:{role_id}', 'roles', f'rights:role:{role_id}'
+        )
 
     async def _get_role(self, statement: Select[tuple[SARole]]) -> SARole | None:
         results = await self.session.execute(statement)
@@ -126,13 +146,6 @@ class SARoleDB(BaseRoleDatabase[models.RoleRead, UUID_ID]):
         statement = select(self.role_table).where(self.role_table.id == role_id)
         return await self._get_role(statement)
 
-    def __getstate__(self):
-        """pickle.dumps()"""
-        # Определяем, какие атрибуты должны быть сериализованы
-        state = self.__class__.__name__
-
-        return state
-
 
 class SAUserRole(SQLAlchemyBase):
     __tablename__ = "user_role"
@@ -152,7 +165,9 @@ class SAUserRole(SQLAlchemyBase):
     )
 
 
-class SAUserRoleDB(BaseUserRoleDatabase[models.UserRole, UUID_ID]):
+class SAUserRoleDB(
+    BaseUserRoleDatabase[models.UserRole, UUID_ID], DetachableSessionMixin
+):
     session: AsyncSession
     user_role_table: type[SAUserRole]
 
@@ -194,6 +209,7 @@ class SAUserRoleDB(BaseUserRoleDatabase[models.UserRole, UUID_ID]):
 
         self.session.add(user_role)
         await self.session.commit()
+        await get_cache().invalidate_tags(f'roles:user:{user_id}')
 
         return models.UserRole.from_orm(user_role)
 
@@ -207,8 +223,18 @@ class SAUserRoleDB(BaseUserRoleDatabase[models.UserRole, UUID_ID]):
         role_to_delete = await self._get_user_role(statement)
         await self.session.delete(role_to_delete)
         await self.session.commit()
-
-    @cache_decorator()
+        await get_cache().invalidate_tags(f'roles:user:{user_id}')
+
+    @cache_decorator(
+        settings.cache_role_seconds,
+        tags=lambda user_roles, user_id, **_: [
+            f'roles:user:{user_id}',
+            *(f'role:{user_role.role_id}' for user_role in user_roles),
+        ],
+        lock_seconds=settings.cache_lock_seconds,
+        stale_seconds=settings.cache_stale_seconds,
+        xfetch_beta=settings.cache_xfetch_beta,
+    )
     async def get_user_roles(
         self, user_id: UUID_ID
     ) -> Iterable[models.UserRole] | None:
@@ -227,10 +253,3 @@ class SAUserRoleDB(BaseUserRoleDatabase[models.UserRole, UUID_ID]):
     ) -> SAUserRole | None:
         results = await self.session.execute(statement)
         return results.unique().scalar_one_or_none()
-
-    def __getstate__(self):
-        """pickle.dumps()"""
-        # Определяем, какие атрибуты должны быть сериализованы
-        state = self.__class__.__name__
-
-        return state
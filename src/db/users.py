@@ -1,7 +1,7 @@
 """FastAPI Users database adapter for SQLAlchemy."""
 import uuid
 from datetime import datetime
-from typing import Any, Iterable, Sequence
+from typing import Any, Callable, Iterable, Sequence
 
 from sqlalchemy import (
     Boolean,
@@ -18,15 +18,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 from sqlalchemy.sql import Select
 
-from cache.cache import cache_decorator
+from cache.cache import cache_decorator, cache_many_decorator, get_cache
+from cache.serializers import register_models
 from core import exceptions
+from core.config import settings
 from core.pagination import PaginateQueryParams
-from db.base import BaseUserDatabase, SQLAlchemyBase
+from db.base import BaseUserDatabase, DetachableSessionMixin, SQLAlchemyBase
 from db.generics import GUID
 from db.schemas import models
 
 UUID_ID = uuid.UUID
 
+# Модели, которые кэшируют репозитории модуля
+register_models(models.UserRead, models.EventRead)
+
 
 class SAOAuthAccount(SQLAlchemyBase):
     """Base SQLAlchemy OAuth account table definition."""
@@ -96,6 +101,22 @@ class SASignInHistory(SQLAlchemyBase):
     )
 
 
+def missing_user_tag(field: str, value: Any) -> str:
+    """Тег отрицательного результата поиска, поиск по полю без учёта регистра"""
+    return f'user:{field}:{str(value).lower()}'
+
+
+def user_lookup_tags(field: str) -> Callable[..., list[str]]:
+    """Найденный пользователь сбрасывается по id, ненайденный - по значению поля"""
+
+    def get_tags(user: models.UserRead | None, **arguments: Any) -> list[str]:
+        if user is None:
+            return [missing_user_tag(field, arguments[field])]
+        return [f'user:{user.id}']
+
+    return get_tags
+
+
 class SAUserDB(
     BaseUserDatabase[
         models.UserRead,
@@ -103,7 +124,8 @@ class SAUserDB(
         models.EventRead,
         models.OAuthAccount,
         models.UserOAuth,
-    ]
+    ],
+    DetachableSessionMixin,
 ):
     """
     Database adapter for SQLAlchemy.
@@ -126,7 +148,13 @@ class SAUserDB(
         self.history_table = history_table
         self.oauth_account_table = oauth_account_table
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_user_seconds,
+        tags=lambda result, user_id, **_: [f'user:{user_id}'],
+        lock_seconds=settings.cache_lock_seconds,
+        stale_seconds=settings.cache_stale_seconds,
+        xfetch_beta=settings.cache_xfetch_beta,
+    )
     async def get(self, user_id: uuid.UUID) -> models.UserRead | None:
         user_model = await self._get_user_by_id(user_id)
 
@@ -134,18 +162,25 @@ class SAUserDB(
             return models.UserRead.from_orm(user_model)
         return None
 
-    @cache_decorator()
     async def get_multiple(
         self, user_ids: Iterable[uuid.UUID]
     ) -> Iterable[models.UserRead] | None:
-        user_models = await self._get_users_by_ids(user_ids)
-        if user_models:
-            return [
-                models.UserRead.from_orm(user_model[0]) for user_model in user_models
-            ]
-        return None
+        return await self._get_multiple(user_ids) or None
 
-    @cache_decorator()
+    @cache_many_decorator(get, lambda user: user.id)
+    async def _get_multiple(self, user_ids: list[uuid.UUID]) -> list[models.UserRead]:
+        user_models = await self._get_users_by_ids(user_ids)
+        return [
+            models.UserRead.from_orm(user_model[0]) for user_model in user_models or ()
+        ]
+
+    @cache_decorator(
+        settings.cache_user_seconds,
+        tags=user_lookup_tags('username'),
+        stale_seconds=settings.cache_stale_seconds,
+        xfetch_beta=settings.cache_xfetch_beta,
+        not_found_seconds=settings.cache_not_found_seconds,
+    )
     async def get_by_username(self, username: str) -> models.UserRead | None:
         statement = select(self.user_table).where(
             func.lower(self.user_table.username) == func.lower(username)
@@ -156,7 +191,13 @@ class SAUserDB(
             return None
         return models.UserRead.from_orm(user_model)
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_user_seconds,
+        tags=user_lookup_tags('email'),
+        stale_seconds=settings.cache_stale_seconds,
+        xfetch_beta=settings.cache_xfetch_beta,
+        not_found_seconds=settings.cache_not_found_seconds,
+    )
     async def get_by_email(self, email: str) -> models.UserRead | None:
         statement = select(self.user_table).where(
             func.lower(self.user_table.email) == func.lower(email)
@@ -171,6 +212,7 @@ class SAUserDB(
         self.session.add(user_model)
         await self.session.commit()
         await self.session.refresh(user_model)
+        await self._invalidate_missing_users(create_dict)
 
         return models.UserRead.from_orm(user_model)
 
@@ -184,12 +226,27 @@ class SAUserDB(
         self.session.add(user_model)
         await self.session.commit()
         await self.session.refresh(user_model)
+        await get_cache().invalidate_tags(f'user:{user.id}')
+        await self._invalidate_missing_users(update_dict)
 
         return models.UserRead.from_orm(user_model)
 
+    async def _invalidate_missing_users(self, values: dict[str, Any]) -> None:
+        """Forget cached "not found" lookups for the new username and email."""
+        tags = [
+            missing_user_tag(field, values[field])
+            for field in ('username', 'email')
+            if values.get(field) is not None
+        ]
+        if tags:
+            await get_cache().invalidate_tags(*tags)
+
     async def delete(self, user: models.UserRead) -> None:
         await self.session.delete(user)
         await self.session.commit()
+        await get_cache().invalidate_tags(
+            f'user:{user.id}', f'roles:user:{user.id}', f'signins:user:{user.id}'
+        )
 
     async def _get_user(self, statement: Select[tuple[SAUser]]) -> SAUser | None:
         results = await self.session.execute(statement)
@@ -225,8 +282,12 @@ class SAUserDB(
         e = self.history_table(**event.dict())
         self.session.add(e)
         await self.session.commit()
+        await get_cache().invalidate_tags(f'signins:user:{user_id}')
 
-    @cache_decorator()
+    @cache_decorator(
+        settings.cache_sign_in_history_seconds,
+        tags=lambda result, user_id, **_: [f'signins:user:{user_id}'],
+    )
     async def get_sign_in_history(
         self,
         user_id: uuid.UUID,
@@ -280,6 +341,7 @@ class SAUserDB(
         self.session.add(user_model)
 
         await self.session.commit()
+        await get_cache().invalidate_tags(f'user:{user.id}')
 
         return models.UserOAuth.from_orm(user_model)
 
@@ -296,6 +358,7 @@ class SAUserDB(
             setattr(oauth_account_model, key, value)
         self.session.add(oauth_account_model)
         await self.session.commit()
+        await get_cache().invalidate_tags(f'user:{user.id}')
 
         return models.UserOAuth.from_orm(user_model)
 
@@ -303,10 +366,3 @@ class SAUserDB(
         results = await self.session.execute(statement)
 
         return results.fetchall()
-
-    def __getstate__(self):
-        """pickle.dumps()"""
-        # Определяем, какие атрибуты должны быть сериализованы
-        state = self.__class__.__name__
-
-        return state
@@ -1,33 +1,116 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
 from authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTBlacklistStrategy,
+    RedisStrategy,
     RefreshBearerTransport,
+    Strategy,
+    TokenPairBearerTransport,
     get_manager,
 )
+from authentication.strategy import get_family_manager
+from authentication.strategy.blacklist import TokenBlackListRedisManager
+from cache import redis
+from cache.lru import LRUCache
 from core.config import settings
+from core.jwt_keys import KeyRing, SigningKey
 from db.schemas import models
+from managers.sessions import get_session_manager
+
+ACCESS_TOKEN_LIFETIME_SECONDS = 3599
+REFRESH_TOKEN_LIFETIME_SECONDS = 3599
+
+
+def get_bearer_transport() -> BearerTransport:
+    # Пара токенов из /login меняет ответ /login и /refresh, поэтому по настройке
+    if settings.login_token_pair:
+        return TokenPairBearerTransport(token_url="auth/jwt/login")
+    return BearerTransport(token_url="auth/jwt/login")
 
-bearer_transport = BearerTransport(token_url="auth/jwt/login")
+
+bearer_transport = get_bearer_transport()
 refresh_bearer_transport = RefreshBearerTransport(token_url="auth/jwt/refresh")
+access_token_decode_cache = LRUCache[dict[str, Any]](
+    settings.access_token_decode_cache_size
+)
+
+
+@lru_cache
+def get_access_keyring() -> KeyRing | None:
+    if not settings.access_token_keyring_path:
+        return None
+    # Токены без kid выпущены общим секретом до перехода на ключи: он
+    # проверяет их ещё ACCESS_TOKEN_LIFETIME_SECONDS после запуска процесса
+    legacy_key = SigningKey(
+        kid="legacy",
+        algorithm="HS256",
+        public_key=settings.access_token_secret,
+        not_after=datetime.utcnow(),
+    )
+    keyring = KeyRing.from_file(
+        settings.access_token_keyring_path,
+        verify_grace_seconds=ACCESS_TOKEN_LIFETIME_SECONDS,
+        legacy_key=legacy_key,
+    )
+    keyring.prepare()
+    return keyring
+
+
+def get_blacklist_managers() -> list[TokenBlackListRedisManager]:
+    return [get_manager('jwt_access'), get_manager('jwt_refresh')]
 
 
-def get_refresh_strategy() -> JWTBlacklistStrategy[models.UserRead, models.EventRead]:
+@lru_cache
+def build_refresh_strategy() -> JWTBlacklistStrategy[models.UserRead, models.EventRead]:
     return JWTBlacklistStrategy(
         secret=settings.refresh_token_secret,
-        lifetime_seconds=3599,
+        lifetime_seconds=REFRESH_TOKEN_LIFETIME_SECONDS,
         blacklist_manager=get_manager('jwt_refresh'),
+        session_manager=get_session_manager(),
+        family_manager=(
+            get_family_manager('jwt_refresh_family')
+            if settings.refresh_token_rotation
+            else None
+        ),
     )
 
 
-def get_access_strategy() -> JWTBlacklistStrategy[models.UserRead, models.EventRead]:
+@lru_cache
+def build_access_strategy() -> Strategy[models.UserRead, models.EventRead]:
+    if settings.access_token_opaque:
+        return RedisStrategy(
+            redis.get_manager().get_client(),
+            lifetime_seconds=ACCESS_TOKEN_LIFETIME_SECONDS,
+            key_prefix="access_session:",
+            session_manager=get_session_manager(),
+        )
     return JWTBlacklistStrategy(
         secret=settings.access_token_secret,
-        lifetime_seconds=3599,
+        lifetime_seconds=ACCESS_TOKEN_LIFETIME_SECONDS,
         blacklist_manager=get_manager('jwt_access'),
+        stateless=settings.access_token_stateless,
+        keyring=get_access_keyring(),
+        decode_cache=access_token_decode_cache,
+        session_manager=get_session_manager(),
     )
 
 
+# Стратегии не хранят состояния запроса, поэтому создаются один раз на процесс.
+# Зависимости асинхронные: синхронные FastAPI вызывает в пуле потоков
+async def get_refresh_strategy() -> (
+    JWTBlacklistStrategy[models.UserRead, models.EventRead]
+):
+    return build_refresh_strategy()
+
+
+async def get_access_strategy() -> Strategy[models.UserRead, models.EventRead]:
+    return build_access_strategy()
+
+
 refresh_backend = AuthenticationBackend[models.UserRead, models.EventRead](
     name="jwt_refresh",
     transport=refresh_bearer_transport,
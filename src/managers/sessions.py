@@ -0,0 +1,89 @@
+import time
+import uuid
+from functools import lru_cache
+from typing import Sequence
+
+from cache import redis
+from cache.lru import LRUCache
+from core.config import settings
+
+_MISSING = object()
+
+
+class SessionWatermarkRedisStorage:
+    def __init__(self, redis: redis.RedisClient, name: str):
+        self._client = redis
+        self._name = name
+
+    def get_key(self, user_id: uuid.UUID) -> str:
+        return f'{self._name}:{user_id}'
+
+    async def get_many(self, user_ids: Sequence[uuid.UUID]) -> list[float | None]:
+        values = await self._client.mget([self.get_key(id_) for id_ in user_ids])
+        return [float(value) if value is not None else None for value in values]
+
+    async def set(self, user_id: uuid.UUID, watermark: float, ttl_seconds: int):
+        await self._client.set(self.get_key(user_id), repr(watermark), ex=ttl_seconds)
+
+
+class SessionWatermarkManager:
+    """
+    Per-user "tokens issued before T are invalid" watermarks.
+
+    A watermark is kept for `ttl_seconds`, which must cover the lifetime
+    of the longest-living token. Reads are cached in process for
+    `cache_seconds`, so other workers see a new watermark with that delay.
+    """
+
+    def __init__(
+        self,
+        storage: SessionWatermarkRedisStorage,
+        ttl_seconds: int,
+        cache: LRUCache[float | None] | None = None,
+    ):
+        self.storage = storage
+        self.ttl_seconds = ttl_seconds
+        self.cache = cache
+
+    async def revoke_all(self, user_id: uuid.UUID) -> float:
+        """Invalidate every token of the user issued until now."""
+        watermark = time.time()
+        await self.storage.set(user_id, watermark, self.ttl_seconds)
+        if self.cache is not None:
+            self.cache.set(user_id, watermark)
+        return watermark
+
+    async def get_watermarks(self, user_ids: Sequence[uuid.UUID]) -> list[float | None]:
+        """Return the watermark of every user, None if it was never set."""
+        result = [
+            self.cache.get(id_, _MISSING) if self.cache is not None else _MISSING
+            for id_ in user_ids
+        ]
+        missing = list(
+            {id_ for id_, value in zip(user_ids, result) if value is _MISSING}
+        )
+        if missing:
+            loaded = dict(zip(missing, await self.storage.get_many(missing)))
+            if self.cache is not None:
+                for id_, value in loaded.items():
+                    self.cache.set(id_, value)
+            result = [
+                loaded[id_] if value is _MISSING else value
+                for id_, value in zip(user_ids, result)
+            ]
+        return result  # type: ignore
+
+
+@lru_cache
+def get_session_manager() -> SessionWatermarkManager:
+    storage = SessionWatermarkRedisStorage(
+        redis.get_manager().get_client(), 'session_watermark'
+    )
+    return SessionWatermarkManager(
+        storage,
+        settings.session_watermark_ttl_seconds,
+        LRUCache(
+            settings.session_watermark_cache_size,
+            ttl=settings.session_watermark_cache_seconds,
+        ),
+    )
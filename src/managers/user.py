@@ -22,6 +22,7 @@ from db import getters, models_protocol
 from db.base import BaseUserDatabase
 from db.schemas import models
 from db.users import SAUserDB
+from managers.sessions import SessionWatermarkManager, get_session_manager
 
 RESET_PASSWORD_TOKEN_AUDIENCE = "movix:reset"
 VERIFY_USER_TOKEN_AUDIENCE = "movix:verify"
@@ -67,12 +68,14 @@ class BaseUserManager(
             models_protocol.UOAP,
         ],
         password_helper: pw.PasswordHelperProtocol | None = None,
+        session_manager: SessionWatermarkManager | None = None,
     ):
         self.user_db = user_db
         if password_helper is None:
             self.password_helper = pw.PasswordHelper()
         else:
             self.password_helper = password_helper
+        self.session_manager = session_manager
 
     def parse_id(self, value: Any) -> uuid.UUID:
         """
@@ -298,6 +301,7 @@ class BaseUserManager(
             raise exceptions.UserInactive()
 
         updated_user = await self._update(user, {"password": password})
+        await self.revoke_sessions(user)
 
         await self.on_after_reset_password(user, request)
 
@@ -325,8 +329,14 @@ class BaseUserManager(
     ) -> None:
         await self.on_before_delete(user, request)
         await self.user_db.delete(user)
+        await self.revoke_sessions(user)
         await self.on_after_delete(user, request)
 
+    async def revoke_sessions(self, user: models_protocol.UP) -> None:
+        """Invalidate every token issued to the user so far."""
+        if self.session_manager is not None:
+            await self.session_manager.revoke_all(user.id)
+
     async def get_sign_in_history(
         self,
         user: models_protocol.UP,
@@ -656,4 +666,4 @@ class UserManager(
 
 
 async def get_user_manager(user_db: SAUserDB = Depends(getters.get_user_db)):
-    yield UserManager(user_db)
+    yield UserManager(user_db, session_manager=get_session_manager())
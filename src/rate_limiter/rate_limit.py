@@ -1,7 +1,8 @@
+import inspect
 import typing as t
 from typing import Any, Callable, Coroutine, Optional, Union
 
-from fastapi import HTTPException, Request, Response
+from fastapi import Depends, HTTPException, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from authentication.strategy.jwt import decode_jwt
@@ -11,6 +12,8 @@ from .memory_backend import InMemoryBackend
 
 RATE_LIMITS = settings.rate_limits
 
+_UNRESOLVED = object()
+
 
 async def default_callback(headers: dict):
     """Default Error Callback when get Raid Limited"""
@@ -90,8 +93,30 @@ class RateLimiter:
         self.count = count
         self.get_uuid = get_uuid
         self.callback = callback
+        parameters = [
+            inspect.Parameter(
+                "request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request
+            ),
+            inspect.Parameter(
+                "response", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Response
+            ),
+        ]
+        if get_uuid is not None and RATE_LIMITS:
+            # get_uuid is resolved by FastAPI as a dependency, so authenticator
+            # dependencies share the request's authentication result
+            parameters.append(
+                inspect.Parameter(
+                    "uuid",
+                    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                    default=Depends(get_uuid),
+                )
+            )
+        # The signature FastAPI resolves, `uuid` is not a query parameter
+        self.__signature__ = inspect.Signature(parameters)
 
-    async def __call__(self, request: Request, response: Response):
+    async def __call__(
+        self, request: Request, response: Response, uuid: Any = _UNRESOLVED
+    ):
         if not RATE_LIMITS:
             return
 
@@ -100,12 +125,9 @@ class RateLimiter:
                 "You have to initialise the RateLimitManager at the Startup"
             )
 
-        get_uuid: t.Callable = self.get_uuid or RateLimitManager.get_uuid
         callback: t.Callable = self.callback or RateLimitManager.callback
-        uuid: Union[str, Coroutine] = get_uuid(request)
-
-        if isinstance(uuid, Coroutine):
-            uuid = await uuid
+        if uuid is _UNRESOLVED:
+            uuid = await self._get_uuid(request)
         redis_key: str = f"rate_limit:{request.url.path}:{uuid}"
         redis_key_lock: str = f"{redis_key}:lock"
         if await RateLimitManager.redis.exists(redis_key_lock):
@@ -126,6 +148,13 @@ class RateLimiter:
         for key in headers.keys():
             response.headers[key] = headers[key]
 
+    async def _get_uuid(self, request: Request) -> Any:
+        get_uuid: t.Callable = self.get_uuid or RateLimitManager.get_uuid
+        uuid: Union[str, Coroutine] = get_uuid(request)
+        if isinstance(uuid, Coroutine):
+            uuid = await uuid
+        return uuid
+
     async def get_headers(self, redis_key: str) -> dict:
         """Generates Rate Limit Headers"""
         headers: dict = {}
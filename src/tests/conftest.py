@@ -2,7 +2,7 @@ import asyncio
 import dataclasses
 import datetime
 import uuid
-from typing import Any, AsyncGenerator, Callable, Generic, Optional, Union
+from typing import Any, AsyncGenerator, Callable, Generic, Iterable, Optional, Union
 from unittest.mock import MagicMock
 
 import httpx
@@ -46,6 +46,7 @@ class UserModel:
     is_active: bool = True
     is_superuser: bool = False
     is_admin: bool = False
+    is_verified: bool = False
 
 
 @dataclasses.dataclass
@@ -125,6 +126,7 @@ class UserManagerMock(
     on_before_delete: MagicMock
     on_after_delete: MagicMock
     on_after_login: MagicMock
+    revoke_sessions: MagicMock
     _update: MagicMock
 
 
@@ -299,6 +301,14 @@ class MockUserDatabase(
             return self.superuser
         return None
 
+    async def get_multiple(self, user_ids: Iterable[IDType]) -> list[UserModel] | None:
+        users = [
+            user
+            for user in (self.user, self.inactive_user, self.superuser)
+            if user.id in user_ids
+        ]
+        return users or None
+
     async def get_by_email(self, email: str) -> Optional[UserModel]:
         lower_email = email.lower()
         if lower_email == self.user.email.lower():
@@ -363,6 +373,7 @@ def make_user_manager(mocker: MockerFixture):
         mocker.spy(user_manager, "on_after_delete")
         mocker.spy(user_manager, "on_after_login")
         mocker.spy(user_manager, "_update")
+        mocker.spy(user_manager, "revoke_sessions")
         return user_manager
 
     return _make_user_manager
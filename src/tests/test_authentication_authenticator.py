@@ -14,6 +14,7 @@ from core.dependency_types import DependencyCallable
 from db import models_protocol as models
 from managers.user import BaseUserManager
 from openapi import OpenAPIResponseType
+from rate_limiter import RAMBackend, RateLimiter, RateLimitManager, RateLimitTime
 from tests.conftest import OAuthAccount, SignInModel, UserModel, UserOAuth
 
 pytestmark = pytest.mark.asyncio
@@ -194,6 +195,65 @@ async def test_authenticator_none_enabled(
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+@pytest.mark.authentication
+async def test_authenticator_memoized_per_request(
+    mocker, get_user_manager, get_test_client, get_backend_user, user: UserModel
+):
+    backend = get_backend_user()
+    authenticator = Authenticator([backend], get_user_manager)
+    read_token_spy = mocker.spy(UserStrategy, "read_token")
+    app = FastAPI()
+
+    @app.get("/test-several-dependencies")
+    def test_several_dependencies(  # pyright: ignore
+        superuser: Optional[UserModel] = Depends(
+            authenticator.current_user(optional=True, superuser=True)
+        ),
+        user_id=Depends(authenticator.current_user_uuid(active=True)),
+        user_token=Depends(authenticator.current_user_token(active=True)),
+    ):
+        return {"superuser": superuser is not None, "user_id": str(user_id)}
+
+    async for client in get_test_client(app):
+        response = await client.get("/test-several-dependencies")
+        assert response.json() == {"superuser": False, "user_id": str(user.id)}
+        assert read_token_spy.call_count == 1
+
+        await client.get("/test-several-dependencies")
+        assert read_token_spy.call_count == 2
+
+
+@pytest.mark.authentication
+async def test_rate_limiter_shares_authentication(
+    mocker, get_user_manager, get_test_client, get_backend_user, user: UserModel
+):
+    mocker.patch("rate_limiter.rate_limit.RATE_LIMITS", True)
+    mocker.patch.object(RateLimitManager, "redis", RAMBackend(), create=True)
+    backend = get_backend_user()
+    authenticator = Authenticator([backend], get_user_manager)
+    get_current_id = authenticator.current_user_uuid(active=True)
+    read_token_spy = mocker.spy(UserStrategy, "read_token")
+    app = FastAPI()
+
+    @app.get(
+        "/test-rate-limited",
+        dependencies=[
+            Depends(authenticator.current_user(active=True)),
+            Depends(RateLimiter(2, RateLimitTime(seconds=10), get_uuid=get_current_id)),
+        ],
+    )
+    def test_rate_limited():  # pyright: ignore
+        return None
+
+    async for client in get_test_client(app):
+        response = await client.get("/test-rate-limited")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["X-Rate-Limit-Remaining"] == "1"
+        assert read_token_spy.call_count == 1
+
+    assert f"rate_limit:/test-rate-limited:{user.id}" in RAMBackend.data
+
+
 @pytest.mark.authentication
 async def test_authenticators_with_same_name(get_test_auth_client, get_backend_none):
     with pytest.raises(DuplicateBackendNamesError):
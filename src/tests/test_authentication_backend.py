@@ -56,3 +56,12 @@ async def test_logout(backend: AuthenticationBackend, user: UserModel):
     strategy = cast(Strategy, backend.get_strategy())
     result = await backend.logout(strategy, user, "TOKEN")
     assert isinstance(result, Response)
+
+
+@pytest.mark.authentication
+async def test_login_with_refresh_token(
+    backend: AuthenticationBackend, user: UserModel
+):
+    strategy = cast(Strategy, backend.get_strategy())
+    result = await backend.login(strategy, user, refresh_token="REFRESH")
+    assert b'"refresh_token":"REFRESH"' in result.body
@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import time
+import uuid
+
+import fakeredis.aioredis
+import pytest
+
+from authentication.strategy.blacklist import (
+    BloomFilter,
+    TokenBlackListRedisManager,
+    TokenBlacklistRedisStorage,
+)
+from core.metrics import get_value
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def blacklist_manager() -> TokenBlackListRedisManager:
+    storage = TokenBlacklistRedisStorage(
+        fakeredis.aioredis.FakeRedis(), "jwt_test"  # type: ignore
+    )
+    return TokenBlackListRedisManager(storage)
+
+
+@pytest.mark.authentication
+async def test_enlist_expires_with_token(blacklist_manager: TokenBlackListRedisManager):
+    await blacklist_manager.enlist("revoked", expires_at=int(time.time()) + 60)
+
+    ttl = await blacklist_manager.storage._client.ttl("jwt_test:revoked")
+    assert 0 < ttl <= 61
+
+
+@pytest.mark.authentication
+async def test_enlist_expired_token(blacklist_manager: TokenBlackListRedisManager):
+    await blacklist_manager.enlist("expired", expires_at=int(time.time()) - 60)
+
+    assert await blacklist_manager.check_token("expired") is False
+
+
+@pytest.mark.authentication
+async def test_forget(blacklist_manager: TokenBlackListRedisManager):
+    await blacklist_manager.enlist("revoked")
+    await blacklist_manager.forget("revoked")
+
+    assert await blacklist_manager.check_token("revoked") is False
+
+
+@pytest.mark.authentication
+async def test_check_token(blacklist_manager: TokenBlackListRedisManager):
+    await blacklist_manager.enlist("revoked")
+
+    assert await blacklist_manager.check_token("revoked") is True
+    assert await blacklist_manager.check_token("valid") is False
+    assert await blacklist_manager.check_token(None) is False
+
+
+@pytest.mark.authentication
+async def test_check_tokens(blacklist_manager: TokenBlackListRedisManager):
+    await blacklist_manager.enlist("revoked")
+
+    assert await blacklist_manager.check_tokens(["valid", "revoked"]) == [False, True]
+    assert await blacklist_manager.check_tokens([]) == []
+
+
+@pytest.mark.authentication
+async def test_check_legacy_tokens(blacklist_manager: TokenBlackListRedisManager):
+    client = blacklist_manager.storage._client
+    yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
+    await client.sadd(f"jwt_test_{yesterday:%Y-%m-%d}", "revoked")
+    await client.sadd("jwt_test_2000-01-01", "outdated")
+
+    assert await blacklist_manager.check_legacy_tokens(
+        ["valid", "revoked", "outdated"]
+    ) == [False, True, False]
+    assert await blacklist_manager.check_legacy_tokens([]) == []
+
+
+def get_bloom_manager(server: fakeredis.FakeServer) -> TokenBlackListRedisManager:
+    storage = TokenBlacklistRedisStorage(
+        fakeredis.aioredis.FakeRedis(server=server), "jwt_bloom"  # type: ignore
+    )
+    return TokenBlackListRedisManager(storage, BloomFilter(1000), rebuild_interval=60)
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition was not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.authentication
+class TestBloomFilter:
+    async def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = [uuid.uuid4().hex for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+        assert bloom.count == 1000
+
+    async def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for _ in range(1000):
+            bloom.add(uuid.uuid4().hex)
+
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+
+        assert false_positives / 10000 < 0.03
+        assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.2)
+        assert bloom.memory_bytes == (bloom.size + 7) // 8
+
+
+@pytest.mark.authentication
+class TestBloomBlacklist:
+    async def test_negative_lookup_skips_redis(self, mocker):
+        manager = get_bloom_manager(fakeredis.FakeServer())
+        manager.bloom_ready = True
+        await manager.enlist("revoked")
+        exists_spy = mocker.spy(manager.storage, "exists")
+        exist_many_spy = mocker.spy(manager.storage, "exist_many")
+
+        assert await manager.check_token("valid") is False
+        assert await manager.check_tokens(["valid", "other"]) == [False, False]
+        assert exists_spy.call_count == 0
+        assert exist_many_spy.call_count == 0
+
+        assert await manager.check_token("revoked") is True
+        assert await manager.check_tokens(["valid", "revoked"]) == [False, True]
+        assert exist_many_spy.call_args.args == (["revoked"],)
+
+    async def test_not_synced_filter_is_not_trusted(self):
+        server = fakeredis.FakeServer()
+        await get_bloom_manager(server).enlist("revoked")
+
+        assert await get_bloom_manager(server).check_token("revoked") is True
+
+    async def test_sync(self):
+        server = fakeredis.FakeServer()
+        worker, other_worker = get_bloom_manager(server), get_bloom_manager(server)
+        await other_worker.enlist("revoked_before_start")
+
+        worker.start_sync()
+        try:
+            await wait_for(lambda: worker.bloom_ready)
+            assert "revoked_before_start" in worker.bloom
+
+            await other_worker.enlist("revoked_after_start")
+            await wait_for(lambda: "revoked_after_start" in worker.bloom)
+        finally:
+            await worker.stop_sync()
+            await asyncio.sleep(0.01)
+
+        assert worker.bloom_ready is False
+
+    async def test_metrics(self):
+        manager = get_bloom_manager(fakeredis.FakeServer())
+        await manager.enlist("revoked")
+
+        assert (
+            get_value("token_blacklist_bloom_memory_bytes", blacklist="jwt_bloom")
+            == manager.bloom.memory_bytes
+        )
+        assert (
+            0
+            < get_value(
+                "token_blacklist_bloom_false_positive_rate", blacklist="jwt_bloom"
+            )
+            < 0.001
+        )
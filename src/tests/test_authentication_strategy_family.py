@@ -0,0 +1,71 @@
+import fakeredis.aioredis
+import pytest
+
+from authentication.strategy.family import (
+    TokenFamilyRedisManager,
+    TokenFamilyRedisStorage,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def family_manager() -> TokenFamilyRedisManager:
+    storage = TokenFamilyRedisStorage(
+        fakeredis.aioredis.FakeRedis(), "family_test"  # type: ignore
+    )
+    return TokenFamilyRedisManager(storage)
+
+
+@pytest.mark.authentication
+async def test_check_tokens(family_manager: TokenFamilyRedisManager):
+    await family_manager.start("family", "first", 60)
+
+    assert await family_manager.check_tokens([("family", "first")]) == [True]
+    assert await family_manager.check_tokens([("unknown", "first")]) == [False]
+    assert await family_manager.check_tokens([]) == []
+
+
+@pytest.mark.authentication
+async def test_rotate(family_manager: TokenFamilyRedisManager):
+    await family_manager.start("family", "first", 60)
+
+    assert await family_manager.rotate("family", "first", "second", 120) is True
+
+    assert await family_manager.check_tokens(
+        [("family", "second"), ("family", "first")]
+    ) == [True, False]
+    ttl = await family_manager.storage._client.ttl("family_test:family")
+    assert 60 < ttl <= 120
+
+
+@pytest.mark.authentication
+async def test_replay_revokes_family(family_manager: TokenFamilyRedisManager):
+    await family_manager.start("family", "first", 60)
+    await family_manager.rotate("family", "first", "second", 60)
+
+    assert await family_manager.check_tokens([("family", "first")]) == [False]
+
+    assert await family_manager.check_tokens([("family", "second")]) == [False]
+    assert await family_manager.rotate("family", "second", "third", 60) is False
+
+
+@pytest.mark.authentication
+async def test_rotate_twice(family_manager: TokenFamilyRedisManager):
+    await family_manager.start("family", "first", 60)
+    await family_manager.rotate("family", "first", "second", 60)
+
+    assert await family_manager.rotate("family", "first", "third", 60) is False
+    assert await family_manager.check_tokens(
+        [("family", "second"), ("family", "third")]
+    ) == [False, False]
+
+
+@pytest.mark.authentication
+async def test_revoke(family_manager: TokenFamilyRedisManager):
+    await family_manager.start("family", "first", 60)
+    await family_manager.revoke("family")
+    await family_manager.revoke("unknown")
+
+    assert await family_manager.check_tokens([("family", "first")]) == [False]
+    assert await family_manager.storage._client.exists("family_test:unknown") == 0
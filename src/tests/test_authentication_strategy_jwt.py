@@ -1,7 +1,24 @@
+import time
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+import jwt
 import pytest
 
-from authentication.strategy import JWTStrategy, StrategyDestroyNotSupportedError
+from authentication.strategy import (
+    JWTBlacklistStrategy,
+    JWTStrategy,
+    StrategyDestroyNotSupportedError,
+    StrategyRotateNotSupportedError,
+    TokenPrincipal,
+)
+from authentication.strategy.family import (
+    TokenFamilyRedisManager,
+    TokenFamilyRedisStorage,
+)
 from authentication.strategy.jwt import SecretType, decode_jwt, generate_jwt
+from cache.lru import LRUCache
+from core.jwt_keys import KeyRing, SigningKey
 from tests.conftest import SignInModel, UserModel
 
 LIFETIME = 3600
@@ -151,6 +168,15 @@ async def test_write_token(jwt_strategy: JWTStrategy[UserModel, SignInModel], us
         algorithms=[jwt_strategy.algorithm],
     )
     assert decoded["sub"] == str(user.id)
+    assert (
+        decoded["jti"]
+        != decode_jwt(
+            await jwt_strategy.write_token(user),
+            jwt_strategy.decode_key,
+            audience=jwt_strategy.token_audience,
+            algorithms=[jwt_strategy.algorithm],
+        )["jti"]
+    )
 
 
 @pytest.mark.parametrize("jwt_strategy", ["HS256"], indirect=True)
@@ -158,3 +184,423 @@ async def test_write_token(jwt_strategy: JWTStrategy[UserModel, SignInModel], us
 async def test_destroy_token(jwt_strategy: JWTStrategy[UserModel, SignInModel], user):
     with pytest.raises(StrategyDestroyNotSupportedError):
         await jwt_strategy.destroy_token("TOKEN", user)
+
+
+@pytest.mark.parametrize("jwt_strategy", ["HS256"], indirect=True)
+@pytest.mark.authentication
+class TestStatelessPrincipal:
+    async def test_write_token_embeds_principal(
+        self, jwt_strategy: JWTStrategy[UserModel, SignInModel], superuser
+    ):
+        jwt_strategy.stateless = True
+        token = await jwt_strategy.write_token(superuser)
+
+        decoded = decode_jwt(
+            token,
+            jwt_strategy.decode_key,
+            audience=jwt_strategy.token_audience,
+            algorithms=[jwt_strategy.algorithm],
+        )
+        assert decoded["is_active"] is True
+        assert decoded["is_superuser"] is True
+        assert decoded["is_admin"] is False
+        assert decoded["is_verified"] is False
+
+    async def test_read_token_skips_user_lookup(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        user_manager,
+        superuser,
+        mocker,
+    ):
+        jwt_strategy.stateless = True
+        token = await jwt_strategy.write_token(superuser)
+        get_spy = mocker.spy(user_manager, "get")
+
+        principal = await jwt_strategy.read_token(token, user_manager)
+
+        assert isinstance(principal, TokenPrincipal)
+        assert principal.id == superuser.id
+        assert principal.is_superuser is True
+        assert get_spy.called is False
+
+    async def test_read_token_without_claims_falls_back(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        user_manager,
+        token,
+        user,
+    ):
+        jwt_strategy.stateless = True
+
+        authenticated_user = await jwt_strategy.read_token(token(user.id), user_manager)
+
+        assert authenticated_user is user
+
+
+@pytest.fixture
+def keyring() -> KeyRing:
+    now = datetime.utcnow()
+    return KeyRing(
+        [
+            SigningKey(
+                kid="retired",
+                algorithm="RS256",
+                public_key=RSA_PUBLIC_KEY,
+                private_key=RSA_PRIVATE_KEY,
+                not_before=now - timedelta(days=60),
+                not_after=now - timedelta(minutes=10),
+            ),
+            SigningKey(
+                kid="current",
+                algorithm="ES256",
+                public_key=ECC_PUBLIC_KEY,
+                private_key=ECC_PRIVATE_KEY,
+                not_before=now - timedelta(days=1),
+            ),
+            SigningKey(
+                kid="expired",
+                algorithm="RS256",
+                public_key=RSA_PUBLIC_KEY,
+                not_after=now - timedelta(days=30),
+            ),
+        ],
+        verify_grace_seconds=LIFETIME,
+    )
+
+
+@pytest.mark.authentication
+async def test_keyring_prepare(keyring):
+    keyring.prepare()
+
+    for key in keyring.keys.values():
+        assert key.verifying_key is key.verifying_key
+        assert not isinstance(key.verifying_key, str)
+    assert keyring.keys["expired"].signing_key is None
+
+
+@pytest.mark.parametrize("jwt_strategy", ["HS256"], indirect=True)
+@pytest.mark.authentication
+class TestKeyRing:
+    async def test_write_token_signs_with_current_key(
+        self, jwt_strategy: JWTStrategy[UserModel, SignInModel], keyring, user
+    ):
+        jwt_strategy.keyring = keyring
+        token = await jwt_strategy.write_token(user)
+
+        header = jwt.get_unverified_header(token)
+        assert header["kid"] == "current"
+        assert header["alg"] == "ES256"
+
+    async def test_read_token_with_retired_key(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        keyring,
+        user_manager,
+        user,
+    ):
+        jwt_strategy.keyring = keyring
+        token = generate_jwt(
+            {"sub": str(user.id), "aud": "movix:auth"},
+            RSA_PRIVATE_KEY,
+            LIFETIME,
+            algorithm="RS256",
+            headers={"kid": "retired"},
+        )
+
+        authenticated_user = await jwt_strategy.read_token(token, user_manager)
+        assert authenticated_user is not None
+        assert authenticated_user.id == user.id
+
+    @pytest.mark.parametrize("kid", ["expired", "unknown", None])
+    async def test_read_token_with_unusable_key(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        keyring,
+        user_manager,
+        user,
+        kid,
+    ):
+        jwt_strategy.keyring = keyring
+        token = generate_jwt(
+            {"sub": str(user.id), "aud": "movix:auth"},
+            RSA_PRIVATE_KEY,
+            LIFETIME,
+            algorithm="RS256",
+            headers={"kid": kid} if kid else None,
+        )
+
+        authenticated_user = await jwt_strategy.read_token(token, user_manager)
+        assert authenticated_user is None
+
+    @pytest.mark.parametrize("retired_minutes,authenticated", [(10, True), (90, False)])
+    async def test_read_token_without_kid_with_legacy_key(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        keyring,
+        secret,
+        user_manager,
+        user,
+        retired_minutes,
+        authenticated,
+    ):
+        keyring.legacy_key = SigningKey(
+            kid="legacy",
+            algorithm="HS256",
+            public_key=secret,
+            not_after=datetime.utcnow() - timedelta(minutes=retired_minutes),
+        )
+        jwt_strategy.keyring = keyring
+        token = generate_jwt(
+            {"sub": str(user.id), "aud": "movix:auth"}, secret, LIFETIME
+        )
+
+        authenticated_user = await jwt_strategy.read_token(token, user_manager)
+        assert (authenticated_user is not None) is authenticated
+
+    async def test_jwks(self, jwt_strategy, keyring):
+        jwks = keyring.jwks()
+
+        assert sorted(key["kid"] for key in jwks["keys"]) == ["current", "retired"]
+        assert all("d" not in key for key in jwks["keys"])
+
+
+class MockBlacklistManager:
+    def __init__(
+        self, token_ids: set[str] | None = None, legacy_tokens: set[str] | None = None
+    ):
+        self.token_ids = token_ids or set()
+        self.legacy_tokens = legacy_tokens or set()
+        self.expires_at: dict[str, int | None] = {}
+
+    async def check_token(self, token_id: str | None) -> bool:
+        return token_id in self.token_ids
+
+    async def check_tokens(self, token_ids: list[str]) -> list[bool]:
+        return [token_id in self.token_ids for token_id in token_ids]
+
+    async def check_legacy_tokens(self, tokens: list[str]) -> list[bool]:
+        return [token in self.legacy_tokens for token in tokens]
+
+    async def enlist(self, token_id: str, expires_at: int | None = None):
+        self.token_ids.add(token_id)
+        self.expires_at[token_id] = expires_at
+
+
+def get_jti(strategy: JWTStrategy, token: str) -> str:
+    return strategy.decode_token(token)["jti"]
+
+
+@pytest.mark.parametrize("jwt_strategy", ["HS256"], indirect=True)
+@pytest.mark.authentication
+class TestDecodeCache:
+    async def test_cached_token_is_not_decoded_again(
+        self,
+        jwt_strategy: JWTStrategy[UserModel, SignInModel],
+        user_manager,
+        token,
+        user,
+        mocker,
+    ):
+        jwt_strategy.decode_cache = LRUCache(maxsize=10)
+        decode_spy = mocker.spy(jwt_strategy, "_decode_token")
+        user_token = token(user.id)
+
+        for _ in range(3):
+            authenticated_user = await jwt_strategy.read_token(user_token, user_manager)
+            assert authenticated_user is not None
+
+        assert decode_spy.call_count == 1
+
+    async def test_token_without_expiry_is_not_cached(
+        self, jwt_strategy: JWTStrategy[UserModel, SignInModel], token, user
+    ):
+        jwt_strategy.decode_cache = LRUCache(maxsize=10)
+
+        jwt_strategy.decode_token(token(user.id, lifetime=None))
+
+        assert len(jwt_strategy.decode_cache) == 0
+
+
+@pytest.mark.authentication
+async def test_decode_cache_blacklist_takes_priority(secret, user_manager, user):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME, decode_cache=LRUCache(maxsize=10))
+    user_token = await strategy.write_token(user)
+    assert await strategy.read_token(user_token, user_manager) is not None
+
+    strategy.blacklist_manager = MockBlacklistManager({get_jti(strategy, user_token)})
+
+    assert await strategy.read_token(user_token, user_manager) is None
+
+
+@pytest.mark.authentication
+async def test_read_tokens(
+    secret, user_manager, user, inactive_user, superuser, mocker
+):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    user_token = await strategy.write_token(user)
+    superuser_token = await strategy.write_token(superuser)
+    revoked_token = await strategy.write_token(inactive_user)
+    strategy.blacklist_manager = MockBlacklistManager(
+        {get_jti(strategy, revoked_token)}
+    )
+    get_multiple_spy = mocker.spy(user_manager, "get_multiple")
+
+    users = await strategy.read_tokens(
+        [user_token, "foo", superuser_token, revoked_token, "bar"], user_manager
+    )
+
+    assert [u.id if u else None for u in users] == [
+        user.id,
+        None,
+        superuser.id,
+        None,
+        None,
+    ]
+    assert get_multiple_spy.call_count == 1
+
+
+@pytest.mark.authentication
+async def test_destroy_token_enlists_jti(secret, user_manager, user):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    strategy.blacklist_manager = MockBlacklistManager()
+    user_token = await strategy.write_token(user)
+    data = strategy.decode_token(user_token)
+
+    with pytest.raises(StrategyDestroyNotSupportedError):
+        await strategy.destroy_token(user_token, user)
+
+    assert strategy.blacklist_manager.expires_at == {data["jti"]: data["exp"]}
+    assert await strategy.read_token(user_token, user_manager) is None
+
+
+@pytest.mark.authentication
+async def test_read_token_without_jti(secret, user_manager, user):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    strategy.blacklist_manager = MockBlacklistManager()
+    legacy_token = generate_jwt(
+        {"sub": str(user.id), "aud": strategy.token_audience}, secret, LIFETIME
+    )
+    assert await strategy.read_token(legacy_token, user_manager) is user
+
+    with pytest.raises(StrategyDestroyNotSupportedError):
+        await strategy.destroy_token(legacy_token, user)
+
+    assert await strategy.read_token(legacy_token, user_manager) is None
+
+
+@pytest.mark.authentication
+async def test_token_revoked_in_legacy_blacklist(secret, user_manager, user):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    legacy_token = generate_jwt(
+        {"sub": str(user.id), "aud": strategy.token_audience}, secret, LIFETIME
+    )
+    user_token = await strategy.write_token(user)
+    strategy.blacklist_manager = MockBlacklistManager(
+        legacy_tokens={legacy_token, user_token}
+    )
+
+    assert await strategy.read_token(legacy_token, user_manager) is None
+    # Tokens with a jti were never enlisted into the day sets
+    assert await strategy.read_token(user_token, user_manager) is user
+
+
+class MockSessionManager:
+    def __init__(self, watermarks: dict | None = None):
+        self.watermarks = watermarks or {}
+
+    async def get_watermarks(self, user_ids: list) -> list[float | None]:
+        return [self.watermarks.get(user_id) for user_id in user_ids]
+
+
+@pytest.mark.authentication
+async def test_read_token_issued_before_watermark(
+    secret, user_manager, user, superuser
+):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    user_token = await strategy.write_token(user)
+    superuser_token = await strategy.write_token(superuser)
+    strategy.session_manager = MockSessionManager({user.id: time.time()})
+
+    assert await strategy.read_token(user_token, user_manager) is None
+    assert await strategy.read_token(superuser_token, user_manager) is superuser
+    assert [
+        u.id if u else None
+        for u in await strategy.read_tokens([user_token, superuser_token], user_manager)
+    ] == [None, superuser.id]
+
+    new_user_token = await strategy.write_token(user)
+    assert await strategy.read_token(new_user_token, user_manager) is user
+
+
+@pytest.mark.authentication
+async def test_read_token_without_iat_and_watermark(secret, user_manager, user):
+    strategy = JWTBlacklistStrategy(secret, LIFETIME)
+    legacy_token = generate_jwt(
+        {"sub": str(user.id), "aud": strategy.token_audience}, secret, LIFETIME
+    )
+    strategy.session_manager = MockSessionManager({user.id: time.time()})
+
+    assert await strategy.read_token(legacy_token, user_manager) is None
+
+
+@pytest.fixture
+def rotating_strategy(secret) -> JWTBlacklistStrategy[UserModel, SignInModel]:
+    storage = TokenFamilyRedisStorage(
+        fakeredis.aioredis.FakeRedis(), "family_test"  # type: ignore
+    )
+    return JWTBlacklistStrategy(
+        secret,
+        LIFETIME,
+        blacklist_manager=MockBlacklistManager(),
+        family_manager=TokenFamilyRedisManager(storage),
+    )
+
+
+@pytest.mark.authentication
+class TestRotation:
+    async def test_rotate_token(self, rotating_strategy, user_manager, user):
+        token = await rotating_strategy.write_token(user)
+        family_id = rotating_strategy.decode_token(token)["fam"]
+
+        rotated = await rotating_strategy.rotate_token(token, user)
+
+        assert rotating_strategy.decode_token(rotated)["fam"] == family_id
+        assert await rotating_strategy.read_token(rotated, user_manager) is user
+
+    async def test_replay_revokes_family(self, rotating_strategy, user_manager, user):
+        token = await rotating_strategy.write_token(user)
+        rotated = await rotating_strategy.rotate_token(token, user)
+
+        assert await rotating_strategy.read_token(token, user_manager) is None
+        assert await rotating_strategy.read_token(rotated, user_manager) is None
+        assert await rotating_strategy.rotate_token(rotated, user) is None
+
+    async def test_destroy_token_revokes_family(
+        self, rotating_strategy, user_manager, user
+    ):
+        token = await rotating_strategy.write_token(user)
+
+        with pytest.raises(StrategyDestroyNotSupportedError):
+            await rotating_strategy.destroy_token(token, user)
+
+        assert await rotating_strategy.read_token(token, user_manager) is None
+        assert rotating_strategy.blacklist_manager.token_ids == set()
+
+    async def test_rotate_token_without_family(
+        self, rotating_strategy, user_manager, user
+    ):
+        legacy_token = await JWTBlacklistStrategy(
+            rotating_strategy.secret, LIFETIME
+        ).write_token(user)
+        assert await rotating_strategy.read_token(legacy_token, user_manager) is user
+
+        rotated = await rotating_strategy.rotate_token(legacy_token, user)
+
+        assert "fam" in rotating_strategy.decode_token(rotated)
+        assert await rotating_strategy.read_token(legacy_token, user_manager) is None
+
+    async def test_not_supported(self, secret, user):
+        strategy = JWTBlacklistStrategy(secret, LIFETIME)
+        with pytest.raises(StrategyRotateNotSupportedError):
+            await strategy.rotate_token(await strategy.write_token(user), user)
@@ -0,0 +1,80 @@
+import time
+
+import fakeredis.aioredis
+import pytest
+
+from authentication.strategy import RedisStrategy, TokenPrincipal
+from tests.conftest import SignInModel, UserModel
+from tests.test_authentication_strategy_jwt import MockSessionManager
+
+LIFETIME = 3600
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def redis_strategy() -> RedisStrategy[UserModel, SignInModel]:
+    return RedisStrategy(fakeredis.aioredis.FakeRedis(), LIFETIME)  # type: ignore
+
+
+@pytest.mark.authentication
+async def test_write_read_token(
+    redis_strategy: RedisStrategy[UserModel, SignInModel], user_manager, superuser
+):
+    token = await redis_strategy.write_token(superuser)
+
+    principal = await redis_strategy.read_token(token, user_manager)
+
+    assert principal == TokenPrincipal(
+        id=superuser.id, is_active=True, is_superuser=True, is_verified=False
+    )
+    ttl = await redis_strategy.redis.ttl(redis_strategy.get_key(token))
+    assert 0 < ttl <= LIFETIME
+
+
+@pytest.mark.authentication
+@pytest.mark.parametrize("token", [None, "unknown"])
+async def test_read_token_missing(
+    redis_strategy: RedisStrategy[UserModel, SignInModel], user_manager, token
+):
+    assert await redis_strategy.read_token(token, user_manager) is None
+
+
+@pytest.mark.authentication
+async def test_read_tokens(
+    redis_strategy: RedisStrategy[UserModel, SignInModel], user_manager, user, superuser
+):
+    user_token = await redis_strategy.write_token(user)
+    superuser_token = await redis_strategy.write_token(superuser)
+
+    principals = await redis_strategy.read_tokens(
+        [user_token, "unknown", superuser_token], user_manager
+    )
+
+    assert [p.id if p else None for p in principals] == [user.id, None, superuser.id]
+
+
+@pytest.mark.authentication
+async def test_destroy_token(
+    redis_strategy: RedisStrategy[UserModel, SignInModel], user_manager, user
+):
+    token = await redis_strategy.write_token(user)
+
+    await redis_strategy.destroy_token(token, user)
+
+    assert await redis_strategy.read_token(token, user_manager) is None
+
+
+@pytest.mark.authentication
+async def test_read_token_issued_before_watermark(
+    redis_strategy: RedisStrategy[UserModel, SignInModel], user_manager, user
+):
+    token = await redis_strategy.write_token(user)
+    redis_strategy.session_manager = MockSessionManager({user.id: time.time()})
+
+    assert await redis_strategy.read_token(token, user_manager) is None
+
+    new_token = await redis_strategy.write_token(user)
+    principal = await redis_strategy.read_token(new_token, user_manager)
+    assert principal is not None
+    assert principal.id == user.id
@@ -2,8 +2,12 @@ import pytest
 from fastapi import status
 from fastapi.responses import JSONResponse
 
-from authentication.transport import BearerTransport, TransportLogoutNotSupportedError
-from authentication.transport.bearer import BearerResponse
+from authentication.transport import (
+    BearerTransport,
+    TokenPairBearerTransport,
+    TransportLogoutNotSupportedError,
+)
+from authentication.transport.bearer import BearerResponse, TokenPairBearerResponse
 
 
 @pytest.fixture()
@@ -37,3 +41,23 @@ def test_get_openapi_login_responses_success(bearer_transport: BearerTransport):
 def test_get_openapi_logout_responses_success(bearer_transport: BearerTransport):
     openapi_responses = bearer_transport.get_openapi_logout_responses_success()
     assert openapi_responses == {}
+
+
+@pytest.mark.authentication
+async def test_get_token_pair_response():
+    transport = TokenPairBearerTransport(token_url="/login")
+
+    response = await transport.get_token_pair_response("ACCESS", "REFRESH")
+
+    assert transport.token_pair is True
+    assert response.body == (
+        b'{"access_token":"ACCESS","refresh_token":"REFRESH","token_type":"bearer"}'
+    )
+
+
+@pytest.mark.authentication
+@pytest.mark.openapi
+def test_get_openapi_token_pair_responses_success():
+    transport = TokenPairBearerTransport(token_url="/login")
+    openapi_responses = transport.get_openapi_login_responses_success()
+    assert openapi_responses[status.HTTP_200_OK]["model"] == TokenPairBearerResponse
@@ -0,0 +1,884 @@
+import asyncio
+import contextlib
+import os
+import pickle
+import time
+import uuid
+from functools import partial
+
+import fakeredis.aioredis
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from redis.exceptions import RedisError
+
+from cache.cache import (
+    FORMAT_RAW,
+    FORMAT_ZLIB,
+    NOT_FOUND,
+    Cache,
+    RedisCacheStorage,
+    cache_decorator,
+    cache_many_decorator,
+)
+from cache.lru import LRUCache
+from core.metrics import get_value
+from db.access_rights import SARoleAccessRight, SARoleAccessRightDB
+from db.schemas import models
+from tests.test_authentication_strategy_blacklist import wait_for
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    """Cache is a singleton, every test builds its own instances."""
+    instance = Cache._instances.pop(Cache, None)
+    yield
+    Cache._instances.pop(Cache, None)
+    if instance is not None:
+        Cache._instances[Cache] = instance
+
+
+def get_cache(server: fakeredis.FakeServer, local: LRUCache | None = None) -> Cache:
+    Cache._instances.pop(Cache, None)
+    storage = RedisCacheStorage(
+        fakeredis.aioredis.FakeRedis(server=server)  # type: ignore
+    )
+    return Cache(storage, local)
+
+
+@pytest.mark.cache
+async def test_get_set():
+    cache = get_cache(fakeredis.FakeServer())
+
+    await cache.set("key", {"value": 1})
+
+    assert await cache.get("key") == {"value": 1}
+    assert await cache.get("missing") is None
+
+
+@pytest.mark.cache
+async def test_get_set_model():
+    cache = get_cache(fakeredis.FakeServer())
+    role = models.RoleRead(id=uuid.uuid4(), name="admin")
+
+    await cache.set("key", role)
+    await cache.set("list", [role])
+
+    assert (await cache.storage.get("key")).startswith(b"j")
+    assert await cache.get("key") == role
+    assert await cache.get("list") == [role]
+
+
+@pytest.mark.cache
+async def test_undecodable_value_is_a_miss():
+    cache = get_cache(fakeredis.FakeServer())
+    await cache.storage.set("key", b"j{}")
+
+    assert await cache.get("key") is None
+
+
+@pytest.mark.cache
+async def test_set_expires_with_ttl():
+    cache = get_cache(fakeredis.FakeServer())
+
+    await cache.set("key", "value", 30)
+    await cache.set("forever", "value")
+
+    assert 0 < await cache.storage._client.pttl("key") <= 30_000
+    assert await cache.storage._client.ttl("forever") == -1
+
+
+@pytest.mark.cache
+class TestCacheDecorator:
+    async def test_caches_result_with_ttl(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        @cache_decorator(60, cache_storage=cache)
+        async def get_items(item_id: int) -> list[int]:
+            calls.append(item_id)
+            return [item_id] if item_id else []
+
+        assert await get_items(1) == [1]
+        assert await get_items(1) == [1]
+        assert await get_items(0) == []
+        assert await get_items(0) == []
+
+        assert calls == [1, 0]
+        keys = await cache.storage._client.keys()
+        assert len(keys) == 2
+        for key in keys:
+            assert 0 < await cache.storage._client.ttl(key) <= 60
+
+    async def test_not_found_is_cached_with_tags(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        @cache_decorator(
+            60,
+            tags=lambda result, name, **_: [f"name:{name}"],
+            not_found_seconds=10,
+            cache_storage=cache,
+        )
+        async def get_item(name: str) -> None:
+            calls.append(name)
+
+        assert await get_item("missing") is None
+        assert await get_item("missing") is None
+        keys = await cache.storage._client.keys("*get_item*")
+        assert 0 < await cache.storage._client.ttl(keys[0]) <= 10
+
+        await cache.invalidate_tags("name:missing")
+        await get_item("missing")
+
+        assert calls == ["missing", "missing"]
+
+    async def test_none_is_not_cached(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        @cache_decorator(60, cache_storage=cache)
+        async def get_item(item_id: int) -> None:
+            calls.append(item_id)
+
+        await get_item(1)
+        await get_item(1)
+
+        assert calls == [1, 1]
+
+
+@pytest.mark.cache
+class TestTags:
+    async def test_invalidate_tags(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("user", "value", 60, tags=["user:1"])
+        await cache.set("users", "value", 60, tags=["user:1", "user:2"])
+        await cache.set("other", "value", 60, tags=["user:2"])
+
+        await cache.invalidate_tags("user:1", "user:3")
+
+        assert await cache.get("user") is None
+        assert await cache.get("users") is None
+        assert await cache.get("other") == "value"
+        assert not await cache.storage._client.exists("cache:tags:user:1")
+
+    async def test_tags_outlive_keys(self):
+        cache = get_cache(fakeredis.FakeServer())
+        cache.tag_ttl_seconds = 120
+
+        await cache.set("short", "value", 60, tags=["tag"])
+        await cache.set("long", "value", 600, tags=["long"])
+
+        assert 60 < await cache.storage._client.ttl("cache:tags:tag") <= 120
+        assert 120 < await cache.storage._client.ttl("cache:tags:long") <= 600
+
+    async def test_not_found_tags_expire_with_keys(self):
+        cache = get_cache(fakeredis.FakeServer())
+        cache.tag_ttl_seconds = 3600
+        calls = []
+
+        @cache_decorator(
+            60,
+            tags=lambda result, email, **_: [f"user:email:{email}"],
+            not_found_seconds=10,
+            cache_storage=cache,
+        )
+        async def get_user(email: str) -> None:
+            calls.append(email)
+
+        await cache.set("found", "value", 60, tags=["user:email:shared"])
+        await get_user("missing")
+        await get_user("shared")
+
+        tag_key = "cache:tags:user:email:missing:not_found"
+        assert 0 < await cache.storage._client.ttl(tag_key) <= 10
+        assert not await cache.storage._client.exists("cache:tags:user:email:missing")
+        # The negative entry does not shorten the tag of found values
+        shared_ttl = await cache.storage._client.ttl("cache:tags:user:email:shared")
+        assert 60 < shared_ttl <= 3600
+
+        await cache.invalidate_tags("user:email:shared")
+        await get_user("shared")
+
+        assert await cache.get("found") is None
+        assert calls == ["missing", "shared", "shared"]
+
+    async def test_decorator_tags(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        @cache_decorator(
+            60,
+            tags=lambda result, item_id, **_: [f"item:{item_id}"],
+            cache_storage=cache,
+        )
+        async def get_item(item_id: int, version: int = 1) -> int:
+            calls.append(item_id)
+            return item_id
+
+        await get_item(1)
+        await get_item(item_id=1)
+        await get_item(2)
+        await cache.invalidate_tags("item:1")
+        await get_item(1)
+        await get_item(2)
+
+        assert calls == [1, 1, 2, 1]
+
+    async def test_moved_role_right_invalidates_both_roles(self, mocker):
+        cache = get_cache(fakeredis.FakeServer())
+        old_role_id, new_role_id = uuid.uuid4(), uuid.uuid4()
+        row = SARoleAccessRight(
+            id=uuid.uuid4(), role_id=old_role_id, access_right_id=uuid.uuid4()
+        )
+        session = mocker.MagicMock(commit=mocker.AsyncMock())
+        session.execute = mocker.AsyncMock(return_value=session.result)
+        session.result.unique.return_value.fetchall.return_value = [(row,)]
+        session.result.unique.return_value.scalar_one_or_none.return_value = row
+        role_rights_db = SARoleAccessRightDB(session, SARoleAccessRight)
+
+        @contextlib.asynccontextmanager
+        async def detached():
+            yield role_rights_db
+
+        role_rights_db.detached = detached  # type: ignore[method-assign]
+        build_key = SARoleAccessRightDB.get_role_access_rights.cached.build_key
+        await role_rights_db.get_role_access_rights(old_role_id)
+        await role_rights_db.get_role_access_rights(new_role_id)
+        assert await cache.get(build_key(role_rights_db, old_role_id)) is not None
+
+        previous = models.RoleAccessRight.from_orm(row)
+        role_right = await role_rights_db.update(previous, {"role_id": new_role_id})
+
+        assert role_right.role_id == row.role_id == new_role_id
+        assert previous.role_id == old_role_id
+        assert await cache.get(build_key(role_rights_db, old_role_id)) is None
+        assert await cache.get(build_key(role_rights_db, new_role_id)) is None
+
+    async def test_expired_keys_leave_tags(self, monkeypatch):
+        monkeypatch.setattr("cache.cache.TAG_SKEW_SECONDS", 0)
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("expired", "value", 0.01, tags=["roles"])
+        await asyncio.sleep(0.02)
+
+        await cache.set("live", "value", 60, tags=["roles"])
+
+        assert await cache.storage._client.zrange("cache:tags:roles", 0, -1) == [
+            b"live"
+        ]
+
+    async def test_invalidation_during_compute_is_not_cached(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        async def compute():
+            # The writer commits and invalidates while the old row is in hand
+            await cache.invalidate_tags("item:1")
+            return "old"
+
+        value = await cache.get_or_set(
+            "key", compute, 60, tags=lambda value: ["item:1"]
+        )
+
+        assert value == "old"
+        assert await cache.get("key") is None
+        assert not await cache.storage._client.exists("cache:tags:item:1")
+
+    async def test_invalidation_during_write_drops_value(self, monkeypatch):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16))
+        cache.local_ready = True
+        set_many = cache.storage.set_many
+
+        async def invalidate_then_set_many(*args, **kwargs):
+            # Invalidation reads the tag before the value is registered
+            await cache.storage.invalidate_tags(["item:1"])
+            await set_many(*args, **kwargs)
+
+        monkeypatch.setattr(cache.storage, "set_many", invalidate_then_set_many)
+
+        await cache.get_or_set(
+            "key", partial(asyncio.sleep, 0, "old"), 60, tags=lambda value: ["item:1"]
+        )
+
+        assert await cache.storage.get("key") is None
+        assert "key" not in cache.local
+
+    async def test_batch_invalidated_during_compute(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        async def compute(ids):
+            await cache.invalidate_tags("item:1")
+            return {id_: f"old:{id_}" for id_ in ids}
+
+        values = await cache.get_or_set_many(
+            {1: "key:1", 2: "key:2"},
+            compute,
+            60,
+            tags=lambda id_, value: [f"item:{id_}"],
+        )
+
+        assert values == {1: "old:1", 2: "old:2"}
+        assert await cache.get_many(["key:1", "key:2"]) == [None, "old:2"]
+
+    async def test_invalidation_restarts_inflight_compute(self):
+        cache = get_cache(fakeredis.FakeServer())
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def compute_old():
+            started.set()
+            await release.wait()
+            return "old"
+
+        async def compute_new():
+            return "new"
+
+        old = asyncio.create_task(cache.get_or_set("key", compute_old, 60))
+        await started.wait()
+        await cache.invalidate_tags("item:1")
+
+        assert await cache.get_or_set("key", compute_new, 60) == "new"
+        release.set()
+        assert await old == "old"
+
+    async def test_invalidate_local_cache_of_other_worker(self):
+        server = fakeredis.FakeServer()
+        worker = get_cache(server, LRUCache(16))
+        other_worker = get_cache(server, LRUCache(16))
+        worker.start_sync()
+        try:
+            await wait_for(lambda: worker.local_ready)
+            await worker.set("first", "value", tags=["tag"])
+            await worker.set("second", "value", tags=["tag"])
+
+            await other_worker.invalidate_tags("tag")
+
+            await wait_for(lambda: len(worker.local) == 0)
+            assert await worker.get("first") is None
+        finally:
+            await worker.stop_sync()
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.cache
+class TestSingleFlight:
+    async def test_not_found_survives_pickling(self):
+        assert pickle.loads(pickle.dumps(NOT_FOUND)) is NOT_FOUND
+
+    async def test_concurrent_misses_compute_once(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(
+            *(cache.get_or_set("key", compute, 60) for _ in range(10))
+        )
+
+        assert results == ["value"] * 10
+        assert len(calls) == 1
+        assert cache._inflight == {}
+
+    async def test_error_is_shared(self):
+        cache = get_cache(fakeredis.FakeServer())
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError()
+
+        results = await asyncio.gather(
+            *(cache.get_or_set("key", compute) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 1
+        assert await cache.get("key") is None
+
+    async def test_cancelled_caller_does_not_cancel_compute(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "value"
+
+        first = asyncio.ensure_future(cache.get_or_set("key", compute))
+        second = asyncio.ensure_future(cache.get_or_set("key", compute))
+        await asyncio.sleep(0.005)
+        first.cancel()
+
+        assert await second == "value"
+
+    async def test_lock_across_workers(self):
+        server = fakeredis.FakeServer()
+        worker, other_worker = get_cache(server), get_cache(server)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "value"
+
+        results = await asyncio.gather(
+            worker.get_or_set("key", compute, 60, lock_seconds=1),
+            other_worker.get_or_set("key", compute, 60, lock_seconds=1),
+        )
+
+        assert results == ["value", "value"]
+        assert len(calls) == 1
+        assert not await worker.storage._client.exists("cache:lock:key")
+
+    @pytest.mark.parametrize("outcome", [None, ValueError("failed")])
+    async def test_lock_released_without_value(self, outcome):
+        server = fakeredis.FakeServer()
+        worker, other_worker = get_cache(server), get_cache(server)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            if len(calls) > 1:
+                return "value"
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        started_at = time.monotonic()
+        results = await asyncio.gather(
+            worker.get_or_set("key", compute, 60, lock_seconds=2),
+            other_worker.get_or_set("key", compute, 60, lock_seconds=2),
+            return_exceptions=True,
+        )
+
+        # The waiter does not sit out the lock TTL
+        assert time.monotonic() - started_at < 1
+        assert results[0] is outcome
+        assert results[1] == "value"
+        assert len(calls) == 2
+        assert not await worker.storage._client.exists("cache:lock:key")
+
+    async def test_lock_timeout(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.storage.acquire_lock("key", "other", 1)
+
+        async def compute():
+            return "value"
+
+        assert await cache.get_or_set("key", compute, lock_seconds=0.1) == "value"
+        assert await cache.storage._client.get("cache:lock:key") == b"other"
+
+
+@pytest.mark.cache
+class TestStaleWhileRevalidate:
+    async def test_miss_is_computed_with_hard_ttl(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        async def compute():
+            return "value"
+
+        assert await cache.get_or_set("key", compute, 60, stale_seconds=30) == "value"
+        assert 60 < await cache.storage._client.ttl("key") <= 90
+
+    async def test_stale_value_is_refreshed_in_background(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key", "old", 0.5)
+        refreshed = asyncio.Event()
+
+        async def compute():
+            await refreshed.wait()
+            return "new"
+
+        value = await cache.get_or_set("key", compute, 60, stale_seconds=1)
+
+        assert value == "old"
+        assert "key" in cache._inflight
+        refreshed.set()
+        await wait_for(lambda: "key" not in cache._inflight)
+        assert await cache.get("key") == "new"
+
+    async def test_fresh_value_is_not_refreshed(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key", "old", 90)
+
+        async def compute():
+            return "new"
+
+        assert await cache.get_or_set("key", compute, 60, stale_seconds=30) == "old"
+        assert cache._inflight == {}
+
+    async def test_xfetch_refreshes_slow_values_early(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key", "old", 90)
+        cache._compute_seconds.set("key", 1e6)
+
+        async def compute():
+            return "new"
+
+        assert (
+            await cache.get_or_set(
+                "key", compute, 60, stale_seconds=30, xfetch_beta=1.0
+            )
+            == "old"
+        )
+        await wait_for(lambda: "key" not in cache._inflight)
+        assert await cache.get("key") == "new"
+
+    async def test_refresh_error_keeps_stale_value(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key", "old", 0.5)
+
+        async def compute():
+            raise ValueError()
+
+        assert await cache.get_or_set("key", compute, 60, stale_seconds=1) == "old"
+        await wait_for(lambda: "key" not in cache._inflight)
+        assert await cache.get("key") == "old"
+
+    async def test_decorator_computes_on_detached_repository(self):
+        cache = get_cache(fakeredis.FakeServer())
+        sessions = []
+
+        class Repository:
+            def __init__(self, session: str = "request"):
+                self.session = session
+
+            @contextlib.asynccontextmanager
+            async def detached(self):
+                yield Repository("detached")
+
+            @cache_decorator(60, stale_seconds=30, cache_storage=cache)
+            async def get(self, item_id: int) -> int:
+                await asyncio.sleep(0.02)
+                if self.session == "closed":
+                    raise RuntimeError("Session is closed")
+                sessions.append(self.session)
+                return item_id
+
+        initiator = Repository()
+        first = asyncio.ensure_future(initiator.get(1))
+        second = asyncio.ensure_future(Repository().get(1))
+        await asyncio.sleep(0.005)
+        # The request that started the compute is torn down mid-flight
+        first.cancel()
+        initiator.session = "closed"
+
+        assert await second == 1
+        key = next(iter(await cache.storage._client.keys()))
+        await cache.storage._client.pexpire(key, 1000)
+        assert await Repository().get(1) == 1
+        await wait_for(lambda: not cache._inflight)
+
+        assert sessions == ["detached", "detached"]
+
+
+@pytest.mark.cache
+class TestBatch:
+    async def test_get_or_set_many(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key:1", "cached")
+        missing = []
+
+        async def compute(ids):
+            missing.extend(ids)
+            return {2: "computed"}
+
+        values = await cache.get_or_set_many(
+            {1: "key:1", 2: "key:2", 3: "key:3"},
+            compute,
+            60,
+            tags=lambda id_, value: [f"item:{id_}"],
+            not_found_seconds=10,
+        )
+
+        assert values == {1: "cached", 2: "computed", 3: None}
+        assert missing == [2, 3]
+        assert await cache.get_many(["key:2", "key:3"]) == ["computed", NOT_FOUND]
+        assert 0 < await cache.storage._client.ttl("key:2") <= 60
+        assert 0 < await cache.storage._client.ttl("key:3") <= 10
+        assert await cache.storage._client.zrange("cache:tags:item:2", 0, -1) == [
+            b"key:2"
+        ]
+        assert 0 < await cache.storage._client.ttl("cache:tags:item:3:not_found") <= 10
+
+    async def test_shares_keys_with_single_reads(self):
+        cache = get_cache(fakeredis.FakeServer())
+        single_calls, batch_calls = [], []
+
+        class Repository:
+            @cache_decorator(
+                60,
+                tags=lambda result, item_id, **_: [f"item:{item_id}"],
+                cache_storage=cache,
+            )
+            async def get(self, item_id: int) -> int | None:
+                single_calls.append(item_id)
+                return item_id if item_id < 10 else None
+
+            @cache_many_decorator(get, lambda item: item, cache_storage=cache)
+            async def get_multiple(self, item_ids: list[int]) -> list[int]:
+                batch_calls.append(item_ids)
+                return [item_id for item_id in item_ids if item_id < 10]
+
+        repository = Repository()
+        await repository.get(1)
+
+        assert await repository.get_multiple([3, 1, 2, 3, 10]) == [3, 1, 2]
+        assert await repository.get(2) == 2
+        await cache.invalidate_tags("item:3")
+        assert await repository.get_multiple([1, 2, 3]) == [1, 2, 3]
+
+        assert single_calls == [1]
+        assert batch_calls == [[3, 2, 10], [3]]
+
+    async def test_group(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        class Repository:
+            @cache_decorator(60, cache_storage=cache)
+            async def get_items(self, group_id: int) -> list[tuple[int, int]]:
+                raise NotImplementedError
+
+            @cache_many_decorator(
+                get_items, lambda item: item[0], group=True, cache_storage=cache
+            )
+            async def get_groups_items(self, group_ids: list[int]):
+                return [(group_id, 0) for group_id in group_ids if group_id]
+
+        repository = Repository()
+
+        assert await repository.get_groups_items([1, 0, 2]) == [(1, 0), (2, 0)]
+        assert await repository.get_items(0) == []
+        assert await repository.get_items(2) == [(2, 0)]
+
+
+@pytest.mark.cache
+class TestCompression:
+    async def test_large_values_are_compressed(self):
+        client = fakeredis.aioredis.FakeRedis()
+        storage = RedisCacheStorage(client, compress_min_bytes=100)  # type: ignore
+        large, small = b"value" * 100, b"value"
+        stored_bytes = get_value("cache_bytes_written_total", size="stored")
+
+        await storage.set("large", large)
+        await storage.set_many([("small", small, None, ["tag"])])
+
+        assert (await client.get("large"))[:1] == FORMAT_ZLIB
+        assert len(await client.get("large")) < len(large)
+        assert await client.get("small") == FORMAT_RAW + small
+        assert await storage.get_many(["large", "small"]) == [large, small]
+        assert await storage.get_with_ttl("large") == (large, None)
+        assert get_value(
+            "cache_bytes_written_total", size="stored"
+        ) - stored_bytes < len(large)
+        assert 0 < get_value("cache_compression_ratio") <= 1.1
+
+    async def test_incompressible_values_are_stored_raw(self):
+        client = fakeredis.aioredis.FakeRedis()
+        storage = RedisCacheStorage(client, compress_min_bytes=1)  # type: ignore
+        value = os.urandom(256)
+
+        await storage.set("key", value)
+
+        assert await client.get("key") == FORMAT_RAW + value
+        assert await storage.get("key") == value
+
+    async def test_values_without_format_flag(self):
+        client = fakeredis.aioredis.FakeRedis()
+        storage = RedisCacheStorage(client)  # type: ignore
+        await client.set("key", pickle.dumps("value"))
+
+        assert pickle.loads(await storage.get("key")) == "value"
+
+
+@pytest.mark.cache
+class TestObservability:
+    async def test_decorator_counts_lookups(self):
+        cache = get_cache(fakeredis.FakeServer())
+
+        @cache_decorator(60, cache_storage=cache)
+        async def get_item(item_id: int) -> str:
+            if item_id < 0:
+                raise ValueError(item_id)
+            return "value"
+
+        name = f"{__name__}.{get_item.__qualname__}"
+        await get_item(1)
+        await get_item(1)
+        with pytest.raises(ValueError):
+            await get_item(-1)
+
+        assert get_value("cache_lookups_total", function=name, result="hit") == 1
+        assert get_value("cache_lookups_total", function=name, result="miss") == 2
+        assert get_value("cache_compute_errors_total", function=name) == 1
+        assert get_value("cache_lookup_seconds_count", function=name) == 3
+        assert get_value("cache_compute_seconds_count", function=name) == 1
+        assert get_value("cache_value_bytes_count", function=name) == 1
+        assert get_value("cache_value_bytes_sum", function=name) > 0
+
+    async def test_stale_and_error_lookups(self, monkeypatch):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key", "old", 0.5)
+
+        async def compute():
+            return "new"
+
+        await cache.get_or_set("key", compute, 60, stale_seconds=1, name="stale")
+        await wait_for(lambda: "key" not in cache._inflight)
+
+        async def get(key):
+            raise RedisError("Connection refused")
+
+        monkeypatch.setattr(cache.storage, "get", get)
+        with pytest.raises(RedisError):
+            await cache.get_or_set("other", compute, name="stale")
+
+        assert get_value("cache_lookups_total", function="stale", result="stale") == 1
+        assert get_value("cache_lookups_total", function="stale", result="error") == 1
+        assert get_value("cache_compute_seconds_count", function="stale") == 1
+
+    async def test_batch_counts_each_id(self):
+        cache = get_cache(fakeredis.FakeServer())
+        await cache.set("key:1", "cached")
+
+        async def compute(ids):
+            return {id_: "computed" for id_ in ids}
+
+        await cache.get_or_set_many(
+            {1: "key:1", 2: "key:2", 3: "key:3"}, compute, name="batch"
+        )
+
+        assert get_value("cache_lookups_total", function="batch", result="hit") == 1
+        assert get_value("cache_lookups_total", function="batch", result="miss") == 2
+        assert get_value("cache_compute_seconds_count", function="batch") == 1
+        assert get_value("cache_value_bytes_count", function="batch") == 2
+
+    async def test_spans_inside_trace(self, monkeypatch):
+        cache = get_cache(fakeredis.FakeServer())
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer(__name__)
+        monkeypatch.setattr("cache.cache._tracer", tracer)
+
+        async def compute():
+            return "value"
+
+        await cache.get_or_set("untraced", compute, name="traced")
+        assert exporter.get_finished_spans() == ()
+        with tracer.start_as_current_span("request"):
+            await cache.get_or_set("key", compute, name="traced")
+            await cache.get_or_set("key", compute, name="traced")
+
+        spans = exporter.get_finished_spans()
+        assert [span.name for span in spans] == [
+            "cache.compute",
+            "cache.get_or_set",
+            "cache.get_or_set",
+            "request",
+        ]
+        assert [span.attributes.get("cache.result") for span in spans[1:3]] == [
+            "miss",
+            "hit",
+        ]
+        assert spans[0].parent.span_id == spans[1].context.span_id
+        assert spans[1].attributes["cache.function"] == "traced"
+
+
+@pytest.mark.cache
+class TestLocalCache:
+    async def test_warm_read_skips_redis(self):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16))
+        cache.local_ready = True
+        await cache.set("key", "value")
+
+        await cache.storage._client.flushall()
+
+        assert await cache.get("key") == "value"
+
+    async def test_ttl_bounded_by_entry_ttl(self):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16, ttl=60))
+        cache.local_ready = True
+
+        await cache.set("key", "value", 0.01)
+        await asyncio.sleep(0.02)
+
+        assert "key" not in cache.local
+
+    async def test_hits_are_copies(self):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16))
+        cache.local_ready = True
+        role = models.RoleRead(id=uuid.uuid4(), name="admin")
+        await cache.set("key", role)
+
+        hit = await cache.get("key")
+        hit.name = "changed"
+
+        assert await cache.get("key") == role
+        assert await cache.get("key") is not await cache.get("key")
+
+    async def test_ttl_capped_at_redis_ttl(self):
+        server = fakeredis.FakeServer()
+        await get_cache(server).set("key", "value", 0.05)
+        cache = get_cache(server, LRUCache(16, ttl=60))
+        cache.local_ready = True
+
+        assert await cache.get_many(["key"]) == ["value"]
+        await cache.storage._client.flushall()
+        value, ttl_seconds = await cache.get_with_ttl("key")
+        assert value == "value"
+        assert 0 < ttl_seconds <= 0.05
+
+        await asyncio.sleep(0.06)
+        assert "key" not in cache.local
+
+    async def test_stale_local_value_is_refreshed(self):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16, ttl=60))
+        cache.local_ready = True
+        await cache.set("key", "stale", 30)
+
+        async def compute():
+            return "fresh"
+
+        value = await cache.get_or_set("key", compute, 60, stale_seconds=60)
+        await wait_for(lambda: not cache._inflight)
+
+        assert value == "stale"
+        assert await cache.get("key") == "fresh"
+
+    async def test_unused_until_synced(self):
+        cache = get_cache(fakeredis.FakeServer(), LRUCache(16))
+        await cache.set("key", "value")
+
+        assert len(cache.local) == 0
+        assert await cache.get("key") == "value"
+        assert len(cache.local) == 0
+
+    async def test_invalidated_by_other_worker(self):
+        server = fakeredis.FakeServer()
+        worker = get_cache(server, LRUCache(16))
+        other_worker = get_cache(server, LRUCache(16))
+
+        worker.start_sync()
+        try:
+            await wait_for(lambda: worker.local_ready)
+            await other_worker.set("key", "old")
+            assert await worker.get("key") == "old"
+
+            await worker.set("own", "value")
+            await other_worker.set("key", "new")
+            await wait_for(lambda: "key" not in worker.local)
+
+            assert await worker.get("key") == "new"
+            assert "own" in worker.local
+        finally:
+            await worker.stop_sync()
+            await asyncio.sleep(0.01)
+
+        assert worker.local_ready is False
@@ -0,0 +1,93 @@
+import dataclasses
+import enum
+import uuid
+
+import pytest
+from pydantic import BaseModel
+
+from cache.keys import key_builder, key_part, make_key
+from core.pagination import PaginateQueryParams
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Item(BaseModel):
+    id: uuid.UUID
+    name: str
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+class Repository:
+    def __init__(self, session: object):
+        self.session = session
+
+    async def get(self, item_id: uuid.UUID) -> None:
+        pass
+
+
+@pytest.mark.cache
+def test_key_format():
+    key = make_key("users.get", 2, (1,), {})
+
+    namespace, version, digest = key.split(":")
+    assert (namespace, version) == ("users.get", "2")
+    assert len(digest) == 32
+    assert make_key("users.get", 2, (1,), {}) == key
+    assert make_key("users.get", 3, (1,), {}) != key
+
+
+@pytest.mark.cache
+def test_key_builder_skips_self():
+    build = key_builder(Repository.get)
+    item_id = uuid.uuid4()
+
+    key = build(Repository(object()), item_id)
+
+    assert key == build(Repository(object()), item_id)
+    assert key.startswith(f"{__name__}.Repository.get:1:")
+    assert key != build(Repository(object()), uuid.uuid4())
+
+
+@pytest.mark.cache
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        (1, "1"),
+        (1, 1.0),
+        (True, 1),
+        (None, "N"),
+        (("a:", "b"), ("a", ":b")),
+        ([1, 2], [2, 1]),
+        (Point(1, 2), Point(2, 1)),
+        (uuid.UUID(int=1), uuid.UUID(int=2)),
+    ],
+)
+def test_key_part_is_unambiguous(first, second):
+    assert key_part(first) != key_part(second)
+
+
+@pytest.mark.cache
+def test_key_part_of_values():
+    item_id = uuid.uuid4()
+    pagination = PaginateQueryParams(page_number=2, page_size=10)
+
+    assert key_part({"b": 1, "a": 2}) == key_part({"a": 2, "b": 1})
+    assert key_part({3, 1, 2}) == key_part({1, 2, 3})
+    assert key_part(Item(id=item_id, name="a")) == key_part(Item(id=item_id, name="a"))
+    assert key_part(Color.RED) == key_part("red")
+    assert key_part(pagination) == key_part(
+        PaginateQueryParams(page_number=2, page_size=10)
+    )
+
+
+@pytest.mark.cache
+def test_key_part_rejects_unknown_values():
+    with pytest.raises(TypeError):
+        key_part(lambda: None)
@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+from cache.lru import LRUCache
+
+
+@pytest.mark.cache
+def test_evicts_least_recently_used():
+    cache = LRUCache[int](maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+@pytest.mark.cache
+def test_entry_expiry():
+    cache = LRUCache[int](maxsize=10, ttl=60)
+    cache.set("default", 1)
+    cache.set("expired", 2, expires_at=time.time() - 1)
+    cache.set("short", 3, ttl=-1)
+
+    assert cache.get("default") == 1
+    assert cache.get("expired") is None
+    assert cache.get("short", "missing") == "missing"
+
+
+@pytest.mark.cache
+def test_disabled_cache():
+    cache = LRUCache[int](maxsize=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from cache.cache import Cache, cache_decorator, get_cache
+from cache.lru import LRUCache
+from cache.memory import MemoryCacheStorage
+from core.config import settings
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    instance = Cache._instances.pop(Cache, None)
+    yield
+    Cache._instances.pop(Cache, None)
+    if instance is not None:
+        Cache._instances[Cache] = instance
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "memory")
+
+
+@pytest.mark.cache
+async def test_get_set_expires():
+    storage = MemoryCacheStorage()
+
+    await storage.set("key", b"value", 0.01)
+    await storage.set("forever", b"value")
+
+    assert await storage.get_many(["key", "forever", "missing"]) == [
+        b"value",
+        b"value",
+        None,
+    ]
+    assert (await storage.get_with_ttl("forever")) == (b"value", None)
+    await asyncio.sleep(0.02)
+    assert await storage.get("key") is None
+
+
+@pytest.mark.cache
+async def test_invalidate_tags():
+    storage = MemoryCacheStorage()
+    await storage.set_many(
+        [("first", b"1", 60, ["tag"]), ("second", b"2", 60, ["tag", "other"])]
+    )
+
+    assert sorted(await storage.invalidate_tags(["tag"])) == ["first", "second"]
+    assert await storage.get_many(["first", "second"]) == [None, None]
+    assert await storage.invalidate_tags(["tag"]) == []
+
+
+@pytest.mark.cache
+async def test_tag_generations():
+    storage = MemoryCacheStorage()
+    generation = await storage.get_generation()
+
+    await storage.invalidate_tags(["tag"])
+
+    assert await storage.get_generation() == generation + 1
+    assert await storage.get_tag_generations(["tag", "other"]) == [generation + 1, 0]
+
+
+@pytest.mark.cache
+async def test_expired_keys_leave_tags():
+    storage = MemoryCacheStorage()
+    await storage.set("expired", b"value", 0.01, ["tag"])
+    await asyncio.sleep(0.02)
+
+    await storage.set("live", b"value", 60, ["tag"])
+
+    assert list(storage._tags["tag"][0]) == ["live"]
+
+
+@pytest.mark.cache
+async def test_lock():
+    storage = MemoryCacheStorage()
+
+    assert await storage.acquire_lock("key", "first", 60)
+    assert not await storage.acquire_lock("key", "second", 60)
+    await storage.release_lock("key", "second")
+    assert not await storage.acquire_lock("key", "second", 60)
+    await storage.release_lock("key", "first")
+    assert await storage.acquire_lock("key", "second", 60)
+
+
+@pytest.mark.cache
+async def test_cache_over_memory_storage():
+    cache = Cache(MemoryCacheStorage(), LRUCache(16))
+    cache.start_sync()
+
+    assert cache.local_ready
+    await cache.set("key", "value", tags=["tag"])
+    assert await cache.get_or_set("key", asyncio.sleep) == "value"
+    await cache.invalidate_tags("tag")
+    assert await cache.get("key") is None
+    await cache.stop_sync()
+
+
+@pytest.mark.cache
+async def test_get_cache_backend(memory_backend):
+    assert isinstance(get_cache().storage, MemoryCacheStorage)
+
+
+@pytest.mark.cache
+async def test_decorator_binds_cache_on_call(memory_backend):
+    calls = []
+
+    @cache_decorator(60)
+    async def get_item(item_id: int) -> int:
+        calls.append(item_id)
+        return item_id
+
+    assert Cache.get_instance() is None
+    await get_item(1)
+    await get_item(1)
+
+    assert calls == [1]
+    assert isinstance(get_cache().storage, MemoryCacheStorage)
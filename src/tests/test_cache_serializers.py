@@ -0,0 +1,146 @@
+import datetime
+import enum
+import pickle
+import uuid
+
+import pytest
+from pydantic import BaseModel
+
+from cache.serializers import ModelSerializer, SerializationError, register_models
+from db.schemas import models
+
+
+class Channel(enum.Enum):
+    EMAIL = "email"
+
+
+class Notification(BaseModel):
+    channel: Channel
+    sent_at: datetime.date | None
+
+
+class User(BaseModel):
+    id: uuid.UUID
+    notifications: list[Notification]
+
+
+class Changed(BaseModel):
+    id: uuid.UUID
+
+
+class Ambiguous(BaseModel):
+    value: uuid.UUID | int
+
+
+register_models(Changed)
+
+
+def get_user() -> models.UserRead:
+    return models.UserRead(
+        id=uuid.uuid4(), username="user", email="user@example.com", hashed_password="x"
+    )
+
+
+@pytest.fixture
+def serializer() -> ModelSerializer:
+    return ModelSerializer()
+
+
+@pytest.mark.cache
+def test_model_roundtrip(serializer: ModelSerializer):
+    user = get_user()
+
+    data = serializer.dumps(user)
+
+    assert data.startswith(b"j")
+    loaded = serializer.loads(data)
+    assert loaded == user
+    assert type(loaded.id) is uuid.UUID
+    assert loaded.__fields_set__ == user.__fields_set__
+
+
+def get_events() -> list[models.EventRead]:
+    return [
+        models.EventRead(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            timestamp=datetime.datetime.now(),
+            fingerprint="agent",
+        )
+        for _ in range(3)
+    ]
+
+
+@pytest.mark.cache
+def test_list_roundtrip():
+    serializer = ModelSerializer(encode_lists=True)
+    events = get_events()
+
+    data = serializer.dumps(events)
+
+    assert data.startswith(b"j")
+    loaded = serializer.loads(data)
+    assert loaded == events
+    assert isinstance(loaded[0].timestamp, datetime.datetime)
+
+
+@pytest.mark.cache
+def test_lists_are_pickled_by_default(serializer: ModelSerializer):
+    events = get_events()
+
+    data = serializer.dumps(events)
+
+    assert data == pickle.dumps(events)
+    assert serializer.loads(data) == events
+
+
+@pytest.mark.cache
+def test_nested_models_roundtrip(serializer: ModelSerializer):
+    user = User(
+        id=uuid.uuid4(),
+        notifications=[
+            Notification(channel=Channel.EMAIL, sent_at=datetime.date.today()),
+            Notification(channel=Channel.EMAIL, sent_at=None),
+        ],
+    )
+
+    assert serializer.loads(serializer.dumps(user)) == user
+
+
+@pytest.mark.cache
+@pytest.mark.parametrize(
+    "value", [{"key": uuid.uuid4()}, uuid.uuid4(), [1, 2], Ambiguous(value=1)]
+)
+def test_other_values_are_pickled(serializer: ModelSerializer, value):
+    data = serializer.dumps(value)
+
+    assert data == pickle.dumps(value)
+    assert serializer.loads(data) == value
+
+
+@pytest.mark.cache
+def test_changed_model_is_rejected(serializer: ModelSerializer):
+    data = serializer.dumps(Changed(id=uuid.uuid4()))
+    Changed.__fields__["name"] = models.RoleRead.__fields__["name"]
+    try:
+        with pytest.raises(SerializationError):
+            ModelSerializer().loads(data)
+    finally:
+        del Changed.__fields__["name"]
+
+
+@pytest.mark.cache
+def test_unregistered_model_is_rejected(serializer: ModelSerializer):
+    data = serializer.dumps(Notification(channel=Channel.EMAIL, sent_at=None))
+
+    assert serializer.loads(data).channel is Channel.EMAIL
+    with pytest.raises(SerializationError):
+        ModelSerializer().loads(data)
+
+
+@pytest.mark.cache
+def test_corrupted_payload(serializer: ModelSerializer):
+    with pytest.raises(SerializationError):
+        serializer.loads(b'j{"m": "os:path:0", "f": {}}')
+    with pytest.raises(SerializationError):
+        serializer.loads(b"corrupted")
@@ -1,6 +1,9 @@
+import jwt
 import pytest
 
 from authentication.strategy.jwt import SecretType, decode_jwt, generate_jwt
+from core.jwt_utils import KeyRegistry, prepare_key
+from tests.test_authentication_strategy_jwt import RSA_PRIVATE_KEY, RSA_PUBLIC_KEY
 
 
 @pytest.mark.jwt
@@ -8,8 +11,38 @@ def test_generate_decode_jwt(secret: SecretType):
     audience = "TEST_AUDIENCE"
     data = {"foo": "bar", "aud": audience}
 
-    jwt = generate_jwt(data, secret, 3600)
-    decoded = decode_jwt(jwt, secret, [audience])
+    token = generate_jwt(data, secret, 3600)
+    decoded = decode_jwt(token, secret, [audience])
 
     assert decoded["foo"] == "bar"
     assert decoded["aud"] == audience
+
+
+@pytest.mark.jwt
+def test_generate_decode_jwt_with_prepared_keys():
+    audience = "TEST_AUDIENCE"
+    private_key = prepare_key(RSA_PRIVATE_KEY, "RS256")
+    public_key = prepare_key(RSA_PUBLIC_KEY, "RS256")
+
+    token = generate_jwt({"aud": audience}, private_key, 3600, algorithm="RS256")
+    decoded = decode_jwt(token, public_key, [audience], algorithms=["RS256"])
+
+    assert decoded["aud"] == audience
+    assert decode_jwt(token, RSA_PUBLIC_KEY, [audience], algorithms=["RS256"])
+
+
+@pytest.mark.jwt
+def test_key_registry_parses_key_once():
+    registry = KeyRegistry()
+
+    key = registry.get(SecretType(RSA_PUBLIC_KEY), "RS256")
+
+    assert not isinstance(key, str)
+    assert registry.get(RSA_PUBLIC_KEY, "RS256") is key
+    assert registry.get(key, "RS256") is key
+
+
+@pytest.mark.jwt
+def test_key_registry_invalid_key():
+    with pytest.raises(jwt.InvalidKeyError):
+        KeyRegistry().get("not a PEM key", "RS256")
@@ -323,6 +323,7 @@ class TestResetPassword:
         assert user_manager.on_after_reset_password.called is True
         actual_user = user_manager.on_after_reset_password.call_args[0][0]
         assert actual_user.id == user.id
+        assert user_manager.revoke_sessions.called is True
 
 
 @pytest.mark.manager
@@ -414,6 +415,7 @@ class TestDelete:
         assert user_manager.on_before_delete.called is True
 
         assert user_manager.on_after_delete.called is True
+        assert user_manager.revoke_sessions.called is True
 
 
 def test_integer_id_mixin():
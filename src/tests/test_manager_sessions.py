@@ -0,0 +1,67 @@
+import uuid
+
+import fakeredis.aioredis
+import pytest
+
+from cache.lru import LRUCache
+from managers.sessions import SessionWatermarkManager, SessionWatermarkRedisStorage
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def redis_server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+
+def get_session_manager(
+    server: fakeredis.FakeServer, cache_seconds: float = 60
+) -> SessionWatermarkManager:
+    storage = SessionWatermarkRedisStorage(
+        fakeredis.aioredis.FakeRedis(server=server), "watermark"  # type: ignore
+    )
+    return SessionWatermarkManager(
+        storage, ttl_seconds=3600, cache=LRUCache(maxsize=10, ttl=cache_seconds)
+    )
+
+
+@pytest.mark.manager
+async def test_revoke_all(redis_server):
+    manager = get_session_manager(redis_server)
+    user_id, other_id = uuid.uuid4(), uuid.uuid4()
+
+    watermark = await manager.revoke_all(user_id)
+
+    assert await manager.get_watermarks([user_id, other_id, user_id]) == [
+        watermark,
+        None,
+        watermark,
+    ]
+    ttl = await manager.storage._client.ttl(manager.storage.get_key(user_id))
+    assert 0 < ttl <= 3600
+
+
+@pytest.mark.manager
+async def test_watermarks_are_cached(redis_server, mocker):
+    manager = get_session_manager(redis_server)
+    user_id = uuid.uuid4()
+    get_many_spy = mocker.spy(manager.storage, "get_many")
+
+    assert await manager.get_watermarks([user_id]) == [None]
+    assert await manager.get_watermarks([user_id]) == [None]
+    assert get_many_spy.call_count == 1
+
+    watermark = await get_session_manager(redis_server).revoke_all(user_id)
+
+    assert await manager.get_watermarks([user_id]) == [None]
+    manager.cache.clear()
+    assert await manager.get_watermarks([user_id]) == [watermark]
+
+
+@pytest.mark.manager
+async def test_user_manager_revoke_sessions(redis_server, user_manager, user):
+    user_manager.session_manager = get_session_manager(redis_server)
+
+    await user_manager.revoke_sessions(user)
+
+    assert (await user_manager.session_manager.get_watermarks([user.id]))[0]
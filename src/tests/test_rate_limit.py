@@ -2,7 +2,8 @@ from typing import List
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.dependencies.utils import get_dependant
 from httpx import AsyncClient, Response
 
 from core.config import settings
@@ -77,6 +78,25 @@ class TestRateLimit(IsolatedAsyncioTestCase):
         self.assertEqual(rate_limiter.get_uuid, None)
         self.assertEqual(rate_limiter.callback, None)
 
+    async def test_rate_limiter_dependant(self):
+        async def get_uuid(request: Request) -> str:
+            ...  # pragma: no cover
+
+        with patch("rate_limiter.rate_limit.RATE_LIMITS", True):
+            dependant = get_dependant(
+                path="/limited", call=RateLimiter(1, RateLimitTime(1), get_uuid)
+            )
+
+        self.assertEqual(dependant.query_params, [])
+        self.assertEqual(
+            [dependency.call for dependency in dependant.dependencies], [get_uuid]
+        )
+        dependant = get_dependant(
+            path="/limited", call=RateLimiter(1, RateLimitTime(1))
+        )
+        self.assertEqual(dependant.query_params, [])
+        self.assertEqual(dependant.dependencies, [])
+
     async def test_default_callback(self):
         with self.assertRaises(HTTPException):
             await default_callback({})
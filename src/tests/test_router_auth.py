@@ -6,8 +6,15 @@ from fastapi import FastAPI, status
 
 from api.auth_users import get_auth_router
 from api.v1.common import ErrorCode
-from authentication import Authenticator
-from tests.conftest import UserModel, get_mock_authentication, get_user_manager
+from authentication import AuthenticationBackend, Authenticator, RefreshBearerTransport
+from core.config import settings
+from managers.jwt import get_bearer_transport
+from tests.conftest import (
+    MockStrategy,
+    UserModel,
+    get_mock_authentication,
+    get_user_manager,
+)
 
 pytestmark = pytest.mark.asyncio
 
@@ -163,6 +170,120 @@ class TestLogout:
         assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.router
+@pytest.mark.parametrize(
+    "token_pair,login_body,response_model",
+    [
+        (True, ["access_token", "refresh_token"], "TokenPairBearerResponse"),
+        (False, ["refresh_token"], "BearerResponse"),
+    ],
+)
+async def test_login_token_pair(
+    monkeypatch,
+    get_test_client,
+    get_user_manager,
+    user_manager,
+    user: UserModel,
+    token_pair: bool,
+    login_body: list[str],
+    response_model: str,
+):
+    monkeypatch.setattr(settings, "login_token_pair", token_pair)
+    access_backend = AuthenticationBackend(
+        name="mock",
+        transport=get_bearer_transport(),
+        get_strategy=lambda: MockStrategy(),
+    )
+    refresh_backend = AuthenticationBackend(
+        name="refresh_mock",
+        transport=RefreshBearerTransport(token_url="api/v1/refresh"),
+        get_strategy=lambda: MockStrategy(),
+    )
+    app = FastAPI()
+    app.include_router(
+        get_auth_router(
+            access_backend,
+            refresh_backend,
+            get_user_manager,
+            Authenticator([access_backend], get_user_manager),
+            Authenticator([refresh_backend], get_user_manager),
+        )
+    )
+
+    async for client in get_test_client(app):
+        response = await client.post(
+            "/api/v1/login", data={"username": "king.arthur", "password": "guinevere"}
+        )
+        openapi = (await client.get("/openapi.json")).json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        **{field: str(user.id) for field in login_body},
+        "token_type": "bearer",
+    }
+    assert user_manager.on_after_login.called is True
+    for path in ["/api/v1/login", "/api/v1/refresh"]:
+        schema = openapi["paths"][path]["post"]["responses"]["200"]["content"]
+        assert schema["application/json"]["schema"] == {
+            "$ref": f"#/components/schemas/{response_model}"
+        }
+
+
+@pytest.mark.router
+@pytest.mark.parametrize("path", ["/mock/api/v1/refresh", "/mock-bis/api/v1/refresh"])
+class TestRefresh:
+    async def test_missing_token(
+        self, path, test_app_client: tuple[httpx.AsyncClient, bool]
+    ):
+        client, _ = test_app_client
+        response = await client.post(path)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_rotation_not_supported(
+        self, path, test_app_client: tuple[httpx.AsyncClient, bool], user: UserModel
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            path, headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"access_token": str(user.id), "token_type": "bearer"}
+
+    async def test_rotated(
+        self,
+        mocker,
+        path,
+        test_app_client: tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+    ):
+        client, _ = test_app_client
+        mocker.patch.object(MockStrategy, "rotate_token", return_value="ROTATED")
+        response = await client.post(
+            path, headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "access_token": str(user.id),
+            "refresh_token": "ROTATED",
+            "token_type": "bearer",
+        }
+
+    async def test_replayed(
+        self,
+        mocker,
+        path,
+        test_app_client: tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+    ):
+        client, _ = test_app_client
+        mocker.patch.object(MockStrategy, "rotate_token", return_value=None)
+        response = await client.post(
+            path, headers={"Authorization": f"Bearer {user.id}"}
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.json()["detail"] == ErrorCode.REFRESH_BAD_TOKEN
+
+
 @pytest.mark.router
 async def test_route_names(app_factory, mock_authentication):
     app = app_factory(False)
@@ -171,3 +292,51 @@ async def test_route_names(app_factory, mock_authentication):
 
     logout_route_name = f"auth:{mock_authentication.name}.logout"
     assert app.url_path_for(logout_route_name) == "/mock/api/v1/logout"
+
+
+@pytest.mark.router
+@pytest.mark.parametrize(
+    "path", ["/mock/api/v1/auth/introspect", "/mock-bis/api/v1/auth/introspect"]
+)
+class TestIntrospect:
+    async def test_missing_token(
+        self, path, test_app_client: tuple[httpx.AsyncClient, bool]
+    ):
+        client, _ = test_app_client
+        response = await client.post(path, json={"tokens": []})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_not_superuser(
+        self, path, test_app_client: tuple[httpx.AsyncClient, bool], user: UserModel
+    ):
+        client, _ = test_app_client
+        response = await client.post(
+            path,
+            json={"tokens": [str(user.id)]},
+            headers={"Authorization": f"Bearer {user.id}"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_batch(
+        self,
+        path,
+        test_app_client: tuple[httpx.AsyncClient, bool],
+        user: UserModel,
+        inactive_user: UserModel,
+        superuser: UserModel,
+    ):
+        client, _ = test_app_client
+        tokens = [str(user.id), "foo", str(inactive_user.id), str(superuser.id)]
+        response = await client.post(
+            path,
+            json={"tokens": tokens},
+            headers={"Authorization": f"Bearer {superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        results = response.json()["tokens"]
+        assert [result["active"] for result in results] == [True, False, False, True]
+        assert results[0]["sub"] == str(user.id)
+        assert results[1]["sub"] is None
+        assert results[2]["is_active"] is False
+        assert results[3]["is_superuser"] is True
@@ -0,0 +1,67 @@
+import json
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+from fastapi import FastAPI, status
+
+from api.v1.jwks import get_jwks_router
+from core.jwt_keys import KeyRing
+from tests.test_authentication_strategy_jwt import (
+    ECC_PRIVATE_KEY,
+    ECC_PUBLIC_KEY,
+    RSA_PUBLIC_KEY,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def keyring_file(tmp_path) -> str:
+    (tmp_path / "current.pem").write_text(ECC_PRIVATE_KEY)
+    (tmp_path / "current.pub.pem").write_text(ECC_PUBLIC_KEY)
+    (tmp_path / "retired.pub.pem").write_text(RSA_PUBLIC_KEY)
+    manifest = {
+        "keys": [
+            {
+                "kid": "current",
+                "algorithm": "ES256",
+                "private_key_file": "current.pem",
+                "public_key_file": "current.pub.pem",
+                "not_before": "2023-07-01T00:00:00",
+            },
+            {
+                "kid": "retired",
+                "algorithm": "RS256",
+                "public_key_file": "retired.pub.pem",
+                "not_after": "2023-07-01T00:00:00",
+            },
+        ]
+    }
+    path = tmp_path / "keyring.json"
+    path.write_text(json.dumps(manifest))
+    return str(path)
+
+
+@pytest.fixture
+async def test_app_client(
+    keyring_file, get_test_client
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    app = FastAPI()
+    keyring = KeyRing.from_file(keyring_file)
+    app.include_router(get_jwks_router(lambda: keyring))
+
+    async for client in get_test_client(app):
+        yield client
+
+
+@pytest.mark.router
+async def test_jwks(test_app_client: httpx.AsyncClient):
+    response = await test_app_client.get("/.well-known/jwks.json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "max-age" in response.headers["Cache-Control"]
+    keys = response.json()["keys"]
+    assert [key["kid"] for key in keys] == ["current"]
+    assert keys[0]["kty"] == "EC"
+    assert keys[0]["alg"] == "ES256"
@@ -0,0 +1,73 @@
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+from fastapi import FastAPI, status
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from api.v1.metrics import get_metrics_router
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def registry() -> CollectorRegistry:
+    return CollectorRegistry()
+
+
+@pytest.fixture
+async def test_app_client(
+    registry, get_test_client
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    app = FastAPI()
+    app.include_router(get_metrics_router(registry))
+
+    async for client in get_test_client(app):
+        yield client
+
+
+@pytest.mark.router
+async def test_metrics(test_app_client: httpx.AsyncClient, registry: CollectorRegistry):
+    Counter("lookups_total", "Lookups", ["result"], registry=registry).labels(
+        result="hit"
+    ).inc(2)
+    Gauge("memory_bytes", "Memory", registry=registry).set_function(lambda: 1024)
+
+    response = await test_app_client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert "# TYPE lookups_total counter" in lines
+    assert 'lookups_total{result="hit"} 2.0' in lines
+    assert "# TYPE memory_bytes gauge" in lines
+    assert "memory_bytes 1024.0" in lines
+
+
+@pytest.mark.router
+def test_metric_name_conflict(registry: CollectorRegistry):
+    Counter("lookups_total", "Lookups", registry=registry)
+
+    with pytest.raises(ValueError):
+        Gauge("lookups_total", "Lookups", registry=registry)
+
+
+@pytest.mark.router
+async def test_histogram(
+    test_app_client: httpx.AsyncClient, registry: CollectorRegistry
+):
+    histogram = Histogram(
+        "latency_seconds", "Latency", ["function"], buckets=(0.1, 1), registry=registry
+    )
+    histogram.labels(function="get").observe(0.05)
+    histogram.labels(function="get").observe(0.1)
+    histogram.labels(function="get").observe(5)
+
+    response = await test_app_client.get("/metrics")
+
+    lines = response.text.splitlines()
+    assert 'latency_seconds_bucket{function="get",le="0.1"} 2.0' in lines
+    assert 'latency_seconds_bucket{function="get",le="1.0"} 2.0' in lines
+    assert 'latency_seconds_bucket{function="get",le="+Inf"} 3.0' in lines
+    assert 'latency_seconds_sum{function="get"} 5.15' in lines
+    assert 'latency_seconds_count{function="get"} 3.0' in lines
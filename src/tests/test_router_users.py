@@ -1,13 +1,16 @@
+import uuid
 from typing import Any, AsyncGenerator, Dict, cast
 
 import httpx
 import pytest
-from fastapi import FastAPI, status
+from fastapi import Depends, FastAPI, status
 
 from api import schemas
 from api.auth_users import get_users_me_router, get_users_router
 from api.v1.common import ErrorCode
+from api.v1.user import current_user_profile
 from authentication import Authenticator
+from authentication.strategy import TokenPrincipal
 from tests.conftest import UserModel, get_mock_authentication
 
 pytestmark = pytest.mark.asyncio
@@ -365,3 +368,82 @@ class TestDeleteUser:
 
         deleted_user = mock_user_db.delete.call_args[0][0]
         assert deleted_user.id == user.id
+
+
+@pytest.mark.router
+class TestRevokeSessions:
+    async def test_regular_user(
+        self, test_app_client: httpx.AsyncClient, user: UserModel
+    ):
+        response = await test_app_client.post(
+            f"/api/v1/users/{user.id}/revoke-sessions",
+            headers={"Authorization": f"Bearer {user.id}"},
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_not_existing_user_superuser(
+        self, test_app_client: httpx.AsyncClient, superuser: UserModel
+    ):
+        response = await test_app_client.post(
+            "/api/v1/users/d35d213e-f3d8-4f08-954a-7e0d1bea286f/revoke-sessions",
+            headers={"Authorization": f"Bearer {superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_superuser(
+        self,
+        test_app_client: httpx.AsyncClient,
+        user_manager,
+        user: UserModel,
+        superuser: UserModel,
+    ):
+        response = await test_app_client.post(
+            f"/api/v1/users/{user.id}/revoke-sessions",
+            headers={"Authorization": f"Bearer {superuser.id}"},
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user_manager.revoke_sessions.call_args[0][0].id == user.id
+
+
+@pytest.mark.router
+@pytest.mark.parametrize(
+    "account,superuser_required,status_code",
+    [
+        ("user", False, status.HTTP_200_OK),
+        ("inactive_user", False, status.HTTP_401_UNAUTHORIZED),
+        ("missing", False, status.HTTP_401_UNAUTHORIZED),
+        ("user", True, status.HTTP_403_FORBIDDEN),
+        ("superuser", True, status.HTTP_200_OK),
+    ],
+)
+async def test_current_user_profile_checks_loaded_user(
+    request,
+    get_test_client,
+    get_user_manager,
+    account: str,
+    superuser_required: bool,
+    status_code: int,
+):
+    user_id = (
+        request.getfixturevalue(account).id
+        if account != "missing"
+        else uuid.UUID("d35d213e-f3d8-4f08-954a-7e0d1bea286f")
+    )
+    # Claims issued before the account changed still look like an active superuser
+    get_profile = current_user_profile(
+        lambda: TokenPrincipal(id=user_id, is_active=True, is_superuser=True),
+        get_user_manager,
+        superuser=superuser_required,
+    )
+    app = FastAPI()
+
+    @app.get("/profile")
+    async def profile(user: UserModel = Depends(get_profile)):
+        return {"id": str(user.id)}
+
+    async for client in get_test_client(app):
+        response = await client.get("/profile")
+
+    assert response.status_code == status_code
+    if status_code == status.HTTP_200_OK:
+        assert response.json() == {"id": str(user_id)}